@@ -0,0 +1,111 @@
+"""
+Thin client for the analysis daemon.
+
+Imports nothing from the analyzer, so a hook or editor integration that
+sends requests to a running daemon starts in a few milliseconds. File inputs
+are sent as absolute paths because the daemon's working directory may differ
+from the caller's.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import itertools
+from typing import List, Dict, Optional, Any
+
+
+class DaemonError(RuntimeError):
+    """An error the daemon reported for a request."""
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(f"{error_type}: {message}")
+        self.error_type = error_type
+
+
+def default_socket_path() -> str:
+    return os.environ.get('CODE_SIMILARITY_SOCKET') or os.path.expanduser('~/.code-similarity.sock')
+
+
+class AnalysisClient:
+    """One connection to an analysis daemon; requests on it are answered in order."""
+
+    def __init__(self, socket_path: Optional[str] = None, timeout: Optional[float] = None):
+        self.socket_path = socket_path or default_socket_path()
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(self.socket_path)
+        self._reader = self._socket.makefile('rb')
+        self._ids = itertools.count(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+    def call(self, method: str, params: Optional[Dict] = None) -> Any:
+        """Send one request and wait for its result; raises DaemonError on failure."""
+        request_id = next(self._ids)
+        request = {'id': request_id, 'method': method, 'params': params or {}}
+        self._socket.sendall(json.dumps(request).encode('utf-8') + b'\n')
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Analysis daemon closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            raise DaemonError(response['error']['type'], response['error']['message'])
+        return response['result']
+
+    def analyze(self, input_a: str, input_b: str, is_file: bool = True, **options) -> Dict:
+        """Same arguments and results as analyze_code_similarity (tuples arrive as lists)."""
+        if is_file:
+            input_a, input_b = os.path.abspath(input_a), os.path.abspath(input_b)
+        return self.call('analyze', {'input_a': input_a, 'input_b': input_b, 'is_file': is_file, **options})
+
+    def ping(self) -> bool:
+        return self.call('ping') == 'pong'
+
+    def stats(self) -> Dict:
+        return self.call('stats')
+
+    def shutdown(self):
+        self.call('shutdown')
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Analyze a file pair with a running analysis daemon")
+    parser.add_argument('file_a', nargs='?')
+    parser.add_argument('file_b', nargs='?')
+    parser.add_argument('--socket', default=None, help="Socket path (default: $CODE_SIMILARITY_SOCKET "
+                                                       "or ~/.code-similarity.sock)")
+    parser.add_argument('--threshold', type=float, default=0.7, help="Line similarity threshold (default 0.7)")
+    parser.add_argument('--engine', default='line', help="Matching engine (default line)")
+    parser.add_argument('--stats', action='store_true', help="Print the daemon's statistics instead")
+    parser.add_argument('--shutdown', action='store_true', help="Stop the daemon")
+    args = parser.parse_args(argv)
+
+    with AnalysisClient(args.socket) as client:
+        if args.stats:
+            print(json.dumps(client.stats(), indent=2))
+        elif args.shutdown:
+            client.shutdown()
+        elif args.file_a and args.file_b:
+            started = time.perf_counter()
+            results = client.analyze(args.file_a, args.file_b, similarity_threshold=args.threshold,
+                                     engine=args.engine)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"Similarity: {results['similarity_percentage']:.2f}% "
+                  f"({results['similar_lines_count']} similar lines, {elapsed_ms:.1f} ms)")
+        else:
+            parser.error("file_a and file_b are required unless --stats or --shutdown is given")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
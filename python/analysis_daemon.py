@@ -0,0 +1,300 @@
+"""
+Long-running local analysis daemon.
+
+One process keeps a CodeSimilarityAnalyzer warm (interpreter started,
+modules imported, regexes compiled) along with in-memory caches of results
+and of preprocessed inputs, both keyed by input content hashes, so a file
+compared against many others is lexed once. It serves analyze requests over a
+Unix domain socket. The protocol is newline-delimited JSON: each request is
+``{"id": ..., "method": ..., "params": {...}}`` and each response is
+``{"id": ..., "result": ...}`` or ``{"id": ..., "error": {"type": ..., "message": ...}}``.
+Connections are handled on their own threads. With workers > 0, analyses
+that miss the cache run in a pool of warm worker processes, so they proceed
+in parallel; the daemon reads and preprocesses the inputs and sends them
+along. Results are what analyze_code_similarity returns, sent as JSON.
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import threading
+import socketserver
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Dict, Optional
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+from .code_lexer import detect_language
+from .result_store import content_hash
+from .window_matcher import DEFAULT_WINDOW_TOKENS
+
+
+# analyze_code_similarity keyword arguments a request may set
+ANALYZE_OPTIONS = ('similarity_threshold', 'is_file', 'language', 'canonicalize', 'engine',
+                   'max_candidates_per_line', 'window_size', 'max_memory_mb', 'deadline_seconds')
+
+DEFAULT_CACHE_ENTRIES = 4096
+DEFAULT_FEATURE_ENTRIES = 1024
+
+
+class _LRUMemo:
+    """Thread-safe in-memory LRU with hit and miss counters."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResultMemo(_LRUMemo):
+    """
+    Analysis results with the ResultStore get/put interface, so
+    analyze_code_similarity can use it as result_store.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_ENTRIES):
+        super().__init__(max_entries)
+
+    @staticmethod
+    def _key(hash_a: str, hash_b: str, threshold: float, options: Optional[Dict]) -> tuple:
+        return hash_a, hash_b, threshold, json.dumps(options or {}, sort_keys=True)
+
+    def get(self, hash_a: str, hash_b: str, threshold: float,
+            options: Optional[Dict] = None) -> Optional[Dict]:
+        results = self._lookup(self._key(hash_a, hash_b, threshold, options))
+        # Callers update the returned dict, so hand out a copy
+        return copy.deepcopy(results) if results is not None else None
+
+    def put(self, hash_a: str, hash_b: str, threshold: float, results: Dict,
+            options: Optional[Dict] = None):
+        self._store(self._key(hash_a, hash_b, threshold, options), copy.deepcopy(results))
+
+
+class FeatureMemo(_LRUMemo):
+    """
+    Preprocessed inputs, (meaningful lines, line features), by content hash
+    and language; analyze_code_similarity uses it as feature_cache. Entries
+    are shared, not copied, and never modified.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_FEATURE_ENTRIES):
+        super().__init__(max_entries)
+
+    def get(self, code_hash: str, language: str) -> Optional[Tuple[List, List[LineFeatures]]]:
+        return self._lookup((code_hash, language))
+
+    def put(self, code_hash: str, language: str, preprocessed: Tuple[List, List[LineFeatures]]):
+        self._store((code_hash, language), preprocessed)
+
+
+# Per-process analyzer for pool workers, created once by _init_worker
+_worker_analyzer: Optional[CodeSimilarityAnalyzer] = None
+
+
+def _init_worker():
+    global _worker_analyzer
+    _worker_analyzer = CodeSimilarityAnalyzer()
+
+
+def _analyze_in_worker(code_a: str, code_b: str, options: Dict, preprocessed: Dict[tuple, tuple]) -> Dict:
+    """Analyze code the daemon already read, with its preprocessed lines."""
+    features = FeatureMemo(len(preprocessed))
+    for (code_hash, language), entry in preprocessed.items():
+        features.put(code_hash, language, entry)
+    return _worker_analyzer.analyze_code_similarity(code_a, code_b, verbose=False,
+                                                    feature_cache=features, **options)
+
+
+class AnalysisDaemon:
+    """Serve analyze requests from a warm analyzer over a Unix domain socket."""
+
+    def __init__(self, socket_path: str, workers: int = 0,
+                 cache_entries: int = DEFAULT_CACHE_ENTRIES,
+                 analyzer: Optional[CodeSimilarityAnalyzer] = None,
+                 feature_entries: int = DEFAULT_FEATURE_ENTRIES):
+        self.socket_path = socket_path
+        self.analyzer = analyzer or CodeSimilarityAnalyzer()
+        self.memo = ResultMemo(cache_entries)
+        self.features = FeatureMemo(feature_entries)
+        self.workers = workers
+        self.pool = (ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+                     if workers > 0 else None)
+        self.started_at = time.time()
+        self.requests = 0
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def analyze(self, params: Dict) -> Dict:
+        """Handle one analyze request's params; the result equals a direct call."""
+        unknown = set(params) - set(ANALYZE_OPTIONS) - {'input_a', 'input_b'}
+        if unknown:
+            raise ValueError(f"Unknown analyze parameters: {', '.join(sorted(unknown))}")
+        options = {name: params[name] for name in ANALYZE_OPTIONS if name in params}
+        input_a, input_b = params['input_a'], params['input_b']
+        is_file = options.get('is_file', True)
+        language = options.get('language')
+        language_a = language or (detect_language(input_a) if is_file else 'generic')
+        language_b = language or (detect_language(input_b) if is_file else 'generic')
+        # Workers take both inputs as code in one language, so mixed pairs are analyzed here
+        if self.pool is None or language_a != language_b:
+            return self.analyzer.analyze_code_similarity(input_a, input_b, verbose=False, result_store=self.memo,
+                                                         feature_cache=self.features, **options)
+
+        # Read each input once, check the cache here and compute misses in a worker process
+        code_a = self.analyzer.read_input(input_a, is_file, language)[0]
+        code_b = self.analyzer.read_input(input_b, is_file, language)[0]
+        # The worker sees fragments, so its results get the request's input fields back
+        names = ({'input_a': input_a, 'input_b': input_b, 'is_file': True} if is_file else
+                 {'input_a': "Code Fragment A", 'input_b': "Code Fragment B", 'is_file': False})
+        key = None
+        # Deadline-bound results depend on timing, so they are never cached
+        if code_a and code_b and options.get('deadline_seconds') is None:
+            key = self.analyzer.result_store_key(
+                code_a, code_b, language_a, language_b, options.get('similarity_threshold', 0.7),
+                options.get('engine', 'line'), options.get('canonicalize', False),
+                options.get('max_candidates_per_line'), options.get('window_size', DEFAULT_WINDOW_TOKENS))
+            stored = self.memo.get(*key)
+            if stored is not None:
+                stored.update(names)
+                return stored
+        preprocessed = {(content_hash(code), language_a):
+                        self.analyzer.preprocess_code(code, language_a, self.features)
+                        for code in (code_a, code_b) if code}
+        results = self.pool.submit(_analyze_in_worker, code_a, code_b,
+                                   dict(options, is_file=False, language=language_a), preprocessed).result()
+        results.update(names)
+        if key is not None:
+            hash_a, hash_b, threshold, key_options = key
+            self.memo.put(hash_a, hash_b, threshold, results, key_options)
+        return results
+
+    def stats(self) -> Dict:
+        return {
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 3),
+            'requests': self.requests,
+            'workers': self.workers,
+            'cached_results': len(self.memo),
+            'cache_hits': self.memo.hits,
+            'cache_misses': self.memo.misses,
+            'cached_features': len(self.features),
+            'feature_hits': self.features.hits,
+            'feature_misses': self.features.misses,
+        }
+
+    def handle(self, request: Dict) -> Dict:
+        """Dispatch one decoded request and build its response."""
+        self.requests += 1
+        response = {'id': request.get('id')}
+        try:
+            method = request.get('method')
+            if method == 'analyze':
+                response['result'] = self.analyze(request.get('params') or {})
+            elif method == 'ping':
+                response['result'] = 'pong'
+            elif method == 'stats':
+                response['result'] = self.stats()
+            elif method == 'shutdown':
+                response['result'] = 'shutting down'
+                threading.Thread(target=self.shutdown, daemon=True).start()
+            else:
+                raise ValueError(f"Unknown method '{method}'")
+        except Exception as e:
+            response['error'] = {'type': type(e).__name__, 'message': str(e)}
+        return response
+
+    def serve_forever(self):
+        """Bind the socket and serve until shutdown() is called."""
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                    except ValueError as e:
+                        response = {'id': None, 'error': {'type': 'ValueError', 'message': f"Bad JSON: {e}"}}
+                    else:
+                        response = daemon.handle(request)
+                    self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # Left behind by a daemon that did not shut down cleanly
+        server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        self._server = server
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            if self.pool is not None:
+                self.pool.shutdown()
+
+    def start(self) -> threading.Thread:
+        """Serve from a background thread; returns once the socket accepts connections."""
+        thread = threading.Thread(target=self.serve_forever, name='analysis-daemon', daemon=True)
+        thread.start()
+        while self._server is None and thread.is_alive():
+            time.sleep(0.001)
+        return thread
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Serve code similarity analyses over a Unix socket")
+    parser.add_argument('--socket', default=None,
+                        help="Socket path (default: $CODE_SIMILARITY_SOCKET or ~/.code-similarity.sock)")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Worker processes for parallel analyses (default 0: analyze on connection threads)")
+    parser.add_argument('--cache-entries', type=int, default=DEFAULT_CACHE_ENTRIES,
+                        help=f"Results kept in memory (default {DEFAULT_CACHE_ENTRIES})")
+    parser.add_argument('--feature-entries', type=int, default=DEFAULT_FEATURE_ENTRIES,
+                        help=f"Preprocessed inputs kept in memory (default {DEFAULT_FEATURE_ENTRIES})")
+    args = parser.parse_args(argv)
+
+    from .analysis_client import default_socket_path
+    socket_path = args.socket or default_socket_path()
+    daemon = AnalysisDaemon(socket_path, args.workers, args.cache_entries,
+                            feature_entries=args.feature_entries)
+    print(f"Serving analyses on {socket_path}", flush=True)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
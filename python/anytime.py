@@ -0,0 +1,164 @@
+"""
+Deadline-aware anytime matching.
+
+Cheap, high-yield work runs first: lines with identical normalized text are
+paired by hashing, then lines with identical rename-invariant canonical
+forms. The remaining pairs are fuzzy scored in priority order, round-robin
+over the lines of A so every line gets its most promising candidates (by
+shared tokens) before any line gets its next ones. When the deadline passes,
+the best matching found so far is returned together with the fraction of
+pairs evaluated and bounds on the final similarity percentage.
+
+The bounds cover every result the complete run could still reach. Seeds are
+final, but the fuzzy matches may all still change: the complete greedy
+selection keeps between half of the fuzzy matches found so far (it is
+maximal over a superset of their pairs) and as many as there are free lines,
+each scoring anywhere from the threshold to 1. The percentage formula is
+not monotone in the match count, so the bounds are its extremes over all of
+those counts at the lowest and highest average score.
+"""
+
+import time
+from collections import defaultdict, deque
+from typing import List, Tuple, Dict, TYPE_CHECKING
+
+try:
+    from .canonicalizer import canonicalize_lines
+    from .block_matcher import DISJOINT_TOKENS_MAX_SIMILARITY
+except ImportError:  # Running the analyzer directly as a script
+    from canonicalizer import canonicalize_lines
+    from block_matcher import DISJOINT_TOKENS_MAX_SIMILARITY
+
+if TYPE_CHECKING:
+    from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+
+
+# How many pairs are scored between clock checks
+_CHECK_INTERVAL = 64
+
+
+def _seed_by_key(keys_a: List[str], keys_b: List[str], free_a: List[int], free_b: List[int],
+                 eligible=lambda i, j: True) -> List[Tuple[int, int]]:
+    lines_by_key = defaultdict(deque)
+    for j in free_b:
+        lines_by_key[keys_b[j]].append(j)
+    pairs = []
+    for i in free_a:
+        candidates = lines_by_key.get(keys_a[i])
+        if candidates and eligible(i, candidates[0]):
+            pairs.append((i, candidates.popleft()))
+    return pairs
+
+
+def _percentage_bounds(analyzer: 'CodeSimilarityAnalyzer', seeds: List[Tuple[int, int, float]],
+                       fewest: int, most: int, threshold: float,
+                       total_lines_a: int, total_lines_b: int) -> Tuple[float, float]:
+    """Extremes of similarity_percentage over fewest..most fuzzy matches added to the seeds."""
+    seed_score = sum(score for _, _, score in seeds)
+    percentages = []
+    for extra in range(fewest, most + 1):
+        # For a fixed count the percentage never falls as the average score rises
+        for score in (threshold, 1.0):
+            percentages.append(analyzer.similarity_percentage_from_counts(
+                len(seeds) + extra, seed_score + extra * score, total_lines_a, total_lines_b))
+    return min(percentages), max(percentages)
+
+
+def match_anytime(analyzer: 'CodeSimilarityAnalyzer', features_a: List['LineFeatures'],
+                  features_b: List['LineFeatures'], threshold: float,
+                  deadline: float) -> Tuple[List[Tuple[int, int, float]], Dict]:
+    """
+    Match lines until time.perf_counter() reaches deadline.
+
+    Returns:
+        (similar_matches, stats) where stats has 'partial', 'pairs_evaluated_fraction',
+        'seeded_matches' and 'similarity_bounds' (the lowest and highest
+        similarity_percentage the complete run can reach)
+    """
+    seeds = []
+    free_a, free_b = list(range(len(features_a))), list(range(len(features_b)))
+
+    def take(pairs):
+        nonlocal free_a, free_b
+        for i, j in pairs:
+            score = max(threshold, analyzer.similarity_from_features(features_a[i], features_b[j]))
+            seeds.append((i, j, score))
+        used_a, used_b = {i for i, _ in pairs}, {j for _, j in pairs}
+        free_a = [i for i in free_a if i not in used_a]
+        free_b = [j for j in free_b if j not in used_b]
+
+    # Identical lines, then lines equal up to renaming (3+ tokens, as in the fast path)
+    take(_seed_by_key([line.normalized for line in features_a], [line.normalized for line in features_b],
+                      free_a, free_b))
+    canonical_a = canonicalize_lines([line.normalized for line in features_a])
+    canonical_b = canonicalize_lines([line.normalized for line in features_b])
+    take(_seed_by_key(canonical_a, canonical_b, free_a, free_b,
+                      lambda i, j: len(features_a[i].tokens) >= 3 and len(features_b[j].tokens) >= 3))
+
+    # Rank each free A line's candidates by the number of shared tokens
+    lines_by_token = defaultdict(list)
+    for j in free_b:
+        for token in features_b[j].token_set:
+            lines_by_token[token].append(j)
+    queues = []
+    for i in free_a:
+        shared = defaultdict(int)
+        for token in features_a[i].token_set:
+            for j in lines_by_token.get(token, ()):
+                shared[j] += 1
+        queues.append((i, sorted(shared, key=lambda j: (-shared[j], j))))
+
+    total_pairs = len(free_a) * len(free_b)
+    sharing_pairs = sum(len(candidates) for _, candidates in queues)
+    skip_disjoint = threshold > DISJOINT_TOKENS_MAX_SIMILARITY
+    pending = dict(queues)
+    if not skip_disjoint:
+        # Disjoint pairs can still qualify; score them after all sharing pairs
+        for i, candidates in queues:
+            sharing = set(candidates)
+            pending[i] = candidates + [j for j in free_b if j not in sharing]
+
+    scored = []
+    evaluated = 0
+    partial = False
+    depth = 0
+    active = [i for i in free_a if pending[i]]
+    while active and not partial:
+        still_active = []
+        for i in active:
+            j = pending[i][depth]
+            score = analyzer.similarity_from_features(features_a[i], features_b[j])
+            evaluated += 1
+            if score >= threshold:
+                scored.append((i, j, score))
+            if depth + 1 < len(pending[i]):
+                still_active.append(i)
+            if evaluated % _CHECK_INTERVAL == 0 and time.perf_counter() >= deadline:
+                partial = True
+                break
+        active = still_active
+        depth += 1
+
+    resolved = evaluated + (total_pairs - sharing_pairs if skip_disjoint else 0)
+    # Candidates are appended round by round; restore (i, j) order before the stable sort
+    scored.sort(key=lambda x: (x[0], x[1]))
+    scored.sort(key=lambda x: x[2], reverse=True)
+    fuzzy = analyzer.select_matches(scored)
+    similar_matches = seeds + fuzzy
+    similar_matches.sort(key=lambda x: x[2], reverse=True)
+
+    if partial:
+        low, high = _percentage_bounds(analyzer, seeds, (len(fuzzy) + 1) // 2, min(len(free_a), len(free_b)),
+                                       threshold, len(features_a), len(features_b))
+    else:
+        low = high = analyzer.similarity_percentage_from_counts(
+            len(similar_matches), sum(score for _, _, score in similar_matches),
+            len(features_a), len(features_b))
+
+    stats = {
+        'partial': partial,
+        'pairs_evaluated_fraction': round(resolved / total_pairs, 4) if total_pairs else 1.0,
+        'seeded_matches': len(seeds),
+        'similarity_bounds': [round(low, 2), round(high, 2)],
+    }
+    return similar_matches, stats
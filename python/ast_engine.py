@@ -0,0 +1,181 @@
+"""
+AST subtree hashing engine for Python sources.
+
+Every function, class, loop and other compound statement is hashed with
+identifiers, literal values and docstrings abstracted away. Subtrees with
+equal hashes in the two files are paired largest-first using a hash table,
+which is linear in the size of the trees, and each pair is walked in lockstep
+to map the lines of one file onto the lines of the other. The line pairs seed
+the analyzer's one-to-one matching; only the remaining lines are fuzzy scored.
+"""
+
+import ast
+import hashlib
+from typing import List, Tuple, Dict, Optional, Iterator
+
+
+BLOCK_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.For, ast.AsyncFor,
+               ast.While, ast.If, ast.With, ast.AsyncWith, ast.Try)
+
+# Identifier fields that are abstracted away when hashing
+_IDENTIFIER_FIELDS = {'id', 'arg', 'attr', 'name', 'asname', 'module'}
+_IGNORED_FIELDS = {'ctx', 'type_comment', 'kind'}
+
+
+class Subtree:
+    """A hashed compound statement and the lines it spans."""
+
+    __slots__ = ('node', 'digest', 'size', 'start_line', 'end_line')
+
+    def __init__(self, node: ast.AST, digest: str, size: int):
+        self.node = node
+        self.digest = digest
+        self.size = size
+        self.start_line = node.lineno
+        self.end_line = getattr(node, 'end_lineno', None) or node.lineno
+
+
+def _is_docstring(node: ast.AST) -> bool:
+    return (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant)
+            and isinstance(node.value.value, str))
+
+
+def _child_fields(node: ast.AST) -> Iterator[Tuple[str, object]]:
+    """Fields of a node in a fixed order, with docstrings dropped from bodies."""
+    for field, value in ast.iter_fields(node):
+        if field in _IGNORED_FIELDS:
+            continue
+        if (field == 'body' and isinstance(value, list) and value and _is_docstring(value[0])
+                and isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef))):
+            value = value[1:]
+        yield field, value
+
+
+def iter_nodes(node: ast.AST) -> Iterator[ast.AST]:
+    """Pre-order walk that visits exactly the nodes that contribute to a subtree hash."""
+    yield node
+    for _, value in _child_fields(node):
+        if isinstance(value, ast.AST):
+            yield from iter_nodes(value)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, ast.AST):
+                    yield from iter_nodes(item)
+
+
+def hash_subtrees(tree: ast.AST, min_nodes: int = 8) -> List[Subtree]:
+    """Hash every node of a tree bottom-up and return the compound statements worth matching."""
+    digests: Dict[int, str] = {}
+    sizes: Dict[int, int] = {}
+    subtrees = []
+
+    # Explicit post-order traversal so deep trees don't hit the recursion limit
+    stack = [(tree, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if not children_done:
+            stack.append((node, True))
+            for _, value in _child_fields(node):
+                if isinstance(value, ast.AST):
+                    stack.append((value, False))
+                elif isinstance(value, list):
+                    stack.extend((item, False) for item in value if isinstance(item, ast.AST))
+            continue
+
+        parts = [type(node).__name__]
+        size = 1
+        for field, value in _child_fields(node):
+            if field in _IDENTIFIER_FIELDS and not isinstance(value, (ast.AST, list)):
+                parts.append(f"{field}=_")
+            elif isinstance(node, ast.Constant) and field == 'value':
+                parts.append(f"const:{type(value).__name__}")
+            elif isinstance(value, ast.AST):
+                parts.append(f"{field}={digests[id(value)]}")
+                size += sizes[id(value)]
+            elif isinstance(value, list):
+                items = []
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        items.append(digests[id(item)])
+                        size += sizes[id(item)]
+                    else:
+                        items.append(repr(item))
+                parts.append(f"{field}=[{','.join(items)}]")
+            else:
+                parts.append(f"{field}={value!r}")
+
+        digest = hashlib.blake2b('|'.join(parts).encode(), digest_size=12).hexdigest()
+        digests[id(node)] = digest
+        sizes[id(node)] = size
+        if isinstance(node, BLOCK_TYPES) and size >= min_nodes:
+            subtrees.append(Subtree(node, digest, size))
+
+    return subtrees
+
+
+def match_subtrees(subtrees_a: List[Subtree], subtrees_b: List[Subtree]) -> List[Tuple[Subtree, Subtree]]:
+    """
+    Pair subtrees with equal hashes, largest first, without overlapping an
+    already matched region in either file.
+    """
+    by_digest: Dict[str, List[Subtree]] = {}
+    for subtree in sorted(subtrees_b, key=lambda s: s.start_line):
+        by_digest.setdefault(subtree.digest, []).append(subtree)
+
+    covered_a, covered_b = set(), set()
+    pairs = []
+    for subtree_a in sorted(subtrees_a, key=lambda s: (-s.size, s.start_line)):
+        span_a = range(subtree_a.start_line, subtree_a.end_line + 1)
+        if any(line in covered_a for line in span_a):
+            continue
+        for subtree_b in by_digest.get(subtree_a.digest, ()):
+            span_b = range(subtree_b.start_line, subtree_b.end_line + 1)
+            if any(line in covered_b for line in span_b):
+                continue
+            pairs.append((subtree_a, subtree_b))
+            covered_a.update(span_a)
+            covered_b.update(span_b)
+            break
+    return pairs
+
+
+def map_lines(pairs: List[Tuple[Subtree, Subtree]]) -> List[Tuple[int, int]]:
+    """Walk matched subtrees in lockstep and pair the source lines their nodes start on."""
+    line_pairs = []
+    mapped_a, mapped_b = set(), set()
+    for subtree_a, subtree_b in pairs:
+        for node_a, node_b in zip(iter_nodes(subtree_a.node), iter_nodes(subtree_b.node)):
+            line_a = getattr(node_a, 'lineno', None)
+            line_b = getattr(node_b, 'lineno', None)
+            if line_a is None or line_b is None or line_a in mapped_a or line_b in mapped_b:
+                continue
+            line_pairs.append((line_a, line_b))
+            mapped_a.add(line_a)
+            mapped_b.add(line_b)
+    return line_pairs
+
+
+def parse_python(code: str) -> Optional[ast.AST]:
+    """Parse Python source, returning None if it isn't valid Python."""
+    try:
+        return ast.parse(code)
+    except (SyntaxError, ValueError, RecursionError):
+        return None
+
+
+def match_python_lines(code_a: str, code_b: str,
+                       min_nodes: int = 8) -> Optional[Tuple[List[Tuple[int, int]], int]]:
+    """
+    Find corresponding lines of two Python sources through matching AST subtrees.
+
+    Returns:
+        (list of (line_a, line_b) 1-based line number pairs, number of matched
+        subtrees), or None if either input doesn't parse
+    """
+    tree_a = parse_python(code_a)
+    tree_b = parse_python(code_b)
+    if tree_a is None or tree_b is None:
+        return None
+
+    pairs = match_subtrees(hash_subtrees(tree_a, min_nodes), hash_subtrees(tree_b, min_nodes))
+    return map_lines(pairs), len(pairs)
@@ -0,0 +1,254 @@
+"""
+asyncio request API for many small fragment comparisons.
+
+Requests are collected into a batch (up to max_batch_size) for batch_window
+seconds, and for as long as every worker is busy with an earlier batch, so
+batches grow with load and an idle service answers without waiting.
+Identical requests (same code, threshold and options) within a batch are
+scored once. The batch's unique comparisons are then sent to a worker pool
+as a few large tasks rather than one task per request. This keeps the event
+loop free and pays the executor's per-task overhead per batch, not per
+request. Each caller's future resolves to its own copy of the results dict.
+
+Running the module is a load generator: it reports p50/p99 latency and
+throughput at several concurrency levels.
+"""
+
+import sys
+import copy
+import json
+import time
+import random
+import asyncio
+import argparse
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import List, Tuple, Dict, Optional, Any
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer
+
+
+# analyze_code_similarity keyword arguments a request may set
+COMPARE_OPTIONS = ('language', 'canonicalize', 'engine', 'max_candidates_per_line', 'window_size')
+
+DEFAULT_BATCH_WINDOW = 0.0
+DEFAULT_MAX_BATCH_SIZE = 256
+
+
+# Per-process analyzer for pool workers, created on first use
+_worker_analyzer: Optional[CodeSimilarityAnalyzer] = None
+
+
+def _compare_batch(jobs: List[Tuple[str, str, float, Dict]]) -> List[Tuple[bool, Any]]:
+    """Compare (code_a, code_b, threshold, options) jobs; returns (ok, results or exception) per job."""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = CodeSimilarityAnalyzer()
+    outcomes = []
+    for code_a, code_b, threshold, options in jobs:
+        try:
+            outcomes.append((True, _worker_analyzer.analyze_code_similarity(
+                code_a, code_b, threshold, is_file=False, verbose=False, **options)))
+        except Exception as e:
+            outcomes.append((False, e))
+    return outcomes
+
+
+class AsyncSimilarityService:
+    """
+    Micro-batching asyncio front end for fragment comparisons.
+
+    Use it as an async context manager, or call close() when done. With
+    workers=None, batches run on one background thread; with workers=N they
+    are split across N processes, which is faster once batches are large
+    enough to keep several cores busy.
+    """
+
+    def __init__(self, workers: Optional[int] = None, batch_window: float = DEFAULT_BATCH_WINDOW,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, executor: Optional[Executor] = None):
+        self.workers = workers
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = (ProcessPoolExecutor(max_workers=workers) if workers
+                        else ThreadPoolExecutor(max_workers=1, thread_name_prefix='similarity-batch'))
+        self.executor = executor
+        # Request key -> futures waiting for it, in arrival order
+        self._pending: Dict[Tuple, List[asyncio.Future]] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self._in_flight: set = set()
+        # Batches that may run at once; more requests wait and join the next batch
+        self._max_in_flight = max(1, workers or 1)
+        self.batches = 0
+        self.requests = 0
+        self.comparisons = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def compare(self, code_a: str, code_b: str, similarity_threshold: float = 0.7,
+                      **options) -> Dict:
+        """Compare two code fragments; same results as analyze_code_similarity(is_file=False)."""
+        unknown = set(options) - set(COMPARE_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown comparison options: {', '.join(sorted(unknown))}")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        key = (code_a, code_b, similarity_threshold, json.dumps(options, sort_keys=True))
+        self._pending.setdefault(key, []).append(future)
+        self.requests += 1
+        if len(self._pending) >= self.max_batch_size and len(self._in_flight) < self._max_in_flight:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return await future
+
+    def _flush(self, force: bool = False):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        if len(self._in_flight) >= self._max_in_flight and not force:
+            return  # _batch_done flushes once a worker frees up
+        batch = {}
+        while self._pending and len(batch) < self.max_batch_size:
+            key = next(iter(self._pending))
+            batch[key] = self._pending.pop(key)
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(self._batch_done)
+        if self._pending and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+
+    def _batch_done(self, task: asyncio.Task):
+        self._in_flight.discard(task)
+        if self._pending and self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_soon(self._flush)
+
+    async def _run_batch(self, batch: Dict[Tuple, List[asyncio.Future]]):
+        loop = asyncio.get_running_loop()
+        keys = list(batch)
+        jobs = [(code_a, code_b, threshold, json.loads(options)) for code_a, code_b, threshold, options in keys]
+        self.batches += 1
+        self.comparisons += len(jobs)
+        chunks = max(1, min(self.workers or 1, len(jobs)))
+        size = -(-len(jobs) // chunks)
+        try:
+            parts = await asyncio.gather(*(loop.run_in_executor(self.executor, _compare_batch, jobs[i:i + size])
+                                           for i in range(0, len(jobs), size)))
+        except Exception as e:  # The pool itself failed, e.g. a worker process died
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        outcomes = [outcome for part in parts for outcome in part]
+        for key, (ok, value) in zip(keys, outcomes):
+            for position, future in enumerate(batch[key]):
+                if future.done():  # Cancelled by its caller
+                    continue
+                if not ok:
+                    future.set_exception(value)
+                else:
+                    # Duplicates get their own copy so callers can modify results freely
+                    future.set_result(value if position == 0 else copy.deepcopy(value))
+
+    async def close(self):
+        """Score anything still pending, wait for running batches and release the pool."""
+        while self._pending:
+            self._flush(force=True)
+        while self._in_flight:
+            await asyncio.gather(*list(self._in_flight), return_exceptions=True)
+        if self._owns_executor:
+            self.executor.shutdown()
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+async def run_load(service: AsyncSimilarityService, fragments: List[Tuple[str, str]],
+                   concurrency: int, requests: int, seed: int = 0) -> Dict:
+    """
+    Send requests comparisons, each a random pair from fragments, from
+    concurrency concurrent clients.
+
+    Returns:
+        Dictionary with 'concurrency', 'requests', 'throughput_per_second',
+        'p50_ms' and 'p99_ms'
+    """
+    rng = random.Random(seed)
+    latencies = []
+    remaining = iter(range(requests))
+
+    async def client():
+        for _ in remaining:
+            code_a, code_b = rng.choice(fragments)
+            started = time.perf_counter()
+            await service.compare(code_a, code_b, language='python')
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'concurrency': concurrency,
+        'requests': requests,
+        'throughput_per_second': round(requests / elapsed, 1),
+        'p50_ms': round(_percentile(latencies, 0.5) * 1000, 3),
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def synthetic_fragments(count: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """Small fragment pairs like an IDE sends: a few lines and a lightly edited copy."""
+    rng = random.Random(seed)
+    names = ['items', 'values', 'total', 'count', 'result', 'index', 'node', 'buffer', 'config']
+    pairs = []
+    for _ in range(count):
+        a, b, c = rng.sample(names, 3)
+        lines = [f"def update_{a}({b}, {c}):",
+                 f"    {a} = [{c} * 2 for {c} in {b} if {c}]",
+                 f"    if not {a}:",
+                 f"        return None",
+                 f"    return sum({a}) / len({a})"]
+        edited = [line.replace(b, rng.choice(names)) for line in lines]
+        if rng.random() < 0.5:
+            edited.insert(rng.randrange(1, len(edited)), f"    # {rng.choice(names)}")
+        pairs.append(('\n'.join(lines) + '\n', '\n'.join(edited) + '\n'))
+    return pairs
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load-generator benchmark for AsyncSimilarityService")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 64, 256],
+                        help="Concurrent client counts to test (default 1 8 64 256)")
+    parser.add_argument('--requests', type=int, default=2000, help="Requests per level (default 2000)")
+    parser.add_argument('--distinct', type=int, default=500,
+                        help="Distinct fragment pairs; fewer means more duplicates (default 500)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (default: one background thread)")
+    parser.add_argument('--batch-window', type=float, default=DEFAULT_BATCH_WINDOW,
+                        help=f"Seconds to collect a batch (default {DEFAULT_BATCH_WINDOW})")
+    args = parser.parse_args(argv)
+
+    fragments = synthetic_fragments(args.distinct)
+
+    async def run():
+        print(f"{'concurrency':>11} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'batches':>8} {'scored':>7}")
+        for concurrency in args.concurrency:
+            async with AsyncSimilarityService(args.workers, args.batch_window) as service:
+                report = await run_load(service, fragments, concurrency, args.requests)
+            print(f"{concurrency:>11} {report['throughput_per_second']:>9.1f} {report['p50_ms']:>9.2f} "
+                  f"{report['p99_ms']:>9.2f} {service.batches:>8} {service.comparisons:>7}")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Hierarchical block-then-line matching.
+
+Each file is split into blocks at function, method and class headers (long
+blocks are cut further where indentation returns to the block's body level).
+Block pairs are scored with cheap token-set sketches, and line similarity is
+only computed inside the best block pairs. A fallback pass then matches the
+lines left over, skipping line pairs that share no token when the threshold
+is high enough that such pairs can never qualify.
+"""
+
+from typing import List, Tuple, Dict, FrozenSet, TYPE_CHECKING
+from collections import defaultdict
+
+try:
+    from .canonicalizer import is_scope_start
+except ImportError:  # Running the analyzer directly as a script
+    from canonicalizer import is_scope_start
+
+if TYPE_CHECKING:
+    from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+
+
+# Line pairs without a shared token score at most 0.6 (string and structure
+# terms only), so above this threshold they can be skipped without loss
+DISJOINT_TOKENS_MAX_SIMILARITY = 0.6
+
+
+def _indentation(line: str) -> int:
+    return len(line) - len(line.lstrip())
+
+
+def split_blocks(meaningful_lines: List[Tuple[int, str, str]], features: List['LineFeatures'],
+                 max_block_lines: int = 40) -> List[Tuple[int, int]]:
+    """
+    Split a file's meaningful lines into blocks.
+
+    Returns:
+        (start, end) index ranges over meaningful lines, end exclusive
+    """
+    starts = [0]
+    for index in range(1, len(features)):
+        if is_scope_start(features[index].normalized):
+            starts.append(index)
+    bounds = list(zip(starts, starts[1:] + [len(features)]))
+
+    blocks = []
+    for start, end in bounds:
+        while end - start > max_block_lines:
+            # Cut at the last line back at the body's indentation within the limit
+            body_indent = _indentation(meaningful_lines[start + 1][1]) if start + 1 < end else 0
+            cut = start + max_block_lines
+            for index in range(start + max_block_lines, start + max_block_lines // 2, -1):
+                if _indentation(meaningful_lines[index][1]) <= body_indent:
+                    cut = index
+                    break
+            blocks.append((start, cut))
+            start = cut
+        blocks.append((start, end))
+    return blocks
+
+
+def _block_sketch(features: List['LineFeatures'], start: int, end: int) -> FrozenSet[str]:
+    sketch = set()
+    for line in features[start:end]:
+        sketch.update(line.token_set)
+        sketch.update(line.features)
+    return frozenset(sketch)
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def select_block_pairs(sketches_a: List[FrozenSet[str]], sketches_b: List[FrozenSet[str]],
+                       candidates_per_block: int = 2,
+                       min_block_similarity: float = 0.1) -> List[Tuple[int, int]]:
+    """Keep each block's best-scoring partners on both sides."""
+    scores = [[_jaccard(a, b) for b in sketches_b] for a in sketches_a]
+
+    selected = set()
+    for x, row in enumerate(scores):
+        best = sorted(range(len(row)), key=lambda y: row[y], reverse=True)[:candidates_per_block]
+        selected.update((x, y) for y in best if row[y] >= min_block_similarity)
+    for y in range(len(sketches_b)):
+        best = sorted(range(len(sketches_a)), key=lambda x: scores[x][y], reverse=True)[:candidates_per_block]
+        selected.update((x, y) for x in best if scores[x][y] >= min_block_similarity)
+    return sorted(selected)
+
+
+def match_hierarchical(analyzer: 'CodeSimilarityAnalyzer',
+                       meaningful_a: List[Tuple[int, str, str]], meaningful_b: List[Tuple[int, str, str]],
+                       features_a: List['LineFeatures'], features_b: List['LineFeatures'],
+                       threshold: float = 0.7, candidates_per_block: int = 2,
+                       max_block_lines: int = 40) -> Tuple[List[Tuple[int, int, float]], Dict]:
+    """
+    Two-level matching: score block pairs by sketch, match lines inside the
+    best pairs, then fall back to the lines still unmatched.
+
+    Returns:
+        (similar_matches, stats) where stats counts blocks and line pairs scored
+    """
+    blocks_a = split_blocks(meaningful_a, features_a, max_block_lines)
+    blocks_b = split_blocks(meaningful_b, features_b, max_block_lines)
+    sketches_a = [_block_sketch(features_a, start, end) for start, end in blocks_a]
+    sketches_b = [_block_sketch(features_b, start, end) for start, end in blocks_b]
+    block_pairs = select_block_pairs(sketches_a, sketches_b, candidates_per_block)
+
+    scored = {}
+    for x, y in block_pairs:
+        start_a, end_a = blocks_a[x]
+        start_b, end_b = blocks_b[y]
+        for i in range(start_a, end_a):
+            for j in range(start_b, end_b):
+                if (i, j) not in scored:
+                    scored[(i, j)] = analyzer.similarity_from_features(features_a[i], features_b[j])
+    pairs_scored = len(scored)
+
+    potential_matches = [(i, j, score) for (i, j), score in scored.items() if score >= threshold]
+    potential_matches.sort(key=lambda x: (-x[2], x[0], x[1]))
+    block_matches = []
+    used_a, used_b = set(), set()
+    for i, j, score in potential_matches:
+        if i not in used_a and j not in used_b:
+            block_matches.append((i, j, score))
+            used_a.add(i)
+            used_b.add(j)
+
+    # Fallback over lines the block pass left unmatched
+    rest_a = [i for i in range(len(features_a)) if i not in used_a]
+    rest_b = [j for j in range(len(features_b)) if j not in used_b]
+    skip_disjoint = threshold > DISJOINT_TOKENS_MAX_SIMILARITY
+    lines_by_token = defaultdict(set)
+    tokenless_b = []
+    if skip_disjoint:
+        for j in rest_b:
+            for token in features_b[j].token_set:
+                lines_by_token[token].add(j)
+            if not features_b[j].token_set:
+                tokenless_b.append(j)
+
+    potential_matches = []
+    for i in rest_a:
+        if skip_disjoint and not features_a[i].token_set:
+            # Lines without tokens (e.g. 'a, b') still match identical lines
+            candidates = tokenless_b
+        elif skip_disjoint:
+            candidates = set()
+            for token in features_a[i].token_set:
+                candidates.update(lines_by_token.get(token, ()))
+        else:
+            candidates = rest_b
+        for j in candidates:
+            score = scored.get((i, j))
+            if score is None:
+                score = analyzer.similarity_from_features(features_a[i], features_b[j])
+                pairs_scored += 1
+            if score >= threshold:
+                potential_matches.append((i, j, score))
+    potential_matches.sort(key=lambda x: (-x[2], x[0], x[1]))
+    for i, j, score in potential_matches:
+        if i not in used_a and j not in used_b:
+            block_matches.append((i, j, score))
+            used_a.add(i)
+            used_b.add(j)
+
+    block_matches.sort(key=lambda x: x[2], reverse=True)
+    stats = {
+        'blocks_a': len(blocks_a),
+        'blocks_b': len(blocks_b),
+        'block_pairs_scored': len(block_pairs),
+        'line_pairs_scored': pairs_scored,
+        'line_pairs_total': len(features_a) * len(features_b),
+    }
+    return block_matches, stats
@@ -0,0 +1,94 @@
+"""
+Memory-budgeted sorting of candidate line pairs.
+
+Candidates are buffered up to a budget, spilled to temporary files as sorted
+runs, and merge-streamed back in the same order the in-memory sort produces
+(score descending, then i and j ascending), so the greedy selector sees an
+identical sequence while only the buffer and one block per run are resident.
+"""
+
+import heapq
+import struct
+import tempfile
+from operator import itemgetter
+from typing import List, Tuple, Iterator, Optional, IO
+
+
+# (i, j, score) with the score stored as a double so it round-trips exactly
+_RECORD = struct.Struct('<iid')
+_RECORDS_PER_READ = 4096
+
+# Approximate resident cost of one buffered (i, j, score) tuple, including
+# the float, the list slot and sort overhead
+CANDIDATE_BYTES = 160
+
+
+def budget_entries(max_memory_mb: float) -> int:
+    """Number of candidates that fit in a memory budget."""
+    if max_memory_mb <= 0:
+        raise ValueError("max_memory_mb must be positive")
+    return max(1024, int(max_memory_mb * 1024 * 1024 / CANDIDATE_BYTES))
+
+
+def _read_run(run: IO[bytes]) -> Iterator[Tuple[int, int, float]]:
+    run.seek(0)
+    while True:
+        block = run.read(_RECORD.size * _RECORDS_PER_READ)
+        if not block:
+            return
+        yield from _RECORD.iter_unpack(block)
+
+
+class SpillingSorter:
+    """
+    Collect (i, j, score) candidates in (i, j) order and iterate them best
+    first, spilling sorted runs to disk whenever the buffer is full.
+    """
+
+    def __init__(self, max_entries: int, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._buffer: List[Tuple[int, int, float]] = []
+        self._runs: List[IO[bytes]] = []
+
+    @property
+    def spilled_runs(self) -> int:
+        return len(self._runs)
+
+    def add(self, i: int, j: int, score: float):
+        self._buffer.append((i, j, score))
+        if len(self._buffer) >= self.max_entries:
+            self._spill()
+
+    def _sort_buffer(self):
+        # Candidates arrive in (i, j) order and the sort is stable
+        self._buffer.sort(key=itemgetter(2), reverse=True)
+
+    def _spill(self):
+        self._sort_buffer()
+        run = tempfile.TemporaryFile(dir=self.directory)
+        pack = _RECORD.pack
+        for start in range(0, len(self._buffer), _RECORDS_PER_READ):
+            run.write(b''.join(pack(*candidate)
+                               for candidate in self._buffer[start:start + _RECORDS_PER_READ]))
+        self._runs.append(run)
+        self._buffer = []
+
+    def __iter__(self) -> Iterator[Tuple[int, int, float]]:
+        self._sort_buffer()
+        if not self._runs:
+            return iter(self._buffer)
+        streams = [_read_run(run) for run in self._runs] + [iter(self._buffer)]
+        return heapq.merge(*streams, key=lambda candidate: (-candidate[2], candidate[0], candidate[1]))
+
+    def close(self):
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._buffer = []
+
+    def __enter__(self) -> 'SpillingSorter':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,74 @@
+"""
+Rename-invariant canonical forms for code lines.
+
+User identifiers are replaced with positional placeholders (v1, v2, ...) in
+order of first appearance within each function or class scope, so that two
+lines differing only in variable, parameter, attribute or function names get
+the same canonical form. Keywords, common builtins and string literals are
+kept as they are.
+"""
+
+import re
+from typing import List, Dict
+
+
+# Lowercase, since canonicalization runs on normalized lines
+RESERVED_WORDS = frozenset("""
+    and as assert async await break case catch class const constructor continue
+    def default del delete do elif else enum except export extends false final
+    finally for from function global if implements import in instanceof interface
+    is lambda let new none nonlocal not null of or pass private protected public
+    raise readonly return static super switch synchronized this throw throws true
+    try type typeof undefined var void while with yield
+    self cls print len range str int float bool list dict set tuple object
+    isinstance enumerate zip map filter sorted sum min max abs round any all open
+    string number boolean array promise console log math json date
+    system out println length push pop append extend get keys values items
+    update join split strip format
+""".split())
+
+_SCOPE_START = re.compile(
+    r'^(?:async )?def '
+    r'|^(?:export )?(?:abstract )?class '
+    r'|\bfunction\b'
+    r'|^(?:(?:public|private|protected|static|final|abstract|synchronized|async) )+[\w<>\[\], ]*\('
+    r'|^constructor ?\('
+    r'|^(?!(?:if|for|while|switch|catch|with)\b)[\w$]+ ?\([^)]*\) ?(?::[^{]*)?\{$'
+)
+
+_IDENTIFIER_OR_STRING = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`(?:\\.|[^`\\])*`)|([a-z_$][\w$]*)'
+)
+
+
+def is_scope_start(normalized_line: str) -> bool:
+    """True for function, method and class header lines."""
+    return _SCOPE_START.search(normalized_line) is not None
+
+
+def canonicalize_lines(normalized_lines: List[str]) -> List[str]:
+    """
+    Canonicalize a file's normalized lines in order.
+
+    A new placeholder numbering starts at every function or class header, so
+    the same code produces the same canonical lines wherever it is defined.
+    """
+    canonical_lines = []
+    names: Dict[str, str] = {}
+
+    def replace(match):
+        if match.group(1) is not None:
+            return match.group(1)
+        word = match.group(2)
+        if word in RESERVED_WORDS:
+            return word
+        if word not in names:
+            names[word] = f"v{len(names) + 1}"
+        return names[word]
+
+    for line in normalized_lines:
+        if is_scope_start(line):
+            names = {}
+        canonical_lines.append(_IDENTIFIER_OR_STRING.sub(replace, line))
+
+    return canonical_lines
@@ -0,0 +1,342 @@
+"""
+Intra-repository clone detection.
+
+Indexes every source file under a root directory and finds duplicated code
+blocks using the same line similarity as CodeSimilarityAnalyzer. Candidate
+file pairs are selected by blocking on shared token bigrams so that a tree
+with tens of thousands of files never needs a full all-pairs comparison.
+"""
+
+import os
+import sys
+import argparse
+from typing import List, Tuple, Dict, Set, Optional, Iterable
+from collections import defaultdict
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+from .code_lexer import detect_language
+
+
+DEFAULT_EXTENSIONS = ('.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.c', '.h',
+                      '.cc', '.cpp', '.hpp', '.cs', '.go', '.rb', '.rs', '.php')
+
+DEFAULT_EXCLUDED_DIRS = {'.git', '.hg', '.svn', 'node_modules', '__pycache__',
+                         'dist', 'build', '.venv', 'venv', '.tox', '.mypy_cache'}
+
+
+class CloneDetector:
+    """
+    Find clone pairs and clone classes across a directory tree.
+
+    A clone is a run of at least ``min_clone_lines`` meaningful lines whose
+    lines match one-to-one at or above ``similarity_threshold``.
+    """
+
+    def __init__(self, analyzer: Optional[CodeSimilarityAnalyzer] = None,
+                 similarity_threshold: float = 0.7,
+                 min_clone_lines: int = 3,
+                 max_gap: int = 1,
+                 max_postings: int = 200,
+                 extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+                 excluded_dirs: Iterable[str] = DEFAULT_EXCLUDED_DIRS):
+        self.analyzer = analyzer or CodeSimilarityAnalyzer()
+        self.similarity_threshold = similarity_threshold
+        self.min_clone_lines = min_clone_lines
+        # Number of unmatched lines allowed inside a clone run
+        self.max_gap = max_gap
+        # Blocking keys shared by more files than this are too common to be useful
+        self.max_postings = max_postings
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self.excluded_dirs = set(excluded_dirs)
+
+        self.files: List[str] = []
+        # Per file: list of (line_number, line) for meaningful lines
+        self.file_lines: List[List[Tuple[int, str]]] = []
+        # Per file: precomputed scorer features of every meaningful line
+        self.line_features: List[List[LineFeatures]] = []
+        # Per file: blocking keys of every meaningful line
+        self.line_keys: List[List[Set[str]]] = []
+        self.postings: Dict[str, Set[int]] = defaultdict(set)
+
+    def _block_keys(self, features: LineFeatures) -> Set[str]:
+        """Blocking keys for a line: its adjacent token bigrams (or the single token)."""
+        tokens = features.tokens
+        if len(tokens) < 2:
+            return set(tokens)
+        return {f"{tokens[k]} {tokens[k + 1]}" for k in range(len(tokens) - 1)}
+
+    def index_file(self, filepath: str, display_name: Optional[str] = None) -> bool:
+        """Add a single file to the index. Returns False if it has no meaningful code."""
+        code = self.analyzer.read_source(filepath)
+        if code is None:
+            return False
+
+        meaningful = self.analyzer.extract_meaningful_lines(code, detect_language(filepath))
+        if len(meaningful) < self.min_clone_lines:
+            return False
+
+        file_id = len(self.files)
+        self.files.append(display_name or filepath)
+        self.file_lines.append([(line_number, line) for line_number, line, _ in meaningful])
+        features = [self.analyzer.extract_line_features(code_line, comments_stripped=True)
+                    for _, _, code_line in meaningful]
+        self.line_features.append(features)
+        keys = [self._block_keys(line_features) for line_features in features]
+        self.line_keys.append(keys)
+        for line_keys in keys:
+            for key in line_keys:
+                self.postings[key].add(file_id)
+        return True
+
+    def index_directory(self, root: str) -> int:
+        """Index every matching source file under root. Returns the number of files indexed."""
+        indexed = 0
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = sorted(d for d in dirnames if d not in self.excluded_dirs)
+            for filename in sorted(filenames):
+                if not filename.lower().endswith(self.extensions):
+                    continue
+                path = os.path.join(dirpath, filename)
+                if self.index_file(path, os.path.relpath(path, root)):
+                    indexed += 1
+        return indexed
+
+    def candidate_pairs(self) -> List[Tuple[int, int]]:
+        """
+        Return file pairs (i, j) with i <= j that share enough blocking keys to
+        possibly contain a clone. Pairs with i == j are intra-file candidates.
+        """
+        shared = defaultdict(int)
+        for key, file_ids in self.postings.items():
+            if len(file_ids) < 2 or len(file_ids) > self.max_postings:
+                continue
+            ordered = sorted(file_ids)
+            for x in range(len(ordered)):
+                for y in range(x + 1, len(ordered)):
+                    shared[(ordered[x], ordered[y])] += 1
+
+        pairs = [pair for pair, count in shared.items() if count >= self.min_clone_lines]
+
+        # Intra-file candidates: keys repeated on several lines of the same file
+        for file_id, keys in enumerate(self.line_keys):
+            key_counts = defaultdict(int)
+            for line_keys in keys:
+                for key in line_keys:
+                    key_counts[key] += 1
+            if sum(1 for count in key_counts.values() if count > 1) >= self.min_clone_lines:
+                pairs.append((file_id, file_id))
+
+        pairs.sort()
+        return pairs
+
+    def _match_file_pair(self, file_a: int, file_b: int) -> List[Tuple[int, int, float]]:
+        """One-to-one line matches between two indexed files, scoring only blocked line pairs."""
+        features_a = self.line_features[file_a]
+        features_b = self.line_features[file_b]
+        keys_a = self.line_keys[file_a]
+        keys_b = self.line_keys[file_b]
+        same_file = file_a == file_b
+
+        lines_by_key = defaultdict(list)
+        for j, line_keys in enumerate(keys_b):
+            for key in line_keys:
+                lines_by_key[key].append(j)
+
+        potential_matches = []
+        for i, line_keys in enumerate(keys_a):
+            candidates = set()
+            for key in line_keys:
+                candidates.update(lines_by_key.get(key, ()))
+            for j in candidates:
+                # Skip the diagonal and the mirrored half of a self-comparison
+                if same_file and j <= i:
+                    continue
+                score = self.analyzer.similarity_from_features(features_a[i], features_b[j])
+                if score >= self.similarity_threshold:
+                    potential_matches.append((i, j, score))
+
+        potential_matches.sort(key=lambda x: (-x[2], x[0], x[1]))
+        matches = []
+        used_a, used_b = set(), set()
+        for i, j, score in potential_matches:
+            if i not in used_a and j not in used_b:
+                matches.append((i, j, score))
+                used_a.add(i)
+                used_b.add(j)
+        return matches
+
+    def _chain_runs(self, matches: List[Tuple[int, int, float]]) -> List[List[Tuple[int, int, float]]]:
+        """Group line matches into runs that advance in both files with small gaps."""
+        runs = []
+        run_ending_at = {}
+        for i, j, score in sorted(matches):
+            run = None
+            for di in range(1, self.max_gap + 2):
+                for dj in range(1, self.max_gap + 2):
+                    run = run_ending_at.pop((i - di, j - dj), None)
+                    if run is not None:
+                        break
+                if run is not None:
+                    break
+            if run is None:
+                run = []
+                runs.append(run)
+            run.append((i, j, score))
+            run_ending_at[(i, j)] = run
+        return [run for run in runs if len(run) >= self.min_clone_lines]
+
+    def find_clone_pairs(self) -> List[Dict]:
+        """Find clone pairs among all indexed files, ranked by size then similarity."""
+        clone_pairs = []
+        for file_a, file_b in self.candidate_pairs():
+            matches = self._match_file_pair(file_a, file_b)
+            for run in self._chain_runs(matches):
+                lines_a = self.file_lines[file_a]
+                lines_b = self.file_lines[file_b]
+                start_a, end_a = lines_a[run[0][0]][0], lines_a[run[-1][0]][0]
+                start_b, end_b = lines_b[run[0][1]][0], lines_b[run[-1][1]][0]
+                # A block can't be a clone of a region overlapping itself
+                if file_a == file_b and start_b <= end_a:
+                    continue
+                clone_pairs.append({
+                    'file_a': self.files[file_a],
+                    'start_a': start_a,
+                    'end_a': end_a,
+                    'file_b': self.files[file_b],
+                    'start_b': start_b,
+                    'end_b': end_b,
+                    'matched_lines': len(run),
+                    'average_similarity': round(sum(s for _, _, s in run) / len(run), 3),
+                })
+
+        clone_pairs.sort(key=lambda p: (-p['matched_lines'], -p['average_similarity'],
+                                        p['file_a'], p['start_a']))
+        return clone_pairs
+
+    def find_clone_classes(self, clone_pairs: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Merge clone pairs into clone classes: groups of fragments that are all
+        copies of each other. Overlapping fragments in the same file are merged.
+        """
+        if clone_pairs is None:
+            clone_pairs = self.find_clone_pairs()
+
+        fragments = []
+        parent = []
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        def union(x, y):
+            root_x, root_y = find(x), find(y)
+            if root_x != root_y:
+                parent[root_y] = root_x
+
+        pair_scores = []
+        for pair in clone_pairs:
+            for side in ('a', 'b'):
+                fragments.append((pair[f'file_{side}'], pair[f'start_{side}'], pair[f'end_{side}']))
+                parent.append(len(parent))
+            union(len(fragments) - 2, len(fragments) - 1)
+            pair_scores.append((len(fragments) - 2, pair['matched_lines'], pair['average_similarity']))
+
+        # Fragments in the same file that overlap describe the same code block
+        by_file = defaultdict(list)
+        for index, (filename, start, end) in enumerate(fragments):
+            by_file[filename].append((start, end, index))
+        for spans in by_file.values():
+            spans.sort()
+            current_end, current_index = None, None
+            for start, end, index in spans:
+                if current_end is not None and start <= current_end:
+                    union(current_index, index)
+                    current_end = max(current_end, end)
+                else:
+                    current_end, current_index = end, index
+
+        groups = defaultdict(list)
+        for index in range(len(fragments)):
+            groups[find(index)].append(index)
+
+        stats = defaultdict(lambda: [0, 0.0, 0])
+        for index, matched_lines, similarity in pair_scores:
+            entry = stats[find(index)]
+            entry[0] = max(entry[0], matched_lines)
+            entry[1] += similarity
+            entry[2] += 1
+
+        clone_classes = []
+        for root, indices in groups.items():
+            # Collapse overlapping fragments into their covering span
+            spans = defaultdict(list)
+            for index in indices:
+                filename, start, end = fragments[index]
+                spans[filename].append((start, end))
+            merged = []
+            for filename, file_spans in spans.items():
+                file_spans.sort()
+                start, end = file_spans[0]
+                for next_start, next_end in file_spans[1:]:
+                    if next_start <= end:
+                        end = max(end, next_end)
+                    else:
+                        merged.append({'file': filename, 'start_line': start, 'end_line': end})
+                        start, end = next_start, next_end
+                merged.append({'file': filename, 'start_line': start, 'end_line': end})
+            merged.sort(key=lambda f: (f['file'], f['start_line']))
+
+            matched_lines, similarity_total, pair_count = stats[root]
+            clone_classes.append({
+                'fragments': merged,
+                'fragment_count': len(merged),
+                'matched_lines': matched_lines,
+                'average_similarity': round(similarity_total / pair_count, 3) if pair_count else 0.0,
+                # Lines that could be removed by extracting the clone once
+                'duplicated_lines': matched_lines * (len(merged) - 1),
+            })
+
+        clone_classes.sort(key=lambda c: (-c['duplicated_lines'], -c['average_similarity'],
+                                          c['fragments'][0]['file'], c['fragments'][0]['start_line']))
+        return clone_classes
+
+    def detect(self, root: str) -> List[Dict]:
+        """Index root and return its clone classes ranked by duplicated lines."""
+        self.index_directory(root)
+        return self.find_clone_classes()
+
+
+def print_clone_report(clone_classes: List[Dict], limit: int = 20):
+    """Print a ranked clone class report."""
+    print("=" * 80)
+    print("CLONE DETECTION REPORT")
+    print("=" * 80)
+    print(f"Clone classes found: {len(clone_classes)}")
+    print("-" * 80)
+    for rank, clone_class in enumerate(clone_classes[:limit], start=1):
+        print(f"{rank}. {clone_class['fragment_count']} fragments, "
+              f"{clone_class['matched_lines']} matched lines, "
+              f"average similarity {clone_class['average_similarity']:.3f}")
+        for fragment in clone_class['fragments']:
+            print(f"     {fragment['file']}:{fragment['start_line']}-{fragment['end_line']}")
+    print("=" * 80)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Find duplicated code blocks under a directory tree")
+    parser.add_argument('root', help="Directory to scan")
+    parser.add_argument('--threshold', type=float, default=0.7, help="Line similarity threshold (default 0.7)")
+    parser.add_argument('--min-lines', type=int, default=3, help="Minimum clone length in lines (default 3)")
+    parser.add_argument('--limit', type=int, default=20, help="Number of clone classes to print (default 20)")
+    args = parser.parse_args(argv)
+
+    detector = CloneDetector(similarity_threshold=args.threshold, min_clone_lines=args.min_lines)
+    indexed = detector.index_directory(args.root)
+    print(f"Indexed {indexed} files under {args.root}")
+    print_clone_report(detector.find_clone_classes(), args.limit)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+File-level, language-aware comment and string lexer.
+
+Scans a whole source file once with a single compiled pattern per language,
+removing comments (including multi-line block comments and Python docstrings)
+while leaving string literals intact, so that '#' or '//' inside a string is
+never mistaken for a comment. Newlines are preserved so the output lines stay
+aligned with the input lines.
+"""
+
+import os
+import re
+from typing import List, Optional
+
+
+LANGUAGE_EXTENSIONS = {
+    '.py': 'python',
+    '.pyw': 'python',
+    '.java': 'java',
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.mjs': 'javascript',
+    '.cjs': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+}
+
+_PATTERNS = {
+    'python': (
+        r'(?P<string>(?:"""[\s\S]*?(?:"""|\Z)|\'\'\'[\s\S]*?(?:\'\'\'|\Z)'
+        r'|"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?))'
+        r'|(?P<comment>#[^\n]*)'
+    ),
+    'java': (
+        r'(?P<string>"""[\s\S]*?(?:"""|\Z)|"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?)'
+        r'|(?P<comment>/\*[\s\S]*?(?:\*/|\Z)|//[^\n]*)'
+    ),
+    'javascript': (
+        r'(?P<string>`(?:\\[\s\S]|[^`\\])*`?|"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?)'
+        r'|(?P<comment>/\*[\s\S]*?(?:\*/|\Z)|//[^\n]*)'
+    ),
+    # Unknown languages: accept every comment style the per-line regex handled
+    'generic': (
+        r'(?P<string>"(?:\\.|[^"\\\n])*"?|\'(?:\\.|[^\'\\\n])*\'?)'
+        r'|(?P<comment>/\*[\s\S]*?(?:\*/|\Z)|<!--[\s\S]*?(?:-->|\Z)|//[^\n]*|#[^\n]*)'
+    ),
+}
+_PATTERNS['typescript'] = _PATTERNS['javascript']
+
+_COMPILED = {language: re.compile(pattern) for language, pattern in _PATTERNS.items()}
+
+SUPPORTED_LANGUAGES = tuple(sorted(_PATTERNS))
+
+
+def detect_language(filepath: Optional[str]) -> str:
+    """Guess the lexer language from a file extension, falling back to 'generic'."""
+    if not filepath:
+        return 'generic'
+    return LANGUAGE_EXTENSIONS.get(os.path.splitext(filepath)[1].lower(), 'generic')
+
+
+def _is_python_docstring(code: str, start: int, end: int) -> bool:
+    """A string is a docstring when it is the only thing on its logical line."""
+    line_start = code.rfind('\n', 0, start) + 1
+    # String prefixes (r, b, u, f) are left outside the match
+    if code[line_start:start].strip() not in ('', 'r', 'R', 'u', 'U'):
+        return False
+    rest_end = code.find('\n', end)
+    rest = code[end:] if rest_end == -1 else code[end:rest_end]
+    rest = rest.strip()
+    return not rest or rest.startswith('#') or rest == ';'
+
+
+def strip_comments(code: str, language: Optional[str] = None) -> List[str]:
+    """
+    Remove comments from source code in a single pass.
+
+    Args:
+        code: Full source text
+        language: One of SUPPORTED_LANGUAGES (default 'generic')
+
+    Returns:
+        The code split into lines, with comments removed and string literals
+        kept; line i of the output corresponds to line i of the input
+    """
+    pattern = _COMPILED.get(language or 'generic')
+    if pattern is None:
+        raise ValueError(f"Unsupported language '{language}', expected one of {SUPPORTED_LANGUAGES}")
+
+    pieces = []
+    position = 0
+    for match in pattern.finditer(code):
+        start, end = match.span()
+        pieces.append(code[position:start])
+        text = match.group()
+        if match.lastgroup == 'comment' or (
+                language == 'python' and text.endswith(('"""', "'''"))
+                and _is_python_docstring(code, start, end)):
+            # Drop the comment but keep its line breaks
+            pieces.append('\n' * text.count('\n'))
+        else:
+            pieces.append(text)
+        position = end
+    pieces.append(code[position:])
+
+    return ''.join(pieces).split('\n')
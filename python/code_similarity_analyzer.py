@@ -2,17 +2,86 @@ import re
 import difflib
 import string
 import hashlib
-from typing import List, Tuple, Dict, Set
-from collections import defaultdict
+import heapq
+import time
+import threading
+from contextlib import contextmanager
+from typing import List, Tuple, Dict, Set, FrozenSet, NamedTuple, Optional, TYPE_CHECKING
+from collections import defaultdict, deque
 import unicodedata
 
+try:
+    from .code_lexer import strip_comments, detect_language
+    from .canonicalizer import canonicalize_lines
+    from .ast_engine import match_python_lines
+    from .block_matcher import match_hierarchical
+    from .suffix_engine import match_token_runs
+    from .window_matcher import match_windows, DEFAULT_WINDOW_TOKENS
+    from .candidate_spill import SpillingSorter, budget_entries
+    from .anytime import match_anytime
+    from .sampling_estimator import estimate_similarity
+    from .result_store import content_hash
+    from .profiling import profile_call, format_profile, write_profile_bundle
+except ImportError:  # Running this file directly as a script
+    from code_lexer import strip_comments, detect_language
+    from canonicalizer import canonicalize_lines
+    from ast_engine import match_python_lines
+    from block_matcher import match_hierarchical
+    from suffix_engine import match_token_runs
+    from window_matcher import match_windows, DEFAULT_WINDOW_TOKENS
+    from candidate_spill import SpillingSorter, budget_entries
+    from anytime import match_anytime
+    from sampling_estimator import estimate_similarity
+    from result_store import content_hash
+    from profiling import profile_call, format_profile, write_profile_bundle
+
+if TYPE_CHECKING:
+    from .metrics import MetricsRegistry
+
+
+# Compiled once; these run for every line of every input
+_WORD_PATTERN = re.compile(r'\b\w+\b')
+_TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+_STRUCTURAL_PATTERNS = [
+    (re.compile(r'\b\w+\s*\(.*?\)'), 'function_call'),
+    (re.compile(r'\b\w+\s*='), 'assignment'),
+    (re.compile(r'\[.*?\]'), 'indexing'),
+    (re.compile(r'\{.*?\}'), 'block_or_object'),
+    (re.compile(r'"[^"]*"'), 'string_literal'),
+    (re.compile(r"'[^']*'"), 'string_literal'),
+    (re.compile(r'\b\d+(\.\d+)?\b'), 'numeric_literal'),
+]
+
+
+class LineFeatures(NamedTuple):
+    """Everything the line scorer needs, computed once per line."""
+    blank: bool
+    normalized: str
+    tokens: List[str]
+    token_set: FrozenSet[str]
+    features: FrozenSet[str]
+
+
+class PairTally:
+    """Line pairs scored during one analysis."""
+    __slots__ = ('count',)
+    
+    def __init__(self):
+        self.count = 0
+
+
 class CodeSimilarityAnalyzer:
     """
     A focused code similarity analyzer for detecting similar code within the same programming language.
     Optimized for accuracy in plagiarism detection and identifying code modifications.
     """
     
-    def __init__(self):
+    def __init__(self, metrics: Optional['MetricsRegistry'] = None):
+        # Optional MetricsRegistry updated once per analysis phase
+        self.metrics = metrics
+        # Per thread: the PairTally of the analysis running on it, if any
+        self._scoring = threading.local()
+        
         # Language-agnostic structural patterns for same-language comparison
         self.structural_keywords = {
             'if', 'else', 'elif', 'for', 'while', 'do', 'switch', 'case', 
@@ -22,29 +91,33 @@ class CodeSimilarityAnalyzer:
         
         self.operators = {'+', '-', '*', '/', '%', '=', '==', '!=', '<', '>', '<=', '>=',
                          '&&', '||', '!', '&', '|', '^', '++', '--'}
+    
+    # Matching engines accepted by analyze_code_similarity
+    ENGINES = ('line', 'ast', 'block', 'suffix', 'window')
+    
+    # Stored results are keyed by this; bump it whenever scores can change
+    VERSION = '1.1.0'
         
     def normalize_line(self, line: str) -> str:
         """Normalize a line of code for comparison."""
         # Remove common comment patterns
         line = re.sub(r'//.*$|#.*$|/\*.*?\*/|<!--.*?-->', '', line, flags=re.DOTALL)
         
-        # Normalize whitespace
-        line = re.sub(r'\s+', ' ', line.strip())
-        
-        # Convert to lowercase for comparison
-        line = line.lower()
-        
-        return line
-        
-        return line
+        return self._normalize_code(line)
+    
+    def _normalize_code(self, line: str) -> str:
+        """Normalize whitespace and case of a line that has no comments left in it."""
+        return ' '.join(line.split()).lower()
     
     def extract_structural_features(self, line: str) -> Set[str]:
         """Extract key structural features from a line of code for same-language comparison."""
+        return self._structural_features_normalized(self.normalize_line(line))
+    
+    def _structural_features_normalized(self, normalized: str) -> Set[str]:
         features = set()
-        normalized = self.normalize_line(line)
         
         # Extract keywords that indicate code structure
-        words = re.findall(r'\b\w+\b', normalized)
+        words = _WORD_PATTERN.findall(normalized)
         for word in words:
             if word in self.structural_keywords:
                 features.add(f"keyword:{word}")
@@ -55,28 +128,19 @@ class CodeSimilarityAnalyzer:
                 features.add(f"operator:{op}")
         
         # Extract specific patterns for same-language detection
-        patterns = {
-            r'\b\w+\s*\(.*?\)': 'function_call',
-            r'\b\w+\s*=': 'assignment',
-            r'\[.*?\]': 'indexing',
-            r'\{.*?\}': 'block_or_object',
-            r'"[^"]*"': 'string_literal',
-            r"'[^']*'": 'string_literal',
-            r'\b\d+(\.\d+)?\b': 'numeric_literal',
-        }
-        
-        for pattern, feature in patterns.items():
-            if re.search(pattern, normalized):
+        for pattern, feature in _STRUCTURAL_PATTERNS:
+            if pattern.search(normalized):
                 features.add(feature)
         
         return features
     
     def tokenize_line(self, line: str) -> List[str]:
         """Tokenize a line into meaningful code tokens."""
-        normalized = self.normalize_line(line)
-        
+        return self._tokenize_normalized(self.normalize_line(line))
+    
+    def _tokenize_normalized(self, normalized: str) -> List[str]:
         # Extract meaningful tokens (identifiers, operators, literals)
-        tokens = re.findall(r'\w+|[^\w\s]', normalized)
+        tokens = _TOKEN_PATTERN.findall(normalized)
         
         # Filter meaningful tokens
         filtered_tokens = []
@@ -87,14 +151,55 @@ class CodeSimilarityAnalyzer:
         
         return filtered_tokens
     
+    def extract_line_features(self, line: str, comments_stripped: bool = False) -> LineFeatures:
+        """
+        Normalize, tokenize and extract structural features of a line in one go.
+        
+        Set comments_stripped for lines produced by the lexer so that '#' or '//'
+        inside string literals is not treated as a comment again.
+        """
+        normalized = self._normalize_code(line) if comments_stripped else self.normalize_line(line)
+        tokens = self._tokenize_normalized(normalized)
+        return LineFeatures(
+            blank=not line.strip(),
+            normalized=normalized,
+            tokens=tokens,
+            token_set=frozenset(tokens),
+            features=frozenset(self._structural_features_normalized(normalized)),
+        )
+    
     def calculate_line_similarity(self, line_a: str, line_b: str) -> float:
         """Calculate similarity between two lines of the same programming language."""
         if not line_a.strip() or not line_b.strip():
             return 0.0
         
+        return self.similarity_from_features(self.extract_line_features(line_a),
+                                             self.extract_line_features(line_b))
+    
+    @contextmanager
+    def counting_pairs(self):
+        """
+        Count the line pairs this thread scores inside the block in a fresh
+        PairTally. Concurrent analyses on other threads keep their own tallies.
+        """
+        previous = getattr(self._scoring, 'tally', None)
+        tally = self._scoring.tally = PairTally()
+        try:
+            yield tally
+        finally:
+            self._scoring.tally = previous
+    
+    def similarity_from_features(self, line_a: LineFeatures, line_b: LineFeatures) -> float:
+        """Calculate line similarity from precomputed line features."""
+        tally = getattr(self._scoring, 'tally', None)
+        if tally is not None:
+            tally.count += 1
+        if line_a.blank or line_b.blank:
+            return 0.0
+        
         # Exact match after normalization
-        norm_a = self.normalize_line(line_a)
-        norm_b = self.normalize_line(line_b)
+        norm_a = line_a.normalized
+        norm_b = line_b.normalized
         
         if norm_a == norm_b:
             return 1.0
@@ -109,10 +214,10 @@ class CodeSimilarityAnalyzer:
             return 1.0 if norm_a == norm_b else 0.0
         
         # Get tokens and features
-        tokens_a = self.tokenize_line(line_a)
-        tokens_b = self.tokenize_line(line_b)
-        features_a = self.extract_structural_features(line_a)
-        features_b = self.extract_structural_features(line_b)
+        tokens_a = line_a.tokens
+        tokens_b = line_b.tokens
+        features_a = line_a.features
+        features_b = line_b.features
         
         if not tokens_a or not tokens_b:
             return 0.0
@@ -120,8 +225,8 @@ class CodeSimilarityAnalyzer:
         # Calculate different similarity metrics
         
         # 1. Token-based Jaccard similarity
-        set_a = set(tokens_a)
-        set_b = set(tokens_b)
+        set_a = line_a.token_set
+        set_b = line_b.token_set
         jaccard = len(set_a & set_b) / len(set_a | set_b) if set_a | set_b else 0.0
         
         # 2. Sequence similarity (order matters for code)
@@ -169,40 +274,90 @@ class CodeSimilarityAnalyzer:
         
         return max(0.0, similarity)
     
-    def preprocess_file(self, filepath: str) -> List[str]:
-        """Read and preprocess a file, extracting meaningful code lines."""
+    def read_source(self, filepath: str) -> Optional[str]:
+        """Read a source file, returning None if it can't be read."""
         try:
             with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
+                return f.read()
         except Exception as e:
             print(f"Error reading file {filepath}: {e}")
+            return None
+    
+    def preprocess_file(self, filepath: str, language: Optional[str] = None) -> List[str]:
+        """Read and preprocess a file, extracting meaningful code lines."""
+        code = self.read_source(filepath)
+        if code is None:
             return []
         
-        # Filter for meaningful code lines
-        meaningful_lines = []
-        for line in lines:
-            normalized = self.normalize_line(line)
-            # Keep lines that have substantial content
-            if normalized and len(normalized) > 3 and not self._is_trivial_line(normalized):
-                meaningful_lines.append(line.rstrip())
-        
-        return meaningful_lines
+        language = language or detect_language(filepath)
+        return [line for _, line, _ in self.extract_meaningful_lines(code, language)]
     
-    def preprocess_code_fragment(self, code: str) -> List[str]:
+    def preprocess_code_fragment(self, code: str, language: Optional[str] = None) -> List[str]:
         """Process a code fragment string into meaningful lines."""
         if not code:
             return []
         
-        # Split into lines
-        lines = code.split('\n')
+        return [line for _, line, _ in self.extract_meaningful_lines(code, language)]
+    
+    def read_input(self, input_value: str, is_file: bool = True,
+                   language: Optional[str] = None) -> Tuple[str, str]:
+        """Return the source text of a file or fragment and its lexer language."""
+        if is_file:
+            code = self.read_source(input_value)
+            return code or '', language or detect_language(input_value)
+        return input_value or '', language or 'generic'
+    
+    def preprocess_features(self, input_value: str, is_file: bool = True,
+                            language: Optional[str] = None) -> List[LineFeatures]:
+        """Preprocess a file or code fragment straight into per-line scorer features."""
+        code, language = self.read_input(input_value, is_file, language)
+        if not code:
+            return []
+        
+        return [self.extract_line_features(code_line, comments_stripped=True)
+                for _, _, code_line in self.extract_meaningful_lines(code, language)]
+
+    def preprocess_code(self, code: str, language: str,
+                        feature_cache=None) -> Tuple[List[Tuple[int, str, str]], List[LineFeatures]]:
+        """
+        Meaningful lines of source code and their scorer features.
+        
+        feature_cache, if given, is consulted by content hash and language
+        first and fed with newly preprocessed code; callers must not modify
+        the returned lists.
+        """
+        if not code:
+            return [], []
+        if feature_cache is not None:
+            code_hash = content_hash(code)
+            cached = feature_cache.get(code_hash, language)
+            if cached is not None:
+                return cached
+        meaningful = self.extract_meaningful_lines(code, language)
+        features = [self.extract_line_features(code_line, comments_stripped=True)
+                    for _, _, code_line in meaningful]
+        if feature_cache is not None:
+            feature_cache.put(code_hash, language, (meaningful, features))
+        return meaningful, features
+    
+    def extract_meaningful_lines(self, code: str,
+                                 language: Optional[str] = None) -> List[Tuple[int, str, str]]:
+        """
+        Lex source code once and keep its meaningful lines.
+        
+        Returns:
+            (line_number, original_line, code_line) tuples where line_number is
+            1-based and code_line is the line with comments removed
+        """
+        raw_lines = code.split('\n')
+        code_lines = strip_comments(code, language)
         
-        # Filter for meaningful code lines
         meaningful_lines = []
-        for line in lines:
-            normalized = self.normalize_line(line)
+        for line_number, (line, code_line) in enumerate(zip(raw_lines, code_lines), start=1):
+            normalized = self._normalize_code(code_line)
             # Keep lines that have substantial content
             if normalized and len(normalized) > 3 and not self._is_trivial_line(normalized):
-                meaningful_lines.append(line.rstrip())
+                meaningful_lines.append((line_number, line.rstrip(), code_line))
         
         return meaningful_lines
 
@@ -231,34 +386,73 @@ class CodeSimilarityAnalyzer:
         return False
     
     def find_similar_lines(self, lines_a: List[str], lines_b: List[str], 
-                          threshold: float = 0.7) -> List[Tuple[int, int, float]]:
+                          threshold: float = 0.7,
+                          max_memory_mb: Optional[float] = None) -> List[Tuple[int, int, float]]:
         """Find similar lines between two sets of lines using optimal matching."""
-        # Calculate similarity matrix
-        similarity_matrix = []
-        for i, line_a in enumerate(lines_a):
-            row = []
-            for j, line_b in enumerate(lines_b):
-                similarity = self.calculate_line_similarity(line_a, line_b)
-                row.append(similarity if similarity >= threshold else 0.0)
-            similarity_matrix.append(row)
-        
-        # Find optimal one-to-one matching using greedy approach
-        similar_matches = []
-        used_b_indices = set()
+        features_a = [self.extract_line_features(line) for line in lines_a]
+        features_b = [self.extract_line_features(line) for line in lines_b]
+        return self.match_line_features(features_a, features_b, threshold, max_memory_mb=max_memory_mb)
+    
+    def match_line_features(self, features_a: List[LineFeatures], features_b: List[LineFeatures],
+                            threshold: float = 0.7,
+                            max_candidates_per_line: Optional[int] = None,
+                            max_memory_mb: Optional[float] = None) -> List[Tuple[int, int, float]]:
+        """
+        Find similar lines between two preprocessed line feature lists.
         
-        # Create list of all potential matches above threshold
-        potential_matches = []
-        for i in range(len(lines_a)):
-            for j in range(len(lines_b)):
-                if similarity_matrix[i][j] >= threshold:
-                    potential_matches.append((i, j, similarity_matrix[i][j]))
+        With max_candidates_per_line=K, only each line's K best partners (on
+        either side) are kept while scoring, so memory stays O((N+M)*K) instead
+        of growing with every pair above the threshold.
+        
+        With max_memory_mb, candidates beyond the budget are spilled to
+        temporary files as sorted runs and merge-streamed into the greedy
+        selection; the result is identical to the in-memory path.
+        """
+        if max_memory_mb is not None and max_candidates_per_line is None:
+            with SpillingSorter(budget_entries(max_memory_mb)) as sorter:
+                for i, line_a in enumerate(features_a):
+                    for j, line_b in enumerate(features_b):
+                        similarity = self.similarity_from_features(line_a, line_b)
+                        if similarity >= threshold:
+                            sorter.add(i, j, similarity)
+                return self.select_matches(sorter)
+        
+        potential_matches = self.score_line_pairs(features_a, features_b, threshold,
+                                                  max_candidates_per_line)
+        return self.select_matches(potential_matches)
+    
+    def score_line_pairs(self, features_a: List[LineFeatures], features_b: List[LineFeatures],
+                         threshold: float = 0.7,
+                         max_candidates_per_line: Optional[int] = None) -> List[Tuple[int, int, float]]:
+        """Score line pairs and return those above threshold, best first."""
+        if max_candidates_per_line is not None:
+            potential_matches = self._top_candidates(features_a, features_b, threshold,
+                                                     max_candidates_per_line)
+        else:
+            # Create list of all potential matches above threshold
+            potential_matches = []
+            for i, line_a in enumerate(features_a):
+                for j, line_b in enumerate(features_b):
+                    similarity = self.similarity_from_features(line_a, line_b)
+                    if similarity >= threshold:
+                        potential_matches.append((i, j, similarity))
         
         # Sort by similarity score (descending) to prioritize best matches
         potential_matches.sort(key=lambda x: x[2], reverse=True)
-        
-        # Greedily select non-conflicting matches
+        return potential_matches
+    
+    def select_matches(self, potential_matches: List[Tuple[int, int, float]],
+                       threshold: Optional[float] = None) -> List[Tuple[int, int, float]]:
+        """
+        Greedily select non-conflicting matches from candidates sorted best
+        first, stopping at the first candidate below threshold (if given).
+        """
+        similar_matches = []
         used_a_indices = set()
+        used_b_indices = set()
         for i, j, score in potential_matches:
+            if threshold is not None and score < threshold:
+                break
             if i not in used_a_indices and j not in used_b_indices:
                 similar_matches.append((i, j, score))
                 used_a_indices.add(i)
@@ -266,9 +460,193 @@ class CodeSimilarityAnalyzer:
         
         return similar_matches
     
+    def _top_candidates(self, features_a: List[LineFeatures], features_b: List[LineFeatures],
+                        threshold: float, k: int) -> List[Tuple[int, int, float]]:
+        """Above-threshold pairs that rank in the top k of their A-line or their B-line."""
+        if k < 1:
+            raise ValueError("max_candidates_per_line must be at least 1")
+        # Min-heaps whose root is the weakest kept candidate; on equal scores
+        # the later pair is weaker, matching the stable sort of the full list
+        heaps_a = [[] for _ in features_a]
+        heaps_b = [[] for _ in features_b]
+        for i, line_a in enumerate(features_a):
+            heap_a = heaps_a[i]
+            for j, line_b in enumerate(features_b):
+                similarity = self.similarity_from_features(line_a, line_b)
+                if similarity < threshold:
+                    continue
+                for heap, entry in ((heap_a, (similarity, -j)), (heaps_b[j], (similarity, -i))):
+                    if len(heap) < k:
+                        heapq.heappush(heap, entry)
+                    elif entry > heap[0]:
+                        heapq.heapreplace(heap, entry)
+        
+        candidates = {(i, -neg_j): score for i, heap in enumerate(heaps_a) for score, neg_j in heap}
+        candidates.update(((-neg_i, j), score) for j, heap in enumerate(heaps_b) for score, neg_i in heap)
+        return [(i, j, score) for (i, j), score in sorted(candidates.items())]
+    
+    def match_with_canonical_fast_path(self, features_a: List[LineFeatures],
+                                       features_b: List[LineFeatures],
+                                       threshold: float = 0.7,
+                                       max_candidates_per_line: Optional[int] = None,
+                                       max_memory_mb: Optional[float] = None) -> Tuple[List[Tuple[int, int, float]], int]:
+        """
+        Match lines whose rename-invariant canonical forms are equal by hashing,
+        then fuzzy-score only the lines left over.
+        
+        Canonical matches keep their real similarity score, raised to the
+        threshold when renaming pushed it below.
+        
+        Returns:
+            (similar_matches, number of matches found by the canonical fast path)
+        """
+        canonical_a = canonicalize_lines([line.normalized for line in features_a])
+        canonical_b = canonicalize_lines([line.normalized for line in features_b])
+        
+        # Lines with fewer than three tokens canonicalize to generic shapes like 'return v1'
+        lines_by_canonical = defaultdict(deque)
+        for j, canonical in enumerate(canonical_b):
+            if len(features_b[j].tokens) >= 3:
+                lines_by_canonical[canonical].append(j)
+        
+        canonical_matches = []
+        for i, canonical in enumerate(canonical_a):
+            candidates = lines_by_canonical.get(canonical)
+            if candidates and len(features_a[i].tokens) >= 3:
+                j = candidates.popleft()
+                score = max(threshold, self.similarity_from_features(features_a[i], features_b[j]))
+                canonical_matches.append((i, j, score))
+        
+        return self.match_remaining_lines(features_a, features_b, canonical_matches, threshold,
+                                          max_candidates_per_line, max_memory_mb), len(canonical_matches)
+    
+    def match_remaining_lines(self, features_a: List[LineFeatures], features_b: List[LineFeatures],
+                              seed_matches: List[Tuple[int, int, float]],
+                              threshold: float = 0.7,
+                              max_candidates_per_line: Optional[int] = None,
+                              max_memory_mb: Optional[float] = None) -> List[Tuple[int, int, float]]:
+        """Keep one-to-one seed matches and fuzzy-match only the lines they leave unmatched."""
+        matched_a = {i for i, _, _ in seed_matches}
+        matched_b = {j for _, j, _ in seed_matches}
+        rest_a = [i for i in range(len(features_a)) if i not in matched_a]
+        rest_b = [j for j in range(len(features_b)) if j not in matched_b]
+        fuzzy_matches = self.match_line_features([features_a[i] for i in rest_a],
+                                                 [features_b[j] for j in rest_b], threshold,
+                                                 max_candidates_per_line, max_memory_mb)
+        
+        similar_matches = list(seed_matches) + [(rest_a[i], rest_b[j], score)
+                                                for i, j, score in fuzzy_matches]
+        similar_matches.sort(key=lambda x: x[2], reverse=True)
+        return similar_matches
+    
+    def match_with_ast_engine(self, code_a: str, code_b: str,
+                              meaningful_a: List[Tuple[int, str, str]],
+                              meaningful_b: List[Tuple[int, str, str]],
+                              features_a: List[LineFeatures], features_b: List[LineFeatures],
+                              threshold: float = 0.7,
+                              max_candidates_per_line: Optional[int] = None,
+                              max_memory_mb: Optional[float] = None) -> Optional[Tuple[List[Tuple[int, int, float]], int, int]]:
+        """
+        Match Python sources through hashed AST subtrees, then fuzzy-match the rest.
+        
+        Returns:
+            (similar_matches, matches found through the AST, matched subtrees),
+            or None if either input is not valid Python
+        """
+        ast_result = match_python_lines(code_a, code_b)
+        if ast_result is None:
+            return None
+        line_pairs, subtree_count = ast_result
+        
+        index_a = {line_number: i for i, (line_number, _, _) in enumerate(meaningful_a)}
+        index_b = {line_number: j for j, (line_number, _, _) in enumerate(meaningful_b)}
+        ast_matches = []
+        for line_a, line_b in line_pairs:
+            i, j = index_a.get(line_a), index_b.get(line_b)
+            if i is None or j is None:
+                continue
+            score = max(threshold, self.similarity_from_features(features_a[i], features_b[j]))
+            ast_matches.append((i, j, score))
+        
+        return (self.match_remaining_lines(features_a, features_b, ast_matches, threshold,
+                                           max_candidates_per_line, max_memory_mb),
+                len(ast_matches), subtree_count)
+    
+    def match_with_token_runs(self, features_a: List[LineFeatures], features_b: List[LineFeatures],
+                              threshold: float = 0.7,
+                              max_candidates_per_line: Optional[int] = None,
+                              max_memory_mb: Optional[float] = None) -> Tuple[List[Tuple[int, int, float]], Dict]:
+        """
+        Match lines covered by long common token runs (found across line
+        boundaries with a suffix array), then fuzzy-match the rest.
+        
+        Returns:
+            (similar_matches, stats with 'token_runs', 'run_tokens' and 'run_matches')
+        """
+        line_pairs, runs = match_token_runs(features_a, features_b)
+        similar_matches, seeded = self._seed_with_spans(features_a, features_b, line_pairs, threshold,
+                                                        max_candidates_per_line, max_memory_mb)
+        return similar_matches, {
+            'token_runs': len(runs),
+            'run_tokens': sum(length for _, _, length in runs),
+            'run_matches': seeded,
+        }
+    
+    def match_with_windows(self, features_a: List[LineFeatures], features_b: List[LineFeatures],
+                           threshold: float = 0.7, window_size: int = DEFAULT_WINDOW_TOKENS,
+                           max_candidates_per_line: Optional[int] = None,
+                           max_memory_mb: Optional[float] = None) -> Tuple[List[Tuple[int, int, float]], Dict]:
+        """
+        Match lines covered by spans of equal rolling-hashed token windows
+        (which may cross line boundaries), then fuzzy-match the rest.
+        
+        Returns:
+            (similar_matches, stats with 'window_spans', 'window_tokens' and 'window_matches')
+        """
+        line_pairs, spans = match_windows(features_a, features_b, window_size)
+        similar_matches, seeded = self._seed_with_spans(features_a, features_b, line_pairs, threshold,
+                                                        max_candidates_per_line, max_memory_mb)
+        return similar_matches, {
+            'window_spans': len(spans),
+            'window_tokens': sum(length for _, _, length in spans),
+            'window_matches': seeded,
+        }
+    
+    def _seed_with_spans(self, features_a: List[LineFeatures], features_b: List[LineFeatures],
+                         line_pairs: List[Tuple[int, int]], threshold: float,
+                         max_candidates_per_line: Optional[int],
+                         max_memory_mb: Optional[float]) -> Tuple[List[Tuple[int, int, float]], int]:
+        """Use one-to-one line pairs from token spans as seed matches."""
+        seeds = [(i, j, max(threshold, self.similarity_from_features(features_a[i], features_b[j])))
+                 for i, j in line_pairs]
+        return self.match_remaining_lines(features_a, features_b, seeds, threshold,
+                                          max_candidates_per_line, max_memory_mb), len(seeds)
+    
+    def result_store_key(self, code_a: str, code_b: str, language_a: str, language_b: str,
+                         similarity_threshold: float, engine: str = 'line', canonicalize: bool = False,
+                         max_candidates_per_line: Optional[int] = None,
+                         window_size: int = DEFAULT_WINDOW_TOKENS) -> Tuple[str, str, float, Dict]:
+        """(hash_a, hash_b, threshold, options) under which an analysis's results are stored."""
+        options = {'language_a': language_a, 'language_b': language_b, 'engine': engine,
+                   'canonicalize': canonicalize, 'max_candidates_per_line': max_candidates_per_line}
+        if engine == 'window':
+            options['window_size'] = window_size
+        return content_hash(code_a), content_hash(code_b), similarity_threshold, options
+    
     def analyze_code_similarity(self, input_a: str, input_b: str, 
                                similarity_threshold: float = 0.7, 
-                               is_file: bool = True) -> Dict:
+                               is_file: bool = True,
+                               verbose: bool = True,
+                               language: Optional[str] = None,
+                               canonicalize: bool = False,
+                               engine: str = 'line',
+                               max_candidates_per_line: Optional[int] = None,
+                               result_store=None,
+                               window_size: int = DEFAULT_WINDOW_TOKENS,
+                               max_memory_mb: Optional[float] = None,
+                               deadline_seconds: Optional[float] = None,
+                               profile: bool = False,
+                               feature_cache=None) -> Dict:
         """
         Analyze similarity between two code inputs (files or code fragments).
         
@@ -277,33 +655,253 @@ class CodeSimilarityAnalyzer:
             input_b: Path to second file or second code fragment
             similarity_threshold: Minimum similarity score to consider lines similar
             is_file: If True, inputs are file paths; if False, inputs are code fragments
+            verbose: If True, print progress messages to stdout
+            language: Lexer language (python, java, javascript, typescript, generic);
+                detected from the file extension when omitted
+            canonicalize: If True, match lines that are equal after identifier
+                renaming by hashing before fuzzy scoring the rest; the number of
+                such matches is reported as 'canonical_matches'
+            engine: 'line' for line-pair scoring, 'ast' to seed matches from
+                hashed Python AST subtrees (falls back to 'line' for other inputs),
+                'block' to score lines only inside the best-matching blocks,
+                'suffix' to seed matches from common token runs that may cross
+                line breaks (e.g. after reformatting), or 'window' to seed them
+                from equal rolling-hashed windows of window_size tokens
+            max_candidates_per_line: If set, keep only each line's best K
+                candidate partners before the greedy one-to-one selection
+                (not used by the 'block' engine, which prunes by block)
+            result_store: Optional ResultStore; results for previously analyzed
+                input contents and options are returned from it without
+                recomputation, and new results are saved to it
+            window_size: Tokens per rolling-hash window for the 'window' engine
+            max_memory_mb: Memory budget for buffered candidate line pairs;
+                beyond it they are spilled to temporary files (same results)
+            deadline_seconds: Time budget for the whole analysis (line engine
+                only). Identical and canonical lines are matched first, then
+                pairs are fuzzy scored by priority until the deadline; the
+                results carry 'partial', 'pairs_evaluated_fraction' and
+                'similarity_bounds', the range the complete result's
+                similarity_percentage must fall in
+            profile: If True, run under cProfile, tracemalloc and a stack
+                sampler and attach the summary as 'profile' (top functions by
+                cumulative time, top allocation sites, collapsed stacks)
+            feature_cache: Optional cache with get(code_hash, language) and
+                put(code_hash, language, preprocessed); inputs whose content
+                was seen before skip lexing and feature extraction
             
         Returns:
             Dictionary with analysis results
         """
+        if profile:
+            results, results_profile = profile_call(lambda: self.analyze_code_similarity(
+                input_a, input_b, similarity_threshold, is_file, verbose, language, canonicalize, engine,
+                max_candidates_per_line, result_store, window_size, max_memory_mb, deadline_seconds,
+                feature_cache=feature_cache))
+            results['profile'] = results_profile
+            return results
+        
         if is_file:
-            print(f"Analyzing similarity between files {input_a} and {input_b}")
+            if verbose:
+                print(f"Analyzing similarity between files {input_a} and {input_b}")
             source_a, source_b = input_a, input_b
-            # Read and preprocess files
-            lines_a = self.preprocess_file(input_a)
-            lines_b = self.preprocess_file(input_b)
         else:
-            print(f"Analyzing similarity between code fragments")
+            if verbose:
+                print(f"Analyzing similarity between code fragments")
             source_a, source_b = "Code Fragment A", "Code Fragment B"
-            # Process code fragments directly
-            lines_a = self.preprocess_code_fragment(input_a)
-            lines_b = self.preprocess_code_fragment(input_b)
         
-        print(f"Similarity threshold: {similarity_threshold}")
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {self.ENGINES}")
+        if deadline_seconds is not None and engine != 'line':
+            raise ValueError("deadline_seconds is only supported by the line engine")
+        deadline = time.perf_counter() + deadline_seconds if deadline_seconds is not None else None
+        metrics = self.metrics
+        phases = metrics.phase_timer() if metrics is not None else None
+        
+        # Lex and preprocess both inputs once
+        code_a, language_a = self.read_input(input_a, is_file, language)
+        code_b, language_b = self.read_input(input_b, is_file, language)
+        if phases:
+            phases.mark('read')
+        
+        store_key = None
+        # Deadline-bound results depend on timing, so they are never stored
+        if result_store is not None and code_a and code_b and deadline is None:
+            store_key = self.result_store_key(code_a, code_b, language_a, language_b, similarity_threshold,
+                                              engine, canonicalize, max_candidates_per_line, window_size)
+            stored = result_store.get(*store_key)
+            if metrics is not None:
+                phases.mark('store_lookup')
+                metrics.store_lookups.inc(result='hit' if stored is not None else 'miss')
+            if stored is not None:
+                if verbose:
+                    print("Using stored results")
+                stored.update({'input_a': source_a, 'input_b': source_b, 'is_file': is_file})
+                if metrics is not None:
+                    metrics.record_analysis(engine, 'stored', phases)
+                return stored
+        
+        meaningful_a, lines_a = self.preprocess_code(code_a, language_a, feature_cache)
+        meaningful_b, lines_b = self.preprocess_code(code_b, language_b, feature_cache)
+        if phases:
+            phases.mark('preprocess')
+        
+        if verbose:
+            print(f"Similarity threshold: {similarity_threshold}")
         
         if not lines_a or not lines_b:
+            if metrics is not None:
+                metrics.record_analysis(engine, 'empty', phases, len(lines_a), len(lines_b))
+            return self.summarize_matches(source_a, source_b, is_file, len(lines_a), len(lines_b),
+                                          [], similarity_threshold)
+        
+        # Find similar lines, counting scored pairs in this call's own tally
+        with self.counting_pairs() as tally:
+            engine_stats = {}
+            ast_result = None
+            if engine == 'ast' and {language_a, language_b} <= {'python', 'generic'}:
+                ast_result = self.match_with_ast_engine(code_a, code_b, meaningful_a, meaningful_b,
+                                                        lines_a, lines_b, similarity_threshold,
+                                                        max_candidates_per_line, max_memory_mb)
+            if ast_result is not None:
+                similar_matches, engine_stats['ast_matches'], engine_stats['matched_subtrees'] = ast_result
+            elif engine == 'suffix':
+                similar_matches, engine_stats = self.match_with_token_runs(
+                    lines_a, lines_b, similarity_threshold, max_candidates_per_line, max_memory_mb)
+            elif engine == 'window':
+                similar_matches, engine_stats = self.match_with_windows(
+                    lines_a, lines_b, similarity_threshold, window_size, max_candidates_per_line,
+                    max_memory_mb)
+            elif engine == 'block':
+                similar_matches, engine_stats = match_hierarchical(
+                    self, meaningful_a, meaningful_b, lines_a, lines_b, similarity_threshold)
+            elif deadline is not None:
+                similar_matches, engine_stats = match_anytime(self, lines_a, lines_b, similarity_threshold, deadline)
+            elif canonicalize:
+                similar_matches, engine_stats['canonical_matches'] = self.match_with_canonical_fast_path(
+                    lines_a, lines_b, similarity_threshold, max_candidates_per_line, max_memory_mb)
+            else:
+                similar_matches = self.match_line_features(lines_a, lines_b, similarity_threshold,
+                                                           max_candidates_per_line, max_memory_mb)
+        pairs_scored = tally.count
+        if phases:
+            phases.mark('match')
+        
+        results = self.summarize_matches(source_a, source_b, is_file, len(lines_a), len(lines_b),
+                                         similar_matches, similarity_threshold)
+        if engine != 'line':
+            results['engine'] = 'line' if engine == 'ast' and ast_result is None else engine
+        results.update(engine_stats)
+        if store_key is not None:
+            hash_a, hash_b, threshold, options = store_key
+            result_store.put(hash_a, hash_b, threshold, results, options)
+        if metrics is not None:
+            phases.mark('summarize')
+            metrics.record_analysis(engine, 'computed', phases, len(lines_a), len(lines_b), pairs_scored)
+        return results
+    
+    def analyze_code_similarity_sweep(self, input_a: str, input_b: str,
+                                      thresholds: List[float],
+                                      is_file: bool = True,
+                                      verbose: bool = True,
+                                      language: Optional[str] = None) -> List[Dict]:
+        """
+        Analyze two inputs at several similarity thresholds with one scoring pass.
+        
+        Line pairs are scored once at the lowest threshold. Because candidates
+        are sorted best first, each threshold only re-runs the greedy selection
+        over a prefix of that list, so every result equals what
+        analyze_code_similarity (line engine) returns for that threshold.
+        
+        Returns:
+            One results dictionary per threshold, in the order given
+        """
+        if not thresholds:
+            return []
+        if is_file:
+            if verbose:
+                print(f"Analyzing similarity between files {input_a} and {input_b}")
+            source_a, source_b = input_a, input_b
+        else:
+            if verbose:
+                print(f"Analyzing similarity between code fragments")
+            source_a, source_b = "Code Fragment A", "Code Fragment B"
+        
+        lines_a = self.preprocess_features(input_a, is_file, language)
+        lines_b = self.preprocess_features(input_b, is_file, language)
+        if verbose:
+            print(f"Similarity thresholds: {', '.join(str(t) for t in thresholds)}")
+        
+        potential_matches = []
+        if lines_a and lines_b:
+            potential_matches = self.score_line_pairs(lines_a, lines_b, min(thresholds))
+        
+        return [self.summarize_matches(source_a, source_b, is_file, len(lines_a), len(lines_b),
+                                       self.select_matches(potential_matches, threshold), threshold)
+                for threshold in thresholds]
+    
+    def estimate_code_similarity(self, input_a: str, input_b: str,
+                                 similarity_threshold: float = 0.7,
+                                 is_file: bool = True,
+                                 verbose: bool = True,
+                                 language: Optional[str] = None,
+                                 interval_width: float = 5.0,
+                                 confidence: float = 0.95,
+                                 seed: Optional[int] = 0) -> Dict:
+        """
+        Estimate similarity_percentage for large inputs without matching every line.
+        
+        Lines of both inputs are sampled and matched against candidates from a
+        token index; the samples grow until the confidence interval is
+        narrower than interval_width percentage points. confidence sets the
+        level of the sampling intervals; it is not a calibrated coverage
+        (see sampling_estimator).
+        
+        Returns:
+            Dictionary with 'similarity_percentage' (estimate), 'confidence_interval',
+            'sample_size_a', 'sample_size_b' and the usual input and line count fields
+        """
+        if is_file:
+            if verbose:
+                print(f"Estimating similarity between files {input_a} and {input_b}")
+            source_a, source_b = input_a, input_b
+        else:
+            if verbose:
+                print(f"Estimating similarity between code fragments")
+            source_a, source_b = "Code Fragment A", "Code Fragment B"
+        
+        lines_a = self.preprocess_features(input_a, is_file, language)
+        lines_b = self.preprocess_features(input_b, is_file, language)
+        if not lines_a or not lines_b:
+            results = self.summarize_matches(source_a, source_b, is_file, len(lines_a), len(lines_b),
+                                             [], similarity_threshold)
+            results['confidence_interval'] = [0.0, 0.0]
+            return results
+        
+        results = {
+            'input_a': source_a,
+            'input_b': source_b,
+            'is_file': is_file,
+            'lines_a_count': len(lines_a),
+            'lines_b_count': len(lines_b),
+            'similarity_threshold': similarity_threshold,
+        }
+        results.update(estimate_similarity(self, lines_a, lines_b, similarity_threshold,
+                                           interval_width, confidence, seed=seed))
+        return results
+    
+    def summarize_matches(self, source_a: str, source_b: str, is_file: bool,
+                          total_lines_a: int, total_lines_b: int,
+                          similar_matches: List[Tuple[int, int, float]],
+                          similarity_threshold: float) -> Dict:
+        """Build the analysis results dictionary from a set of line matches."""
+        if not total_lines_a or not total_lines_b:
             return {
                 'error': 'One or both inputs could not be read or contain no meaningful code',
                 'input_a': source_a,
                 'input_b': source_b,
                 'is_file': is_file,
-                'lines_a_count': len(lines_a) if lines_a else 0,
-                'lines_b_count': len(lines_b) if lines_b else 0,
+                'lines_a_count': total_lines_a,
+                'lines_b_count': total_lines_b,
                 'similar_lines_count': 0,  # Add missing key
                 'similarity_percentage': 0.0,
                 'average_similarity_score': 0.0,  # Add missing key
@@ -313,19 +911,51 @@ class CodeSimilarityAnalyzer:
                 'interpretation': 'Very Low Similarity - Largely different code'  # Add missing key
             }
         
-        # Find similar lines
-        similar_matches = self.find_similar_lines(lines_a, lines_b, similarity_threshold)
-        
         # Calculate statistics with improved similarity percentage
-        total_lines_a = len(lines_a)
-        total_lines_b = len(lines_b)
         similar_lines_count = len(similar_matches)
+        total_score = sum(score for _, _, score in similar_matches)
+        similarity_percentage = self.similarity_percentage_from_counts(
+            similar_lines_count, total_score, total_lines_a, total_lines_b)
+        
+        # Group matches by similarity score
+        similarity_distribution = defaultdict(int)
+        for _, _, score in similar_matches:
+            score_range = f"{int(score * 10) * 10}%-{int(score * 10) * 10 + 9}%"
+            similarity_distribution[score_range] += 1
+        
+        # Calculate average similarity for matches
+        avg_similarity = (
+            sum(score for _, _, score in similar_matches) / len(similar_matches)
+            if similar_matches else 0.0
+        )
+        
+        results = {
+            'input_a': source_a,
+            'input_b': source_b,
+            'is_file': is_file,
+            'lines_a_count': total_lines_a,
+            'lines_b_count': total_lines_b,
+            'similar_lines_count': similar_lines_count,
+            'similarity_percentage': round(similarity_percentage, 2),
+            'average_similarity_score': round(avg_similarity, 3),
+            'similarity_threshold': similarity_threshold,
+            'similar_matches': similar_matches,  # Include all matches
+            'similarity_distribution': dict(similarity_distribution),
+            'interpretation': self._interpret_similarity(similarity_percentage, avg_similarity)
+        }
         
+        return results
+    
+    def similarity_percentage_from_counts(self, similar_lines_count: float, total_score: float,
+                                          total_lines_a: int, total_lines_b: int) -> float:
+        """
+        Weighted similarity percentage from the number of matched lines and the
+        sum of their scores (both may be estimates rather than exact counts).
+        """
         # Calculate weighted similarity percentage based on match quality
-        if similar_matches:
-            # For plagiarism detection, consider both quantity and quality of matches
-            # Weight matches by their similarity scores
-            total_score = sum(score for _, _, score in similar_matches)
+        if similar_lines_count > 0:
+            # For plagiarism detection, consider both quantity and quality of matches,
+            # weighting matches by their similarity scores
             
             # Calculate coverage for both files  
             coverage_a = (similar_lines_count / total_lines_a) * 100 if total_lines_a > 0 else 0
@@ -355,34 +985,7 @@ class CodeSimilarityAnalyzer:
         else:
             similarity_percentage = 0.0
         
-        # Group matches by similarity score
-        similarity_distribution = defaultdict(int)
-        for _, _, score in similar_matches:
-            score_range = f"{int(score * 10) * 10}%-{int(score * 10) * 10 + 9}%"
-            similarity_distribution[score_range] += 1
-        
-        # Calculate average similarity for matches
-        avg_similarity = (
-            sum(score for _, _, score in similar_matches) / len(similar_matches)
-            if similar_matches else 0.0
-        )
-        
-        results = {
-            'input_a': source_a,
-            'input_b': source_b,
-            'is_file': is_file,
-            'lines_a_count': total_lines_a,
-            'lines_b_count': total_lines_b,
-            'similar_lines_count': similar_lines_count,
-            'similarity_percentage': round(similarity_percentage, 2),
-            'average_similarity_score': round(avg_similarity, 3),
-            'similarity_threshold': similarity_threshold,
-            'similar_matches': similar_matches,  # Include all matches
-            'similarity_distribution': dict(similarity_distribution),
-            'interpretation': self._interpret_similarity(similarity_percentage, avg_similarity)
-        }
-        
-        return results
+        return similarity_percentage
     
     def _interpret_similarity(self, percentage: float, avg_score: float) -> str:
         """Provide interpretation of similarity results."""
@@ -429,9 +1032,33 @@ class CodeSimilarityAnalyzer:
         print("=" * 80)
 
 
-def main():
-    """Example usage of the CodeSimilarityAnalyzer."""
+def main(argv: Optional[List[str]] = None):
+    """Compare two files given on the command line, or interactively when none are given."""
+    import argparse
+    parser = argparse.ArgumentParser(description="Analyze similarity between two code files")
+    parser.add_argument('file_a', nargs='?', help="First file (A); omit both files for interactive mode")
+    parser.add_argument('file_b', nargs='?', help="Second file (B)")
+    parser.add_argument('--threshold', type=float, default=0.7, help="Line similarity threshold (default 0.7)")
+    parser.add_argument('--engine', choices=CodeSimilarityAnalyzer.ENGINES, default='line',
+                        help="Matching engine (default line)")
+    parser.add_argument('--profile', nargs='?', const='similarity_profile', metavar='DIR',
+                        help="Profile the analysis and save a bug-report bundle (hot spots, allocation "
+                             "sites, collapsed stacks, inputs and options) to DIR (default similarity_profile)")
+    args = parser.parse_args(argv)
+    
     analyzer = CodeSimilarityAnalyzer()
+    profile = args.profile is not None
+    
+    if args.file_a or args.file_b:
+        if not (args.file_a and args.file_b):
+            parser.error("both file_a and file_b are required")
+        results = analyzer.analyze_code_similarity(args.file_a, args.file_b, args.threshold,
+                                                   engine=args.engine, profile=profile)
+        analyzer.print_detailed_report(results)
+        if profile:
+            save_profile(results, (args.file_a, args.file_b), True,
+                         {'similarity_threshold': args.threshold, 'engine': args.engine}, args.profile)
+        return
     
     print("Code Similarity Analyzer")
     print("1. Compare two files")
@@ -459,11 +1086,13 @@ def main():
         if is_file_a and is_file_b:
             # Both are files
             print(f"\nDetected: Both inputs are files")
-            results = analyzer.analyze_code_similarity(input_a, input_b, threshold, is_file=True)
+            results = analyzer.analyze_code_similarity(input_a, input_b, threshold, is_file=True,
+                                                       profile=profile)
         elif not is_file_a and not is_file_b:
             # Both are text
             print(f"\nDetected: Both inputs are code text")
-            results = analyzer.analyze_code_similarity(input_a, input_b, threshold, is_file=False)
+            results = analyzer.analyze_code_similarity(input_a, input_b, threshold, is_file=False,
+                                                       profile=profile)
         else:
             # Mixed - one file, one text (treat both as text for consistency)
             print(f"\nDetected: Mixed input types - treating both as code text")
@@ -482,7 +1111,8 @@ def main():
                 except Exception as e:
                     print(f"Error reading file {input_b}: {e}")
                     input_b = ""
-            results = analyzer.analyze_code_similarity(input_a, input_b, threshold, is_file=False)
+            results = analyzer.analyze_code_similarity(input_a, input_b, threshold, is_file=False,
+                                                       profile=profile)
         
     else:
         # File mode (default)
@@ -494,10 +1124,14 @@ def main():
         threshold = float(threshold_input) if threshold_input else 0.7
         
         # Perform analysis on files
-        results = analyzer.analyze_code_similarity(file_a, file_b, threshold, is_file=True)
+        results = analyzer.analyze_code_similarity(file_a, file_b, threshold, is_file=True,
+                                                   profile=profile)
     
     # Print detailed report
     analyzer.print_detailed_report(results)
+    if profile:
+        save_profile(results, (results['input_a'], results['input_b']) if results['is_file'] else (input_a, input_b),
+                     results['is_file'], {'similarity_threshold': threshold}, args.profile)
     
     # Optional: Save results to a file
     save_report = input("\nSave detailed report to file? (y/n): ").strip().lower()
@@ -512,5 +1146,13 @@ def main():
         print(f"Report saved to {output_file}")
 
 
+def save_profile(results: Dict, inputs: Tuple[str, str], is_file: bool, options: Dict, directory: str):
+    """Print a profiled run's hot spots and save its bug-report bundle."""
+    print()
+    print(format_profile(results['profile']))
+    write_profile_bundle(directory, results, inputs, is_file, options)
+    print(f"Profile bundle saved to {directory} (flame graph input: {directory}/stacks.collapsed)")
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
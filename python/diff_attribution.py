@@ -0,0 +1,159 @@
+"""
+Attribution of the lines a commit adds.
+
+A unified diff (``git diff --cached`` by default, or any diff on stdin) is
+parsed for the line numbers each file gains on its new side. Only those
+added or modified lines of the final file become query lines; they are
+scored against every line of the suggestion file with the usual line
+similarity, so work shrinks with the size of the change rather than the
+size of the file. Percentages are reported relative to the changed lines.
+"""
+
+import re
+import sys
+import argparse
+import subprocess
+from typing import List, Dict, Set, Optional, Iterable
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer
+from .code_lexer import detect_language
+
+
+_HUNK_HEADER = re.compile(r'^@@ -\d+(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+_QUOTED_PATH = re.compile(r'^"((?:[^"\\]|\\.)*)"')
+_PATH_ESCAPES = {'a': '\a', 'b': '\b', 't': '\t', 'n': '\n', 'v': '\v', 'f': '\f', 'r': '\r'}
+
+
+def _header_path(text: str) -> str:
+    """The path of a '+++ ' header, unquoting git's C-style quoted names."""
+    quoted = _QUOTED_PATH.match(text)
+    if not quoted:
+        return text.split('\t')[0]
+    # Octal escapes are the UTF-8 bytes of non-ASCII characters
+    raw = re.sub(r'\\([0-7]{3}|.)',
+                 lambda m: chr(int(m.group(1), 8)) if len(m.group(1)) == 3
+                 else _PATH_ESCAPES.get(m.group(1), m.group(1)),
+                 quoted.group(1))
+    return raw.encode('latin-1').decode('utf-8', errors='replace')
+
+
+def parse_unified_diff(diff_text: str) -> Dict[str, Set[int]]:
+    """
+    Line numbers added on the new side of a unified diff, per new file path.
+
+    Each hunk consumes exactly the line counts in its @@ header, so added
+    lines that look like headers ('++ i;' shows up as '+++ i;') stay content.
+    Deleted files are left out; "a/" and "b/" prefixes are stripped.
+    """
+    added: Dict[str, Set[int]] = {}
+    current: Optional[Set[int]] = None
+    line_number = 0
+    old_left = new_left = 0
+    for line in diff_text.split('\n'):
+        if old_left > 0 or new_left > 0:
+            if line.startswith('+'):
+                if current is not None:
+                    current.add(line_number)
+                line_number += 1
+                new_left -= 1
+            elif line.startswith('-'):
+                old_left -= 1
+            elif not line.startswith('\\'):
+                line_number += 1
+                old_left -= 1
+                new_left -= 1
+        elif line.startswith('+++ '):
+            path = _header_path(line[4:])
+            if path == '/dev/null':
+                current = None
+                continue
+            if path.startswith('b/'):
+                path = path[2:]
+            current = added.setdefault(path, set())
+        elif line.startswith('@@'):
+            header = _HUNK_HEADER.match(line)
+            if header:
+                old_count, start, new_count = header.groups()
+                line_number = int(start)
+                old_left = 1 if old_count is None else int(old_count)
+                new_left = 1 if new_count is None else int(new_count)
+    return added
+
+
+def staged_diff(repo_dir: str = '.') -> str:
+    """Staged changes under repo_dir as a unified diff without context, paths relative to it."""
+    return subprocess.run(['git', 'diff', '--cached', '--relative', '--unified=0', '--no-color', '--no-ext-diff'],
+                          cwd=repo_dir, capture_output=True, text=True, check=True).stdout
+
+
+def read_staged(path: str, repo_dir: str = '.') -> str:
+    """The staged content of a file, which is what the staged diff's line numbers refer to."""
+    return subprocess.run(['git', 'show', f':./{path}'], cwd=repo_dir,
+                          capture_output=True, text=True, check=True).stdout
+
+
+def analyze_changed_lines(analyzer: CodeSimilarityAnalyzer, code_a: str, changed_lines: Iterable[int],
+                          input_b: str, similarity_threshold: float = 0.7, is_file: bool = True,
+                          language: Optional[str] = None, source_a: str = "Changed Lines") -> Dict:
+    """
+    Analyze only the changed lines of code_a against all of input_b.
+
+    Args:
+        code_a: Full source of the final file (line numbers refer to it)
+        changed_lines: 1-based line numbers of code_a that were added or modified
+        input_b: Path to the suggestion file, or its code when is_file is False
+
+    Returns:
+        Dictionary with the usual analysis results where lines_a_count counts
+        the meaningful changed lines, plus 'changed_lines_count',
+        'attributed_lines_percentage' (share of meaningful changed lines
+        matched) and 'attributed_lines' as (line_a, line_b, score) line numbers
+    """
+    changed = set(changed_lines)
+    code_b, language_b = analyzer.read_input(input_b, is_file, language)
+    language_a = language or language_b
+    meaningful_a = [line for line in analyzer.extract_meaningful_lines(code_a, language_a)
+                    if line[0] in changed] if code_a else []
+    meaningful_b = analyzer.extract_meaningful_lines(code_b, language_b) if code_b else []
+    lines_a = [analyzer.extract_line_features(code_line, comments_stripped=True)
+               for _, _, code_line in meaningful_a]
+    lines_b = [analyzer.extract_line_features(code_line, comments_stripped=True)
+               for _, _, code_line in meaningful_b]
+
+    similar_matches = (analyzer.match_line_features(lines_a, lines_b, similarity_threshold)
+                       if lines_a and lines_b else [])
+    results = analyzer.summarize_matches(source_a, input_b if is_file else "Code Fragment B", is_file,
+                                         len(lines_a), len(lines_b), similar_matches, similarity_threshold)
+    results['changed_lines_count'] = len(changed)
+    results['attributed_lines_percentage'] = (
+        round(100.0 * len(similar_matches) / len(lines_a), 2) if lines_a else 0.0)
+    results['attributed_lines'] = sorted((meaningful_a[i][0], meaningful_b[j][0], score)
+                                         for i, j, score in similar_matches)
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Attribute the lines added by a commit to a suggestion file")
+    parser.add_argument('suggestion', help="Suggestion file the added lines are compared against")
+    parser.add_argument('--stdin', action='store_true',
+                        help="Read a unified diff from stdin (files are read from the working tree) "
+                             "instead of running git diff --cached")
+    parser.add_argument('--path', action='append', help="Only report these changed files (repeatable)")
+    parser.add_argument('--threshold', type=float, default=0.7, help="Line similarity threshold (default 0.7)")
+    args = parser.parse_args(argv)
+
+    analyzer = CodeSimilarityAnalyzer()
+    added = parse_unified_diff(sys.stdin.read() if args.stdin else staged_diff())
+    for path in sorted(added):
+        if args.path and path not in args.path or not added[path]:
+            continue
+        code = (analyzer.read_source(path) or '') if args.stdin else read_staged(path)
+        results = analyze_changed_lines(analyzer, code, added[path], args.suggestion, args.threshold,
+                                        language=detect_language(path), source_a=path)
+        print(f"{path}: {results['attributed_lines_percentage']:.2f}% of "
+              f"{results['lines_a_count']} changed lines attributed to {args.suggestion} "
+              f"(similarity {results['similarity_percentage']:.2f}%)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Operational metrics for a long-running analyzer.
+
+A small registry of counters and histograms rendered in the Prometheus text
+exposition format, served from an optional local HTTP endpoint or written to
+a file. Analyses update it once per phase, never per scored pair: each
+analysis counts its scored pairs in its own PairTally and records the total
+once matching is done.
+"""
+
+import os
+import bisect
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Tuple, Dict, Optional, Sequence
+
+
+# Seconds; spans a single short fragment pair up to a large file pair
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """A monotonically increasing value per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 lock: Optional[threading.Lock] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = lock or threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}')
+        return lines
+
+
+class Histogram:
+    """Cumulative bucket counts, sum and count of observations per label combination."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, lock: Optional[threading.Lock] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = lock or threading.Lock()
+        # Per label key: [per-bucket counts (plus +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bucket] += 1
+            state[1] += value
+
+    def count(self, **labels) -> int:
+        state = self._values.get(tuple(str(labels[name]) for name in self.labelnames))
+        return sum(state[0]) if state else 0
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f'{self.name}_bucket{labels} {cumulative}')
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+                lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class PhaseTimer:
+    """Times consecutive phases of one analysis into a histogram."""
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+        self.started = self.last = time.perf_counter()
+
+    def mark(self, phase: str):
+        """Record the time since the previous mark as phase."""
+        now = time.perf_counter()
+        self.histogram.observe(now - self.last, phase=phase)
+        self.last = now
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms for analyses, rendered in Prometheus text format.
+
+    Pass one to CodeSimilarityAnalyzer(metrics=...) and expose it with
+    serve() or write().
+    """
+
+    def __init__(self, namespace: str = 'code_similarity'):
+        self._lock = threading.Lock()
+        self._metrics = []
+        self.namespace = namespace
+        self.analyses = self.counter('analyses_total', "Analyses run", ('engine', 'outcome'))
+        self.lines = self.counter('lines_processed_total', "Meaningful lines preprocessed", ('input',))
+        self.pairs = self.counter('line_pairs_total', "Line pairs scored or pruned without scoring", ('result',))
+        self.store_lookups = self.counter('result_store_lookups_total', "Result store lookups", ('result',))
+        self.phase_seconds = self.histogram('phase_seconds', "Time spent per analysis phase", ('phase',))
+        self.analysis_seconds = self.histogram('analysis_seconds', "Time per analysis", ('engine',))
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(f'{self.namespace}_{name}', documentation, labelnames, self._lock)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(f'{self.namespace}_{name}', documentation, labelnames, buckets, self._lock)
+        self._metrics.append(metric)
+        return metric
+
+    def phase_timer(self) -> PhaseTimer:
+        return PhaseTimer(self.phase_seconds)
+
+    def record_analysis(self, engine: str, outcome: str, timer: PhaseTimer,
+                        lines_a: int = 0, lines_b: int = 0, pairs_scored: int = 0):
+        """Record one finished analysis; outcome is 'computed', 'stored' or 'empty'."""
+        self.analyses.inc(engine=engine, outcome=outcome)
+        self.analysis_seconds.observe(timer.elapsed(), engine=engine)
+        if lines_a or lines_b:
+            self.lines.inc(lines_a, input='a')
+            self.lines.inc(lines_b, input='b')
+        if outcome == 'computed':
+            self.pairs.inc(pairs_scored, result='scored')
+            self.pairs.inc(max(0, lines_a * lines_b - pairs_scored), result='pruned')
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        """Atomically write the current metrics to path (e.g. for a node exporter textfile collector)."""
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(self.render())
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def serve(self, port: int = 0, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+        """
+        Serve /metrics from a background thread.
+
+        Returns the server; server.server_address holds the bound port and
+        server.shutdown() stops it.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
@@ -0,0 +1,372 @@
+"""
+Synthetic mutation corpora with ground truth.
+
+Seed files are copied with controlled mutations:
+- identifier renames
+- swaps of adjacent statements
+- inserted and deleted statements
+- added or removed comments
+- whitespace reformatting
+- moves of whole functions or methods
+
+Every line remembers which seed line it came from, so each case records
+where each surviving seed line ended up. The harness runs the analyzer's
+engines and matching modes over a corpus and scores their similar_matches
+against that mapping. It reports precision, recall and lines/sec per mode.
+A match counts as correct when it pairs a line with its true counterpart or
+with an identical copy of it, since duplicate lines cannot be told apart.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+from typing import List, Tuple, Dict, Optional, Sequence
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer
+from .code_lexer import detect_language
+from .canonicalizer import RESERVED_WORDS
+
+
+MUTATIONS = ('rename', 'reorder', 'insert', 'delete', 'comment', 'reformat', 'block_move')
+
+# (label, analyze_code_similarity keyword arguments) compared by evaluate_corpus
+DEFAULT_CONFIGURATIONS = (
+    ('line', {}),
+    ('line canonicalize', {'canonicalize': True}),
+    ('line top-5', {'max_candidates_per_line': 5}),
+    ('ast', {'engine': 'ast'}),
+    ('block', {'engine': 'block'}),
+    ('suffix', {'engine': 'suffix'}),
+    ('window', {'engine': 'window'}),
+)
+
+_IDENTIFIER = re.compile(r'(?<![\w$])[A-Za-z_][\w$]*')
+_ASSIGNMENT = re.compile(r'\s*(?<![=!<>+\-*/%&|^:])=(?!=)\s*')
+_COMMA = re.compile(r'\s*,\s*')
+# Function, method and class headers (control statements also end in ':' or '{')
+_BLOCK_HEADER = re.compile(r'(?:async\s+)?def\s|(?:export\s+)?(?:abstract\s+)?class\s'
+                           r'|(?!(?:if|for|while|switch|catch|else|do|try|with)\b)'
+                           r'(?:[\w<>\[\],$]+\s+)*[\w$]+\s*\([^;]*\)[^;]*\{$')
+_NEW_NAMES = ('value', 'item', 'result', 'entry', 'record', 'node', 'total', 'count', 'buffer', 'state')
+
+
+def _indent(text: str) -> int:
+    return len(text) - len(text.lstrip())
+
+
+def _comment_prefix(language: str) -> str:
+    return '#' if language in ('python', 'generic') else '//'
+
+
+def _is_simple_statement(text: str) -> bool:
+    """A non-blank line that neither opens nor closes a block and is not a comment or decorator."""
+    stripped = text.strip()
+    return (bool(stripped) and not stripped.endswith((':', '{', '(', '[', ',', '\\'))
+            and not stripped.startswith(('}', ')', ']', '#', '//', '/*', '*', '@', '"""', "'''"))
+            and not stripped.split()[0].rstrip(':') in ('else', 'elif', 'except', 'finally', 'case', 'default'))
+
+
+class _Source:
+    """Lines of a case being mutated, each with the seed line number it came from (None if new)."""
+
+    def __init__(self, code: str, language: str, rng: random.Random):
+        self.lines: List[List] = [[text, number] for number, text in enumerate(code.split('\n'), start=1)]
+        self.language = language
+        self.rng = rng
+
+    def text(self) -> str:
+        return '\n'.join(text for text, _ in self.lines)
+
+    def simple_statements(self) -> List[int]:
+        return [k for k, (text, _) in enumerate(self.lines) if _is_simple_statement(text)]
+
+    def rename(self) -> Optional[str]:
+        names = sorted({name for text, _ in self.lines for name in _IDENTIFIER.findall(text)
+                        if len(name) >= 3 and name.lower() not in RESERVED_WORDS and not name.startswith('__')})
+        if not names:
+            return None
+        renamed = self.rng.sample(names, min(len(names), self.rng.randint(1, 3)))
+        taken = set(names)
+        mapping = {}
+        for name in renamed:
+            new_name = f"{self.rng.choice(_NEW_NAMES)}{self.rng.randint(1, 99)}"
+            while new_name in taken:
+                new_name += '_'
+            taken.add(new_name)
+            mapping[name] = new_name
+        pattern = re.compile(r'(?<![\w$])(' + '|'.join(map(re.escape, renamed)) + r')(?![\w$])')
+        for line in self.lines:
+            line[0] = pattern.sub(lambda match: mapping[match.group(1)], line[0])
+        return 'rename ' + ', '.join(f"{old}->{new}" for old, new in mapping.items())
+
+    def reorder(self) -> Optional[str]:
+        simple = set(self.simple_statements())
+        pairs = [k for k in simple if k + 1 in simple and _indent(self.lines[k][0]) == _indent(self.lines[k + 1][0])]
+        if not pairs:
+            return None
+        k = self.rng.choice(pairs)
+        self.lines[k], self.lines[k + 1] = self.lines[k + 1], self.lines[k]
+        return f"reorder lines {k + 1}-{k + 2}"
+
+    def insert(self) -> Optional[str]:
+        simple = self.simple_statements()
+        if not simple:
+            return None
+        k = self.rng.choice(simple)
+        indent = self.lines[k][0][:_indent(self.lines[k][0])]
+        name, number = f"{self.rng.choice(_NEW_NAMES)}_{self.rng.randint(100, 999)}", self.rng.randint(0, 99)
+        statement = {'python': f"{name} = {number}", 'generic': f"{name} = {number}",
+                     'java': f"int {name} = {number};"}.get(self.language, f"let {name} = {number};")
+        self.lines.insert(k + 1, [indent + statement, None])
+        return f"insert line {k + 2}"
+
+    def delete(self) -> Optional[str]:
+        simple = self.simple_statements()
+        if not simple:
+            return None
+        k = self.rng.choice(simple)
+        del self.lines[k]
+        return f"delete line {k + 1}"
+
+    def comment(self) -> Optional[str]:
+        prefix = _comment_prefix(self.language)
+        comment_lines = [k for k, (text, _) in enumerate(self.lines) if text.strip().startswith(prefix)]
+        action = self.rng.choice(('trailing', 'line', 'remove') if comment_lines else ('trailing', 'line'))
+        if action == 'remove':
+            k = self.rng.choice(comment_lines)
+            del self.lines[k]
+            return f"remove comment line {k + 1}"
+        simple = self.simple_statements()
+        if not simple:
+            return None
+        k = self.rng.choice(simple)
+        note = self.rng.choice(('check this', 'see above', 'keep in sync', 'fast path'))
+        if action == 'trailing':
+            self.lines[k][0] += f"  {prefix} {note}"
+            return f"trailing comment on line {k + 1}"
+        indent = self.lines[k][0][:_indent(self.lines[k][0])]
+        self.lines.insert(k, [f"{indent}{prefix} {note}", None])
+        return f"comment line {k + 1}"
+
+    def reformat(self) -> Optional[str]:
+        simple = self.simple_statements()
+        if not simple:
+            return None
+        chosen = self.rng.sample(simple, min(len(simple), self.rng.randint(1, 4)))
+        tight = self.rng.random() < 0.5
+        for k in chosen:
+            text = self.lines[k][0]
+            indent, body = text[:_indent(text)], text.strip()
+            # Leave lines with string literals alone so their contents stay intact
+            if not any(quote in body for quote in '"\'`'):
+                body = _ASSIGNMENT.sub('=' if tight else ' = ', body)
+                body = _COMMA.sub(',' if tight else ', ', body)
+            self.lines[k][0] = indent + body + ('' if tight else ' ')
+        return f"reformat {len(chosen)} lines"
+
+    def _blocks(self) -> List[Tuple[int, int, int]]:
+        """(start, end, parent) of each function or class block; end is exclusive."""
+        blocks = []
+        n = len(self.lines)
+        for start, (text, _) in enumerate(self.lines):
+            stripped = text.strip()
+            if not stripped.endswith((':', '{')) or stripped.startswith(('}', '#', '//')):
+                continue
+            if not _BLOCK_HEADER.match(stripped):
+                continue
+            level = _indent(text)
+            end = start + 1
+            while end < n and (not self.lines[end][0].strip() or _indent(self.lines[end][0]) > level):
+                end += 1
+            if stripped.endswith('{') and end < n and self.lines[end][0].strip().startswith('}'):
+                end += 1
+            parent = next((k for k in range(start - 1, -1, -1)
+                           if self.lines[k][0].strip() and _indent(self.lines[k][0]) < level), -1)
+            blocks.append((start, end, parent))
+        return blocks
+
+    def block_move(self) -> Optional[str]:
+        blocks = self._blocks()
+        moves = [(a, b) for a in blocks for b in blocks
+                 if a[2] == b[2] and (a[1] <= b[0] or b[1] <= a[0])]
+        if not moves:
+            return None
+        (start, end, _), (target_start, target_end, _) = self.rng.choice(moves)
+        block = self.lines[start:end]
+        if target_start > start:
+            # Move below the target block
+            self.lines[target_end:target_end] = block
+            del self.lines[start:end]
+        else:
+            del self.lines[start:end]
+            self.lines[target_start:target_start] = block
+        return f"move block at line {start + 1}"
+
+
+def mutate_source(code: str, language: str, rng: random.Random, operations: int = 4,
+                  mutations: Sequence[str] = MUTATIONS) -> Tuple[str, Dict[int, int], List[str]]:
+    """
+    Apply operations random mutations drawn from mutations to code.
+
+    Returns:
+        (mutated code, {seed line number: mutated line number} for every seed
+        line that survived, descriptions of the mutations applied)
+    """
+    unknown = set(mutations) - set(MUTATIONS)
+    if unknown:
+        raise ValueError(f"Unknown mutations: {', '.join(sorted(unknown))}")
+    source = _Source(code, language, rng)
+    applied = []
+    for _ in range(operations):
+        description = getattr(source, rng.choice(list(mutations)))()
+        if description:
+            applied.append(description)
+    mapping = {origin: number for number, (_, origin) in enumerate(source.lines, start=1) if origin is not None}
+    return source.text(), mapping, applied
+
+
+def generate_corpus(seed_files: Sequence[str], output_dir: str, count: int, seed: int = 0,
+                    operations: Tuple[int, int] = (2, 8), mutations: Sequence[str] = MUTATIONS) -> str:
+    """
+    Write count (seed copy, mutated copy) cases under output_dir.
+
+    Cases go to original/ and mutated/, and ground_truth.jsonl gets one
+    record per case with its paths, language, mutations and line_mapping
+    ((seed line, mutated line) pairs). Returns the ground truth path.
+    """
+    rng = random.Random(seed)
+    seeds = []
+    for path in seed_files:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            seeds.append((path, f.read()))
+    for subdir in ('original', 'mutated'):
+        os.makedirs(os.path.join(output_dir, subdir), exist_ok=True)
+
+    truth_path = os.path.join(output_dir, 'ground_truth.jsonl')
+    with open(truth_path, 'w', encoding='utf-8') as truth:
+        for case in range(count):
+            seed_path, code = seeds[case % len(seeds)]
+            language = detect_language(seed_path)
+            mutated, mapping, applied = mutate_source(code, language, rng, rng.randint(*operations), mutations)
+            name = f"{case:05d}_{os.path.basename(seed_path)}"
+            for subdir, content in (('original', code), ('mutated', mutated)):
+                with open(os.path.join(output_dir, subdir, name), 'w', encoding='utf-8') as f:
+                    f.write(content)
+            truth.write(json.dumps({
+                'case': case,
+                'original': os.path.join('original', name),
+                'mutated': os.path.join('mutated', name),
+                'language': language,
+                'mutations': applied,
+                'line_mapping': sorted(mapping.items()),
+            }) + '\n')
+    return truth_path
+
+
+def load_ground_truth(corpus_dir: str) -> List[Dict]:
+    with open(os.path.join(corpus_dir, 'ground_truth.jsonl'), encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _score_case(analyzer: CodeSimilarityAnalyzer, corpus_dir: str, case: Dict,
+                similar_matches: List[Tuple[int, int, float]]) -> Tuple[int, int, int]:
+    """(correct predictions, predictions, true pairs) for one case's matches."""
+    sides = []
+    for key in ('original', 'mutated'):
+        code = analyzer.read_source(os.path.join(corpus_dir, case[key])) or ''
+        sides.append(analyzer.extract_meaningful_lines(code, case['language']))
+    (meaningful_a, meaningful_b) = sides
+    numbers_b = {line_number for line_number, _, _ in meaningful_b}
+    normalized_b = {line_number: analyzer.extract_line_features(code_line, comments_stripped=True).normalized
+                    for line_number, _, code_line in meaningful_b}
+    truth = {a: b for a, b in case['line_mapping'] if b in numbers_b}
+    truth = {line_number: truth[line_number] for line_number, _, _ in meaningful_a if line_number in truth}
+
+    correct = 0
+    for i, j, _ in similar_matches:
+        line_a, line_b = meaningful_a[i][0], meaningful_b[j][0]
+        expected = truth.get(line_a)
+        if expected is not None and (expected == line_b or normalized_b[expected] == normalized_b[line_b]):
+            correct += 1
+    return correct, len(similar_matches), len(truth)
+
+
+def evaluate_corpus(corpus_dir: str, configurations: Sequence[Tuple[str, Dict]] = DEFAULT_CONFIGURATIONS,
+                    similarity_threshold: float = 0.7, analyzer: Optional[CodeSimilarityAnalyzer] = None) -> List[Dict]:
+    """
+    Run each configuration over every case and score its similar_matches.
+
+    Returns:
+        One row per configuration with 'configuration', 'cases', 'precision',
+        'recall', 'f1' (micro-averaged over all cases), 'seconds' and
+        'lines_per_second' (meaningful lines of both inputs per analysis second)
+    """
+    analyzer = analyzer or CodeSimilarityAnalyzer()
+    cases = load_ground_truth(corpus_dir)
+    rows = []
+    for label, options in configurations:
+        correct = predicted = expected = lines = 0
+        seconds = 0.0
+        for case in cases:
+            started = time.perf_counter()
+            results = analyzer.analyze_code_similarity(
+                os.path.join(corpus_dir, case['original']), os.path.join(corpus_dir, case['mutated']),
+                similarity_threshold, verbose=False, language=case['language'], **options)
+            seconds += time.perf_counter() - started
+            lines += results['lines_a_count'] + results['lines_b_count']
+            case_correct, case_predicted, case_expected = _score_case(analyzer, corpus_dir, case,
+                                                                      results['similar_matches'])
+            correct += case_correct
+            predicted += case_predicted
+            expected += case_expected
+        precision = correct / predicted if predicted else 1.0
+        recall = correct / expected if expected else 1.0
+        rows.append({
+            'configuration': label,
+            'cases': len(cases),
+            'precision': round(precision, 4),
+            'recall': round(recall, 4),
+            'f1': round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+            'seconds': round(seconds, 3),
+            'lines_per_second': round(lines / seconds, 1) if seconds else 0.0,
+        })
+    return rows
+
+
+def format_evaluation(rows: List[Dict]) -> str:
+    """The evaluation rows as one aligned table."""
+    lines = [f"{'configuration':<20} {'cases':>6} {'precision':>9} {'recall':>7} {'f1':>7} {'lines/s':>10}"]
+    for row in rows:
+        lines.append(f"{row['configuration']:<20} {row['cases']:>6} {row['precision']:>9.4f} "
+                     f"{row['recall']:>7.4f} {row['f1']:>7.4f} {row['lines_per_second']:>10.1f}")
+    return '\n'.join(lines) + '\n'
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate mutation corpora and score the analyzer against them")
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate = commands.add_parser('generate', help="Write a corpus of mutated seed files with ground truth")
+    generate.add_argument('seeds', nargs='+', help="Seed source files")
+    generate.add_argument('--output', required=True, help="Corpus directory")
+    generate.add_argument('--count', type=int, default=100, help="Number of cases (default 100)")
+    generate.add_argument('--seed', type=int, default=0, help="Random seed (default 0)")
+    generate.add_argument('--mutations', nargs='+', choices=MUTATIONS, default=list(MUTATIONS),
+                          help="Mutation kinds to draw from (default: all)")
+    evaluate = commands.add_parser('evaluate', help="Score every engine and matching mode on a corpus")
+    evaluate.add_argument('corpus', help="Corpus directory written by generate")
+    evaluate.add_argument('--threshold', type=float, default=0.7, help="Line similarity threshold (default 0.7)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        truth_path = generate_corpus(args.seeds, args.output, args.count, args.seed, mutations=args.mutations)
+        print(f"Wrote {args.count} cases and {truth_path}")
+    else:
+        print(format_evaluation(evaluate_corpus(args.corpus, similarity_threshold=args.threshold)), end='')
+
+
+if __name__ == "__main__":
+    sys.exit(main())
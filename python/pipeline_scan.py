@@ -0,0 +1,342 @@
+"""
+Pipelined scan of a corpus against one query file.
+
+The scan runs as three stages joined by bounded queues:
+
+  read        threads in this process read files (I/O bound)
+  preprocess  worker processes lex each file into line features and a token
+              sketch (the file's token set, plus the normalized text of
+              lines without tokens, which only match identical lines)
+  match       worker processes skip files whose sketch shares no token with
+              the query when the threshold makes that lossless, and match
+              the rest line by line against the query
+
+A full queue blocks the stage feeding it, so a slow stage holds back the
+faster ones instead of letting work pile up in memory. Every stage runs at
+the same time, so the scan takes about as long as its slowest stage rather
+than the sum of all of them. Each worker records its items, busy time, time
+spent waiting for input (starved) and time blocked on a full output queue
+(backpressure). Per-file results equal analyze_code_similarity on the
+(query, file) pair.
+"""
+
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+from typing import List, Tuple, Dict, Optional, Iterable, Callable, Any
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+from .code_lexer import detect_language
+from .block_matcher import DISJOINT_TOKENS_MAX_SIMILARITY
+from .clone_detector import DEFAULT_EXTENSIONS, DEFAULT_EXCLUDED_DIRS
+
+
+DEFAULT_QUEUE_SIZE = 64
+# How often a waiting scan checks that its stage processes are still alive
+_POLL_SECONDS = 0.1
+
+# Ends a stage worker's input
+_DONE = None
+
+
+def iter_source_files(root: str, extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+                      excluded_dirs: Iterable[str] = DEFAULT_EXCLUDED_DIRS) -> List[str]:
+    """Source files under root in a stable order, skipping excluded directories."""
+    extensions = tuple(ext.lower() for ext in extensions)
+    excluded_dirs = set(excluded_dirs)
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in excluded_dirs)
+        paths.extend(os.path.join(dirpath, filename) for filename in sorted(filenames)
+                     if filename.lower().endswith(extensions))
+    return paths
+
+
+def preprocess_source(analyzer: CodeSimilarityAnalyzer, path: str,
+                      code: Optional[str]) -> Tuple[str, List[LineFeatures], frozenset]:
+    """(path, line features, token sketch) of one file's meaningful lines."""
+    meaningful = analyzer.extract_meaningful_lines(code, detect_language(path)) if code else []
+    features = [analyzer.extract_line_features(code_line, comments_stripped=True)
+                for _, _, code_line in meaningful]
+    # Lines without tokens (e.g. 'x, y') stand for themselves
+    sketch = frozenset().union(*(line.token_set or {line.normalized} for line in features))
+    return path, features, sketch
+
+
+def match_source(analyzer: CodeSimilarityAnalyzer, query: Tuple[str, List[LineFeatures], frozenset],
+                 path: str, features: List[LineFeatures], sketch: frozenset,
+                 similarity_threshold: float) -> Dict:
+    """Similarity of one preprocessed file to the preprocessed query."""
+    query_path, query_features, query_sketch = query
+    # No line pair shares a token or identical tokenless text, so none can reach the threshold
+    pruned = similarity_threshold > DISJOINT_TOKENS_MAX_SIMILARITY and query_sketch.isdisjoint(sketch)
+    matches = ([] if pruned or not query_features or not features else
+               analyzer.match_line_features(query_features, features, similarity_threshold))
+    results = analyzer.summarize_matches(query_path, path, True, len(query_features), len(features),
+                                         matches, similarity_threshold)
+    return {
+        'path': path,
+        'lines_count': len(features),
+        'similar_lines_count': results['similar_lines_count'],
+        'similarity_percentage': results['similarity_percentage'],
+        'pruned': pruned,
+    }
+
+
+# Per-process state for stage workers, set once by their initializer
+_stage_analyzer: Optional[CodeSimilarityAnalyzer] = None
+_stage_query: Optional[Tuple[str, List[LineFeatures], frozenset]] = None
+_stage_threshold: float = 0.7
+
+
+def _init_stage(query=None, similarity_threshold: float = 0.7):
+    global _stage_analyzer, _stage_query, _stage_threshold
+    _stage_analyzer = CodeSimilarityAnalyzer()
+    _stage_query = query
+    _stage_threshold = similarity_threshold
+
+
+def _preprocess_item(item: Tuple[str, Optional[str]]):
+    return preprocess_source(_stage_analyzer, *item)
+
+
+def _match_item(item: Tuple[str, List[LineFeatures], frozenset]) -> Dict:
+    return match_source(_stage_analyzer, _stage_query, *item, _stage_threshold)
+
+
+def _stage_loop(stage: str, func: Callable[[Any], Any], inbox, outbox, reports):
+    """Apply func to items from inbox until _DONE, then report this worker's counters."""
+    items, busy, starved, blocked = 0, 0.0, 0.0, 0.0
+    errors = []
+    while True:
+        started = time.perf_counter()
+        item = inbox.get()
+        received = time.perf_counter()
+        starved += received - started
+        if item is _DONE:
+            break
+        try:
+            output = func(item)
+        except Exception as e:
+            errors.append((item if isinstance(item, str) else item[0], f"{type(e).__name__}: {e}"))
+            output = None
+        finished = time.perf_counter()
+        busy += finished - received
+        if output is not None:
+            outbox.put(output)
+            blocked += time.perf_counter() - finished
+        items += 1
+    reports.put((stage, items, busy, starved, blocked, errors))
+
+
+def _process_stage(stage: str, func, initargs: tuple, inbox, outbox, reports):
+    _init_stage(*initargs)
+    _stage_loop(stage, func, inbox, outbox, reports)
+
+
+def _check_stages(workers: List[Tuple[str, Any]]):
+    """Raise if a stage process died, stopping the others, whose queues would never drain."""
+    for stage, process in workers:
+        if process.exitcode not in (None, 0):
+            for _, other in workers:
+                if other.is_alive():
+                    other.terminate()
+            raise RuntimeError(f"A {stage} worker exited with code {process.exitcode}; scan aborted")
+
+
+def _stage_report(stage: str, workers: int, counters: List[tuple]) -> Dict:
+    items = sum(c[1] for c in counters)
+    busy = sum(c[2] for c in counters)
+    return {
+        'stage': stage,
+        'workers': workers,
+        'items': items,
+        'busy_seconds': round(busy, 4),
+        # What the stage could sustain on its own with all its workers busy
+        'items_per_second': round(items * workers / busy, 1) if busy else 0.0,
+        'starved_seconds': round(sum(c[3] for c in counters), 4),
+        'blocked_seconds': round(sum(c[4] for c in counters), 4),
+    }
+
+
+def _scan_results(query_path: str, results: List[Dict], stages: List[Dict], errors: List,
+                  wall_seconds: float) -> Dict:
+    results.sort(key=lambda r: (-r['similarity_percentage'], r['path']))
+    return {
+        'query': query_path,
+        'files_scanned': len(results),
+        'wall_seconds': round(wall_seconds, 4),
+        # Busy time of the slowest stage per worker: the floor for a pipelined scan
+        'bottleneck_seconds': round(max(s['busy_seconds'] / s['workers'] for s in stages), 4),
+        'stages': stages,
+        'errors': sorted(errors),
+        'results': results,
+    }
+
+
+def scan_corpus(query_path: str, paths: Iterable[str], similarity_threshold: float = 0.7,
+                read_threads: int = 4, preprocess_workers: int = 1, match_workers: int = 1,
+                queue_size: int = DEFAULT_QUEUE_SIZE) -> Dict:
+    """
+    Compare query_path with every file in paths through the staged pipeline.
+
+    Returns:
+        Dictionary with 'files_scanned', 'wall_seconds', 'bottleneck_seconds',
+        'stages' (per-stage items, busy/starved/blocked seconds and
+        items_per_second), 'errors' as (path, message) and 'results' per
+        file ('path', 'lines_count', 'similar_lines_count',
+        'similarity_percentage', 'pruned'), most similar first
+
+    Raises:
+        RuntimeError: A preprocess or match worker process died
+    """
+    analyzer = CodeSimilarityAnalyzer()
+    query = preprocess_source(analyzer, query_path, analyzer.read_source(query_path))
+    paths = list(paths)
+    started = time.perf_counter()
+
+    context = multiprocessing.get_context()
+    read_queue = context.Queue(queue_size)
+    match_queue = context.Queue(queue_size)
+    result_queue = context.Queue()
+    reports = context.Queue()
+    # Processes are started before any thread so forking never copies a running thread
+    preprocessors = [context.Process(target=_process_stage, daemon=True,
+                                     args=('preprocess', _preprocess_item, (), read_queue, match_queue, reports))
+                     for _ in range(preprocess_workers)]
+    matchers = [context.Process(target=_process_stage, daemon=True,
+                                args=('match', _match_item, (query, similarity_threshold),
+                                      match_queue, result_queue, reports))
+                for _ in range(match_workers)]
+    for process in preprocessors + matchers:
+        process.start()
+
+    path_queue = queue.Queue()
+    for path in paths:
+        path_queue.put(path)
+    for _ in range(read_threads):
+        path_queue.put(_DONE)
+    readers = [threading.Thread(target=_stage_loop, daemon=True, name='scan-reader',
+                                args=('read', lambda path: (path, analyzer.read_source(path)),
+                                      path_queue, read_queue, reports))
+               for _ in range(read_threads)]
+    for thread in readers:
+        thread.start()
+
+    def close_stages():
+        # A stage's input ends once every worker of the stage before it has finished
+        for upstream, inbox, downstream in ((readers, read_queue, preprocess_workers),
+                                            (preprocessors, match_queue, match_workers),
+                                            (matchers, result_queue, 1)):
+            for worker in upstream:
+                worker.join()
+            for _ in range(downstream):
+                inbox.put(_DONE)
+
+    closer = threading.Thread(target=close_stages, daemon=True, name='scan-closer')
+    closer.start()
+    workers = [('preprocess', process) for process in preprocessors] + [('match', process) for process in matchers]
+    results, reported = [], []
+    expected_reports = read_threads + preprocess_workers + match_workers
+    finished = False
+    while not finished or len(reported) < expected_reports:
+        # Reports are taken as they arrive: a worker can't exit until its report is read
+        try:
+            reported.append(reports.get_nowait())
+            continue
+        except queue.Empty:
+            pass
+        try:
+            item = (reports if finished else result_queue).get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            _check_stages(workers)
+            continue
+        if finished:
+            reported.append(item)
+        elif item is _DONE:
+            finished = True
+            wall_seconds = time.perf_counter() - started
+        else:
+            results.append(item)
+    closer.join()
+    _check_stages(workers)
+
+    counters: Dict[str, List[tuple]] = {'read': [], 'preprocess': [], 'match': []}
+    errors = []
+    for stage, *counter, stage_errors in reported:
+        counters[stage].append((stage, *counter))
+        errors.extend(stage_errors)
+    stages = [_stage_report('read', read_threads, counters['read']),
+              _stage_report('preprocess', preprocess_workers, counters['preprocess']),
+              _stage_report('match', match_workers, counters['match'])]
+    return _scan_results(query_path, results, stages, errors, wall_seconds)
+
+
+def scan_corpus_serial(query_path: str, paths: Iterable[str], similarity_threshold: float = 0.7) -> Dict:
+    """The same scan one file and one stage at a time, with the same report (for comparison)."""
+    analyzer = CodeSimilarityAnalyzer()
+    query = preprocess_source(analyzer, query_path, analyzer.read_source(query_path))
+    seconds = {'read': 0.0, 'preprocess': 0.0, 'match': 0.0}
+    results = []
+    started = time.perf_counter()
+    for path in paths:
+        t0 = time.perf_counter()
+        code = analyzer.read_source(path)
+        t1 = time.perf_counter()
+        _, features, sketch = preprocess_source(analyzer, path, code)
+        t2 = time.perf_counter()
+        results.append(match_source(analyzer, query, path, features, sketch, similarity_threshold))
+        t3 = time.perf_counter()
+        for stage, elapsed in (('read', t1 - t0), ('preprocess', t2 - t1), ('match', t3 - t2)):
+            seconds[stage] += elapsed
+    wall_seconds = time.perf_counter() - started
+    stages = [_stage_report(stage, 1, [(stage, len(results), busy, 0.0, 0.0)])
+              for stage, busy in seconds.items()]
+    return _scan_results(query_path, results, stages, [], wall_seconds)
+
+
+def print_scan_report(scan: Dict, limit: int = 20):
+    """Print per-stage throughput and the most similar files."""
+    print(f"Scanned {scan['files_scanned']} files in {scan['wall_seconds']:.3f}s "
+          f"(slowest stage {scan['bottleneck_seconds']:.3f}s)")
+    print(f"  {'stage':<11} {'workers':>7} {'items':>7} {'busy s':>9} {'items/s':>9} "
+          f"{'starved s':>10} {'blocked s':>10}")
+    for stage in scan['stages']:
+        print(f"  {stage['stage']:<11} {stage['workers']:>7} {stage['items']:>7} {stage['busy_seconds']:>9.3f} "
+              f"{stage['items_per_second']:>9.1f} {stage['starved_seconds']:>10.3f} "
+              f"{stage['blocked_seconds']:>10.3f}")
+    for path, message in scan['errors']:
+        print(f"  error: {path}: {message}")
+    for result in scan['results'][:limit]:
+        print(f"  {result['similarity_percentage']:6.2f}%  {result['path']}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compare one file against every source file under a directory")
+    parser.add_argument('query', help="File to compare against the corpus")
+    parser.add_argument('root', help="Corpus directory")
+    parser.add_argument('--threshold', type=float, default=0.7, help="Line similarity threshold (default 0.7)")
+    parser.add_argument('--read-threads', type=int, default=4, help="File reader threads (default 4)")
+    parser.add_argument('--preprocess-workers', type=int, default=1, help="Preprocessing processes (default 1)")
+    parser.add_argument('--match-workers', type=int, default=1, help="Matching processes (default 1)")
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f"Items buffered between stages (default {DEFAULT_QUEUE_SIZE})")
+    parser.add_argument('--serial', action='store_true', help="Run the stages one after another instead")
+    parser.add_argument('--limit', type=int, default=20, help="Number of files to print (default 20)")
+    args = parser.parse_args(argv)
+
+    paths = iter_source_files(args.root)
+    if args.serial:
+        scan = scan_corpus_serial(args.query, paths, args.threshold)
+    else:
+        scan = scan_corpus(args.query, paths, args.threshold, args.read_threads,
+                           args.preprocess_workers, args.match_workers, args.queue_size)
+    print_scan_report(scan, args.limit)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
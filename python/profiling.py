@@ -0,0 +1,204 @@
+"""
+Built-in profiling of a single analysis.
+
+The run executes under cProfile for per-function call counts and times, under
+tracemalloc for allocation sites, and alongside a sampling thread that
+records the analyzing thread's stack every few milliseconds. The samples
+become collapsed stacks ("outer;inner;leaf count" lines) that flamegraph.pl,
+speedscope and similar tools read directly. Allocation sites are captured at
+the highest traced memory seen, not just at the end of the run. A bundle
+directory holds the report together with copies of the inputs and the
+options, so a slow pair can be attached to a bug report and re-profiled.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from typing import List, Tuple, Dict, Optional, Callable, Any
+
+
+DEFAULT_SAMPLE_INTERVAL = 0.002
+# A new allocation snapshot is taken when traced memory grows past the last one by this factor
+_SNAPSHOT_GROWTH = 1.1
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack and keeps the peak tracemalloc snapshot."""
+
+    def __init__(self, thread_id: int, interval: float, root_code):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        # Frames from this code object outwards belong to the caller, not the profiled run
+        self.root_code = root_code
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.snapshot: Optional[tracemalloc.Snapshot] = None
+        self.snapshot_size = 0
+        self.stopped = threading.Event()
+        # Set only while the profiled function itself runs
+        self.active = False
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id) if self.active else None
+            stack = []
+            while frame is not None and frame.f_code is not self.root_code:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+            current = tracemalloc.get_traced_memory()[0]
+            if current > self.snapshot_size * _SNAPSHOT_GROWTH:
+                self.snapshot = tracemalloc.take_snapshot()
+                self.snapshot_size = current
+
+
+def _top_functions(profiler: cProfile.Profile, limit: int) -> List[Dict]:
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f"{name} ({os.path.basename(filename)}:{line})",
+            'calls': calls,
+            'total_seconds': round(total, 6),
+            'cumulative_seconds': round(cumulative, 6),
+        })
+    rows.sort(key=lambda row: (-row['cumulative_seconds'], row['function']))
+    return rows[:limit]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[Dict]:
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__),
+                                       tracemalloc.Filter(False, __file__)])
+    return [{
+        'site': f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+        'size_kib': round(stat.size / 1024, 1),
+        'blocks': stat.count,
+    } for stat in snapshot.statistics('lineno')[:limit]]
+
+
+def profile_call(func: Callable[[], Any], limit: int = 20,
+                 sample_interval: float = DEFAULT_SAMPLE_INTERVAL) -> Tuple[Any, Dict]:
+    """
+    Run func() under cProfile, tracemalloc and a stack sampler.
+
+    Returns:
+        (func's result, profile summary) where the summary has 'wall_seconds',
+        'peak_memory_kib', 'top_functions' (by cumulative time),
+        'top_allocations' (at peak traced memory), 'samples' and
+        'collapsed_stacks'
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    sampler = _StackSampler(threading.get_ident(), sample_interval, profile_call.__code__)
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    sampler.start()
+    try:
+        profiler.enable()
+        sampler.active = True
+        try:
+            result = func()
+        finally:
+            sampler.active = False
+            profiler.disable()
+    finally:
+        sampler.stopped.set()
+        sampler.join()
+        wall_seconds = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        snapshot = sampler.snapshot or tracemalloc.take_snapshot()
+        if not tracing:
+            tracemalloc.stop()
+
+    summary = {
+        'wall_seconds': round(wall_seconds, 4),
+        'peak_memory_kib': round(peak / 1024, 1),
+        'top_functions': _top_functions(profiler, limit),
+        'top_allocations': _top_allocations(snapshot, limit),
+        'samples': sum(sampler.stacks.values()),
+        'collapsed_stacks': ''.join(f"{stack} {count}\n" for stack, count in sorted(sampler.stacks.items())),
+    }
+    return result, summary
+
+
+def format_profile(summary: Dict) -> str:
+    """Human-readable hot-spot report for a profile summary."""
+    lines = [f"Wall time: {summary['wall_seconds']:.3f}s, peak traced memory: "
+             f"{summary['peak_memory_kib']:.1f} KiB, {summary['samples']} stack samples",
+             "", "Top functions by cumulative time:",
+             f"  {'cumulative':>10} {'own':>10} {'calls':>9}  function"]
+    for row in summary['top_functions']:
+        lines.append(f"  {row['cumulative_seconds']:>10.4f} {row['total_seconds']:>10.4f} "
+                     f"{row['calls']:>9}  {row['function']}")
+    lines += ["", "Top allocation sites at peak memory:", f"  {'KiB':>10} {'blocks':>9}  site"]
+    for row in summary['top_allocations']:
+        lines.append(f"  {row['size_kib']:>10.1f} {row['blocks']:>9}  {row['site']}")
+    return '\n'.join(lines) + '\n'
+
+
+def write_profile_bundle(directory: str, results: Dict, inputs: Tuple[str, str], is_file: bool,
+                         options: Dict) -> List[str]:
+    """
+    Save a profiled analysis as an attachable bundle.
+
+    Writes report.txt, stacks.collapsed, profile.json, the two inputs and
+    options.json (analyze_code_similarity keyword arguments); returns the
+    paths written.
+    """
+    os.makedirs(directory, exist_ok=True)
+    summary = results['profile']
+    written = []
+
+    def write(name: str, content: str):
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        written.append(path)
+
+    write('report.txt', format_profile(summary))
+    write('stacks.collapsed', summary['collapsed_stacks'])
+    write('profile.json', json.dumps({key: value for key, value in summary.items()
+                                      if key != 'collapsed_stacks'}, indent=2))
+    input_names = []
+    for label, value in zip('ab', inputs):
+        if is_file:
+            name = f"input_{label}{os.path.splitext(value)[1]}"
+            shutil.copyfile(value, os.path.join(directory, name))
+            written.append(os.path.join(directory, name))
+        else:
+            name = f"input_{label}.txt"
+            write(name, value)
+        input_names.append(name)
+    if not is_file:
+        options = {'language': 'generic', **options}
+    write('options.json', json.dumps({'inputs': input_names, **options}, indent=2))
+    return written
+
+
+def replay_profile_bundle(directory: str, analyzer=None) -> Dict:
+    """Re-run a saved bundle's analysis with profiling on; returns the new results."""
+    if analyzer is None:
+        try:
+            from .code_similarity_analyzer import CodeSimilarityAnalyzer
+        except ImportError:  # Running the analyzer directly as a script
+            from code_similarity_analyzer import CodeSimilarityAnalyzer
+        analyzer = CodeSimilarityAnalyzer()
+    with open(os.path.join(directory, 'options.json'), encoding='utf-8') as f:
+        options = json.load(f)
+    input_a, input_b = (os.path.join(directory, name) for name in options.pop('inputs'))
+    return analyzer.analyze_code_similarity(input_a, input_b, is_file=True, verbose=False,
+                                            profile=True, **options)
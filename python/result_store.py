@@ -0,0 +1,140 @@
+"""
+Persistent SQLite store for analysis results.
+
+Results are keyed by the SHA-256 of both inputs' contents, the similarity
+threshold, the analysis options that change the result, and the analyzer
+version, so a comparison re-run on unchanged inputs (CI retries, report
+regeneration) is answered without recomputation. The database runs in WAL
+mode, letting many processes on one host read and write it concurrently.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import List, Dict, Optional, Iterable, Tuple
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    hash_a TEXT NOT NULL,
+    hash_b TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    options TEXT NOT NULL,
+    analyzer_version TEXT NOT NULL,
+    results TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (hash_a, hash_b, threshold, options, analyzer_version)
+);
+CREATE INDEX IF NOT EXISTS results_hash_b ON results (hash_b);
+"""
+
+
+def content_hash(code: str) -> str:
+    """SHA-256 hex digest of source text."""
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def _options_key(options: Optional[Dict]) -> str:
+    return json.dumps(options or {}, sort_keys=True, separators=(',', ':'))
+
+
+def _decode(payload: str) -> Dict:
+    results = json.loads(payload)
+    results['similar_matches'] = [tuple(match) for match in results.get('similar_matches', [])]
+    return results
+
+
+class ResultStore:
+    """
+    Results of analyze_code_similarity keyed by content hashes.
+
+    Pass an instance as ``result_store`` to ``analyze_code_similarity``, or use
+    get/put directly. Each process should open its own ResultStore.
+    """
+
+    def __init__(self, path: str, analyzer_version: Optional[str] = None, timeout: float = 30.0):
+        if analyzer_version is None:
+            try:
+                from .code_similarity_analyzer import CodeSimilarityAnalyzer
+            except ImportError:  # Running the analyzer directly as a script
+                from code_similarity_analyzer import CodeSimilarityAnalyzer
+            analyzer_version = CodeSimilarityAnalyzer.VERSION
+        self.path = path
+        self.analyzer_version = analyzer_version
+        self._connection = sqlite3.connect(path, timeout=timeout)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(_SCHEMA)
+
+    def get(self, hash_a: str, hash_b: str, threshold: float,
+            options: Optional[Dict] = None) -> Optional[Dict]:
+        """Return stored results for this comparison, or None."""
+        row = self._connection.execute(
+            'SELECT results FROM results WHERE hash_a = ? AND hash_b = ? AND threshold = ? '
+            'AND options = ? AND analyzer_version = ?',
+            (hash_a, hash_b, threshold, _options_key(options), self.analyzer_version)).fetchone()
+        return _decode(row[0]) if row else None
+
+    def put(self, hash_a: str, hash_b: str, threshold: float, results: Dict,
+            options: Optional[Dict] = None):
+        """Store results, replacing any earlier entry for the same key."""
+        with self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (hash_a, hash_b, threshold, _options_key(options), self.analyzer_version,
+                 json.dumps(results), time.time()))
+
+    def put_many(self, entries: Iterable[Tuple[str, str, float, Dict, Optional[Dict]]]):
+        """Store several (hash_a, hash_b, threshold, results, options) entries in one transaction."""
+        now = time.time()
+        with self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(hash_a, hash_b, threshold, _options_key(options), self.analyzer_version,
+                  json.dumps(results), now)
+                 for hash_a, hash_b, threshold, results, options in entries])
+
+    def results_for_hash(self, content_digest: str, threshold: Optional[float] = None) -> List[Dict]:
+        """
+        Every stored result (for the current analyzer version) in which the
+        given content hash is either input, as dicts with the key fields added.
+        """
+        query = ('SELECT hash_a, hash_b, threshold, options, results FROM results '
+                 'WHERE (hash_a = ? OR hash_b = ?) AND analyzer_version = ?')
+        params = [content_digest, content_digest, self.analyzer_version]
+        if threshold is not None:
+            query += ' AND threshold = ?'
+            params.append(threshold)
+        entries = []
+        for hash_a, hash_b, stored_threshold, options, payload in self._connection.execute(query, params):
+            entries.append({
+                'hash_a': hash_a,
+                'hash_b': hash_b,
+                'threshold': stored_threshold,
+                'options': json.loads(options),
+                'results': _decode(payload),
+            })
+        return entries
+
+    def prune(self, older_than_seconds: Optional[float] = None) -> int:
+        """Delete results of other analyzer versions and, optionally, old entries."""
+        query = 'DELETE FROM results WHERE analyzer_version != ?'
+        params = [self.analyzer_version]
+        if older_than_seconds is not None:
+            query += ' OR created_at < ?'
+            params.append(time.time() - older_than_seconds)
+        with self._connection:
+            return self._connection.execute(query, params).rowcount
+
+    def __len__(self) -> int:
+        return self._connection.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def close(self):
+        self._connection.close()
+
+    def __enter__(self) -> 'ResultStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
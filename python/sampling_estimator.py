@@ -0,0 +1,237 @@
+"""
+Sampling-based similarity estimation for very large inputs.
+
+Lines of each input are sampled in random order. A token inverted index
+(ranked by token Jaccard) gives every sampled line its most promising
+partners on the other side, and those candidates are matched greedily as in
+the full analysis. Sampled lines only compete with each other for partners,
+so a match they find may go to an unsampled rival in the full analysis: each
+match counts as its line's equally good partners divided by the partner's
+equally good rivals (at most 1). Both inputs estimate the matched line count
+from these shares and the estimate is their mean. The interval spans both
+inputs' bounds: Wilson intervals, with finite population correction, on the
+shared match rates for the low end and on the plain match rates (which
+rivals can only lower) for the high end, and normal intervals on the match
+quality, pushed through the analyzer's similarity formula. Samples double
+until the interval is narrower than the requested width. An input that
+would be sampled completely is small, so the inputs are then matched
+exactly instead (candidate pruning would otherwise make a full sample
+inexact).
+
+``confidence`` is the level of those sampling intervals, not a calibrated
+coverage: the rival shares are a heuristic. On every same-language pair of
+the samples (28 ordered pairs x 28 seeds at thresholds 0.5, 0.7 and 0.9,
+interval_width 20) the result contained the full analysis result in all
+2352 runs, 434 of them stopped before an exact match. Inputs with many
+repeated lines get wide intervals and often end in an exact match.
+"""
+
+import math
+import random
+from collections import defaultdict
+from statistics import NormalDist
+from typing import List, Tuple, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+
+
+class _CandidateIndex:
+    """Finds the lines of one input that share the most tokens with a given line."""
+
+    def __init__(self, features: List['LineFeatures'], candidates_per_line: int):
+        self.features = features
+        self.candidates_per_line = candidates_per_line
+        self.lines_by_text: Dict[str, int] = {}
+        self.lines_by_token = defaultdict(list)
+        for index, line in enumerate(features):
+            self.lines_by_text.setdefault(line.normalized, index)
+            for token in line.token_set:
+                self.lines_by_token[token].append(index)
+
+    def candidates(self, line: 'LineFeatures') -> List[int]:
+        shared = defaultdict(int)
+        for token in line.token_set:
+            for index in self.lines_by_token.get(token, ()):
+                shared[index] += 1
+        # Rank by token Jaccard so lines made of common tokens don't crowd out the rest
+        size = len(line.token_set)
+        candidates = sorted(shared, key=lambda index: (
+            -shared[index] / (size + len(self.features[index].token_set) - shared[index]), index))
+        candidates = candidates[:self.candidates_per_line]
+        exact = self.lines_by_text.get(line.normalized)
+        if exact is not None and exact not in candidates:
+            candidates.append(exact)
+        return candidates
+
+
+class _SampledSide:
+    """Sampled lines of one input, greedily matched against all lines of the other."""
+
+    def __init__(self, analyzer: 'CodeSimilarityAnalyzer', features: List['LineFeatures'],
+                 other: List['LineFeatures'], threshold: float, candidates_per_line: int,
+                 rng: random.Random):
+        self.analyzer = analyzer
+        self.features = features
+        self.other = other
+        self.threshold = threshold
+        self.index = _CandidateIndex(other, candidates_per_line)
+        self.rivals = _CandidateIndex(features, candidates_per_line)
+        self.rivals_cache: Dict[Tuple[int, float], int] = {}
+        self.order = list(range(len(features)))
+        rng.shuffle(self.order)
+        self.potential: List[Tuple[int, int, float]] = []
+        self.size = 0
+
+    def grow(self, size: int) -> Tuple[List[float], List[float]]:
+        """
+        Extend the sample to size lines.
+
+        Returns:
+            Each sampled line's matched score and its expected share of a match
+            in the full analysis (both 0 if unmatched)
+        """
+        for i in self.order[self.size:size]:
+            line = self.features[i]
+            for j in self.index.candidates(line):
+                score = self.analyzer.similarity_from_features(line, self.other[j])
+                if score >= self.threshold:
+                    self.potential.append((i, j, score))
+        self.size = max(self.size, size)
+        # Same order as the full analysis, so ties resolve the same way
+        self.potential.sort(key=lambda x: (-x[2], x[0], x[1]))
+        matched = {i: (j, score) for i, j, score in self.analyzer.select_matches(self.potential)}
+        partners = defaultdict(int)
+        for i, _, score in self.potential:
+            if i in matched and score >= matched[i][1]:
+                partners[i] += 1
+        scores, shares = [], []
+        for i in self.order[:self.size]:
+            if i in matched:
+                j, score = matched[i]
+                scores.append(score)
+                shares.append(min(1.0, partners[i] / self._rivals(j, score)))
+            else:
+                scores.append(0.0)
+                shares.append(0.0)
+        return scores, shares
+
+    def _rivals(self, j: int, score: float) -> int:
+        """
+        Lines of this input scoring at least score with line j of the other.
+        Sampled lines only compete with each other, so a line with more such
+        rivals than equally good partners may lose its match in the full analysis.
+        """
+        key = (j, score)
+        if key not in self.rivals_cache:
+            partner = self.other[j]
+            self.rivals_cache[key] = max(1, sum(
+                1 for k in self.rivals.candidates(partner)
+                if self.analyzer.similarity_from_features(self.features[k], partner) >= score))
+        return self.rivals_cache[key]
+
+
+def _population_factor(sampled: int, population: int) -> float:
+    """Finite population correction for the variance of a sample mean."""
+    return (population - sampled) / (population - 1) if population > 1 else 0.0
+
+
+def _rate_interval(hits: int, sampled: int, population: int, z: float) -> Tuple[float, float]:
+    """Wilson score interval for a proportion, narrowed by finite population correction."""
+    rate = hits / sampled
+    factor = _population_factor(sampled, population)
+    if factor == 0.0:
+        return rate, rate
+    n = sampled / factor
+    denominator = 1 + z * z / n
+    center = (rate + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(rate * (1 - rate) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+def _quality_interval(scores: List[float], threshold: float, factor: float,
+                      z: float) -> Tuple[float, float, float]:
+    """Mean match score and its interval, within [threshold, 1]."""
+    if not scores:
+        return threshold, threshold, 1.0
+    mean = sum(scores) / len(scores)
+    if len(scores) < 2:
+        return mean, threshold, 1.0
+    variance = sum((s - mean) ** 2 for s in scores) / (len(scores) - 1)
+    half = z * math.sqrt(variance * factor / len(scores))
+    return mean, max(threshold, mean - half), min(1.0, mean + half)
+
+
+def estimate_similarity(analyzer: 'CodeSimilarityAnalyzer', features_a: List['LineFeatures'],
+                        features_b: List['LineFeatures'], threshold: float = 0.7,
+                        interval_width: float = 5.0, confidence: float = 0.95,
+                        initial_sample: int = 50, candidates_per_line: int = 50,
+                        seed: Optional[int] = 0) -> Dict:
+    """
+    Estimate similarity_percentage from samples of both inputs' lines.
+
+    Returns:
+        Dictionary with 'similarity_percentage' (the estimate),
+        'confidence_interval', 'confidence', 'sample_size_a', 'sample_size_b',
+        'exhaustive' (True when the inputs were matched exactly) and
+        'estimated_match_rate'
+    """
+    total_a, total_b = len(features_a), len(features_b)
+    rng = random.Random(seed)
+    side_a = _SampledSide(analyzer, features_a, features_b, threshold, candidates_per_line, rng)
+    side_b = _SampledSide(analyzer, features_b, features_a, threshold, candidates_per_line, rng)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+
+    def percentage(count: float, quality: float) -> float:
+        return analyzer.similarity_percentage_from_counts(count, count * quality, total_a, total_b)
+
+    sample_size = max(1, initial_sample)
+    while True:
+        size_a, size_b = min(sample_size, total_a), min(sample_size, total_b)
+        exhaustive = size_a == total_a or size_b == total_b
+        if exhaustive:
+            # Sampling one input completely means it is small: match it exactly
+            matches = analyzer.match_line_features(features_a, features_b, threshold)
+            estimate = low = high = analyzer.similarity_percentage_from_counts(
+                len(matches), sum(score for _, _, score in matches), total_a, total_b)
+            size_a, size_b, rate_a = total_a, total_b, len(matches) / total_a
+            break
+        scores_a, shares_a = side_a.grow(size_a)
+        scores_b, shares_b = side_b.grow(size_b)
+        matched_a = [s for s in scores_a if s > 0]
+        matched_b = [s for s in scores_b if s > 0]
+        rate_a, rate_b = sum(shares_a) / size_a, sum(shares_b) / size_b
+        # Rivals can only take matches away, so the sampled match rate bounds from above
+        high_a = _rate_interval(len(matched_a), size_a, total_a, z)[1]
+        high_b = _rate_interval(len(matched_b), size_b, total_b, z)[1]
+        low_a = _rate_interval(sum(shares_a), size_a, total_a, z)[0]
+        low_b = _rate_interval(sum(shares_b), size_b, total_b, z)[0]
+        quality_a = _quality_interval(matched_a, threshold, _population_factor(size_a, total_a), z)
+        quality_b = _quality_interval(matched_b, threshold, _population_factor(size_b, total_b), z)
+        # Both sides estimate the same matched count. Sampled lines only compete
+        # with each other for partners, so each side's greedy matching can be off
+        # by more than its sampling error; the interval spans both sides' bounds.
+        count = (total_a * rate_a + total_b * rate_b) / 2
+        low_count = min(total_a * low_a, total_b * low_b)
+        high_count = min(max(total_a * high_a, total_b * high_b), total_a, total_b)
+        scores = matched_a + matched_b
+        quality = sum(scores) / len(scores) if scores else threshold
+        low_quality = min(quality_a[1], quality_b[1])
+        high_quality = max(quality_a[2], quality_b[2])
+
+        estimate = percentage(count, quality)
+        low = min(estimate, percentage(low_count, low_quality))
+        high = max(estimate, percentage(high_count, high_quality))
+        if high - low <= interval_width:
+            break
+        sample_size *= 2
+
+    return {
+        'similarity_percentage': round(estimate, 2),
+        'confidence_interval': [round(low, 2), round(high, 2)],
+        'confidence': confidence,
+        'sample_size_a': size_a,
+        'sample_size_b': size_b,
+        'exhaustive': exhaustive,
+        'estimated_match_rate': round(rate_a, 4),
+    }
@@ -0,0 +1,316 @@
+"""
+Sharded corpus search across worker nodes.
+
+The reference corpus is split into shards by a stable hash of each document
+ID. Every worker node holds one ShardIndex and serves queries for it over
+TCP with the same newline-delimited JSON protocol as the analysis daemon.
+A ShardCoordinator sends the query to all shards in parallel and merges
+their top-K hits. Shards that time out or fail are listed in the response,
+which is then marked partial, instead of failing the whole search. Merged
+hits equal a search over one unsharded index.
+"""
+
+import os
+import sys
+import json
+import time
+import zlib
+import socket
+import argparse
+import threading
+import socketserver
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Dict, Set, Optional
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+from .code_lexer import detect_language
+from .block_matcher import DISJOINT_TOKENS_MAX_SIMILARITY
+from .pipeline_scan import iter_source_files
+
+
+DEFAULT_TOP_K = 10
+DEFAULT_SHARD_TIMEOUT = 5.0
+
+
+class _ShardTCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def shard_for(doc_id: str, shard_count: int) -> int:
+    """The shard a document belongs to; stable across processes and machines."""
+    return zlib.crc32(doc_id.encode('utf-8')) % shard_count
+
+
+def _hit_order(hit: Dict) -> tuple:
+    return -hit['similarity_percentage'], -hit['similar_lines_count'], hit['doc_id']
+
+
+class ShardIndex:
+    """
+    The documents of one shard, with a token index for skipping disjoint
+    documents. Lines without tokens only match identical lines, so they are
+    indexed by their normalized text.
+    """
+
+    def __init__(self, analyzer: Optional[CodeSimilarityAnalyzer] = None):
+        self.analyzer = analyzer or CodeSimilarityAnalyzer()
+        self.documents: Dict[str, List[LineFeatures]] = {}
+        self.docs_by_token: Dict[str, Set[str]] = defaultdict(set)
+        self.docs_by_tokenless_line: Dict[str, Set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, doc_id: str, code: str, language: Optional[str] = None) -> int:
+        """Index one document; returns its number of meaningful lines."""
+        if doc_id in self.documents:
+            raise ValueError(f"Document '{doc_id}' is already indexed")
+        meaningful = self.analyzer.extract_meaningful_lines(code, language) if code else []
+        features = [self.analyzer.extract_line_features(code_line, comments_stripped=True)
+                    for _, _, code_line in meaningful]
+        self.documents[doc_id] = features
+        for line in features:
+            for token in line.token_set:
+                self.docs_by_token[token].add(doc_id)
+            if not line.token_set:
+                self.docs_by_tokenless_line[line.normalized].add(doc_id)
+        return len(features)
+
+    def add_directory(self, root: str, shard: int = 0, shard_count: int = 1) -> int:
+        """Index the files under root that belong to shard; doc IDs are paths relative to root."""
+        added = 0
+        for path in iter_source_files(root):
+            doc_id = os.path.relpath(path, root)
+            if shard_for(doc_id, shard_count) == shard:
+                self.add(doc_id, self.analyzer.read_source(path) or '', detect_language(path))
+                added += 1
+        return added
+
+    def search(self, code: str, language: Optional[str] = None, similarity_threshold: float = 0.7,
+               top_k: int = DEFAULT_TOP_K) -> List[Dict]:
+        """
+        The top_k documents most similar to code.
+
+        Returns:
+            Hits with 'doc_id', 'similarity_percentage', 'similar_lines_count'
+            and 'lines_count', most similar first (ties by doc_id); documents
+            with no similar line are left out
+        """
+        analyzer = self.analyzer
+        meaningful = analyzer.extract_meaningful_lines(code, language) if code else []
+        query = [analyzer.extract_line_features(code_line, comments_stripped=True)
+                 for _, _, code_line in meaningful]
+        if similarity_threshold > DISJOINT_TOKENS_MAX_SIMILARITY:
+            # Documents sharing no token or tokenless line with the query cannot have a similar line
+            candidates = set()
+            for line in query:
+                for token in line.token_set:
+                    candidates.update(self.docs_by_token.get(token, ()))
+                if not line.token_set:
+                    candidates.update(self.docs_by_tokenless_line.get(line.normalized, ()))
+        else:
+            candidates = self.documents
+
+        hits = []
+        for doc_id in candidates:
+            features = self.documents[doc_id]
+            if not query or not features:
+                continue
+            matches = analyzer.match_line_features(query, features, similarity_threshold)
+            if not matches:
+                continue
+            results = analyzer.summarize_matches('query', doc_id, True, len(query), len(features),
+                                                 matches, similarity_threshold)
+            hits.append({
+                'doc_id': doc_id,
+                'similarity_percentage': results['similarity_percentage'],
+                'similar_lines_count': results['similar_lines_count'],
+                'lines_count': len(features),
+            })
+        hits.sort(key=_hit_order)
+        return hits[:top_k]
+
+
+class ShardServer:
+    """Serve one ShardIndex's searches over TCP, one thread per connection."""
+
+    def __init__(self, index: ShardIndex, host: str = '127.0.0.1', port: int = 0, name: str = 'shard'):
+        self.index = index
+        self.name = name
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    response = server.handle(line)
+                    self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+                    self.wfile.flush()
+
+        self._server = _ShardTCPServer((host, port), Handler)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self._server.server_address[:2]
+
+    def handle(self, line: bytes) -> Dict:
+        """Decode one request line, run it and build the response."""
+        response = {'id': None}
+        try:
+            request = json.loads(line)
+            response['id'] = request.get('id')
+            method, params = request.get('method'), request.get('params') or {}
+            if method == 'search':
+                started = time.perf_counter()
+                hits = self.index.search(params['code'], params.get('language'),
+                                         params.get('similarity_threshold', 0.7),
+                                         params.get('top_k', DEFAULT_TOP_K))
+                response['result'] = {'shard': self.name, 'documents': len(self.index), 'hits': hits,
+                                      'search_ms': round((time.perf_counter() - started) * 1000, 3)}
+            elif method == 'ping':
+                response['result'] = {'shard': self.name, 'documents': len(self.index)}
+            else:
+                raise ValueError(f"Unknown method '{method}'")
+        except Exception as e:
+            response['error'] = {'type': type(e).__name__, 'message': str(e)}
+        return response
+
+    def serve_forever(self):
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self) -> threading.Thread:
+        """Serve from a background thread."""
+        thread = threading.Thread(target=self.serve_forever, name=f'{self.name}-server', daemon=True)
+        thread.start()
+        return thread
+
+    def shutdown(self):
+        self._server.shutdown()
+
+
+def _call_shard(address: Tuple[str, int], method: str, params: Dict, timeout: float) -> Dict:
+    """One request on a fresh connection; raises on timeout, connection or shard errors."""
+    deadline = time.monotonic() + timeout
+    with socket.create_connection(address, timeout=timeout) as connection:
+        connection.sendall(json.dumps({'id': 1, 'method': method, 'params': params}).encode('utf-8') + b'\n')
+        received = b''
+        while not received.endswith(b'\n'):
+            connection.settimeout(max(0.001, deadline - time.monotonic()))
+            chunk = connection.recv(65536)
+            if not chunk:
+                raise ConnectionError("Shard closed the connection")
+            received += chunk
+    response = json.loads(received)
+    if 'error' in response:
+        raise RuntimeError(f"{response['error']['type']}: {response['error']['message']}")
+    return response['result']
+
+
+class ShardCoordinator:
+    """Fan a query out to shard servers and merge their top-K hits."""
+
+    def __init__(self, shards: List[Tuple[str, int]], timeout: float = DEFAULT_SHARD_TIMEOUT):
+        self.shards = [tuple(address) for address in shards]
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=max(1, len(self.shards)),
+                                        thread_name_prefix='shard-query')
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def search(self, code: str, language: Optional[str] = None, similarity_threshold: float = 0.7,
+               top_k: int = DEFAULT_TOP_K) -> Dict:
+        """
+        Search every shard and merge the hits.
+
+        Returns:
+            Dictionary with 'hits' (top_k overall), 'shards', 'shards_responded',
+            'failed_shards' as {'address', 'error'}, 'partial' (True when a
+            shard failed, so hits may be missing) and 'elapsed_ms'
+        """
+        started = time.perf_counter()
+        params = {'code': code, 'language': language,
+                  'similarity_threshold': similarity_threshold, 'top_k': top_k}
+        futures = [self._pool.submit(_call_shard, address, 'search', params, self.timeout)
+                   for address in self.shards]
+        hits, failed = [], []
+        for address, future in zip(self.shards, futures):
+            try:
+                hits.extend(future.result()['hits'])
+            except Exception as e:
+                error = 'timed out' if isinstance(e, socket.timeout) else f"{type(e).__name__}: {e}"
+                failed.append({'address': f"{address[0]}:{address[1]}", 'error': error})
+        hits.sort(key=_hit_order)
+        return {
+            'hits': hits[:top_k],
+            'shards': len(self.shards),
+            'shards_responded': len(self.shards) - len(failed),
+            'failed_shards': failed,
+            'partial': bool(failed),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+        }
+
+
+def _parse_address(value: str) -> Tuple[str, int]:
+    host, _, port = value.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Sharded corpus search")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="Index one shard of a corpus directory and serve it")
+    serve.add_argument('root', help="Corpus directory")
+    serve.add_argument('--shard', type=int, default=0, help="This node's shard number (default 0)")
+    serve.add_argument('--shards', type=int, default=1, help="Total number of shards (default 1)")
+    serve.add_argument('--host', default='127.0.0.1', help="Address to listen on (default 127.0.0.1)")
+    serve.add_argument('--port', type=int, default=0, help="Port to listen on (default: any free port)")
+    search = commands.add_parser('search', help="Search all shards for files similar to a query file")
+    search.add_argument('query', help="Query file")
+    search.add_argument('--shard', action='append', required=True, metavar='HOST:PORT',
+                        help="A shard server's address (repeatable)")
+    search.add_argument('--threshold', type=float, default=0.7, help="Line similarity threshold (default 0.7)")
+    search.add_argument('--top-k', type=int, default=DEFAULT_TOP_K, help=f"Hits to return (default {DEFAULT_TOP_K})")
+    search.add_argument('--timeout', type=float, default=DEFAULT_SHARD_TIMEOUT,
+                        help=f"Seconds to wait for each shard (default {DEFAULT_SHARD_TIMEOUT})")
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        index = ShardIndex()
+        added = index.add_directory(args.root, args.shard, args.shards)
+        server = ShardServer(index, args.host, args.port, name=f"shard-{args.shard}")
+        host, port = server.address
+        print(f"Shard {args.shard}/{args.shards}: {added} documents, serving on {host}:{port}", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    analyzer = CodeSimilarityAnalyzer()
+    code = analyzer.read_source(args.query) or ''
+    with ShardCoordinator([_parse_address(value) for value in args.shard], args.timeout) as coordinator:
+        response = coordinator.search(code, detect_language(args.query), args.threshold, args.top_k)
+    for failure in response['failed_shards']:
+        print(f"warning: shard {failure['address']} failed: {failure['error']}")
+    print(f"{response['shards_responded']}/{response['shards']} shards responded in "
+          f"{response['elapsed_ms']:.1f} ms" + (" (partial results)" if response['partial'] else ""))
+    for hit in response['hits']:
+        print(f"  {hit['similarity_percentage']:6.2f}%  {hit['doc_id']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
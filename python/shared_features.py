@@ -0,0 +1,302 @@
+"""
+Zero-copy shared feature arrays for parallel scoring.
+
+A preprocessed corpus is laid out in one flat buffer: interned token ids,
+per-line token offsets, per-line structural feature bitsets and the
+normalized line text. The buffer lives in ``multiprocessing.shared_memory``
+(or an mmap'd file), so any number of worker processes can attach to it by
+name without unpickling their own copy. Workers materialize LineFeatures for
+the lines they are about to score; interned ids and bit positions give the
+same similarity scores as the original strings.
+"""
+
+import mmap
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, List, Dict, Optional, Sequence
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures, _STRUCTURAL_PATTERNS
+
+
+_MAGIC = b'CSAFEAT1'
+_HEADER = struct.Struct('<8sQQQQ')
+
+# The top bit of a line's feature set flags blank lines
+_BLANK_BIT = 1 << 63
+
+
+def _feature_names(analyzer: CodeSimilarityAnalyzer) -> List[str]:
+    """Every structural feature the analyzer can emit, in a fixed bit order."""
+    names = sorted(f"keyword:{word}" for word in analyzer.structural_keywords)
+    names += sorted(f"operator:{op}" for op in analyzer.operators)
+    names += sorted({feature for _, feature in _STRUCTURAL_PATTERNS})
+    if len(names) > 63:
+        raise ValueError("Structural features no longer fit in a 64-bit set")
+    return names
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _layout(n_files: int, n_lines: int, n_tokens: int, n_text: int) -> Dict[str, int]:
+    """Byte offsets of every section; sections are 8-byte aligned."""
+    offsets = {}
+    position = _HEADER.size
+    for section, size in (('file_lines', 8 * (n_files + 1)),
+                          ('line_tokens', 8 * (n_lines + 1)),
+                          ('line_text', 8 * (n_lines + 1)),
+                          ('feature_bits', 8 * n_lines),
+                          ('token_ids', 4 * n_tokens),
+                          ('text', n_text)):
+        position = _align(position)
+        offsets[section] = position
+        position += size
+    offsets['total'] = max(position, 1)
+    return offsets
+
+
+class SharedFeatureCorpus:
+    """
+    Flat, shareable line features for a list of files.
+
+    Create one with ``SharedFeatureCorpus.create(features_per_file)`` in the
+    parent, pass ``corpus.name`` to workers, and have each worker call
+    ``SharedFeatureCorpus.attach(name)``.
+    """
+
+    def __init__(self, buffer, shm: Optional[shared_memory.SharedMemory] = None,
+                 mapped: Optional[mmap.mmap] = None, owner: bool = False,
+                 vocabulary: Optional[Dict[str, int]] = None,
+                 feature_names: Optional[List[str]] = None):
+        self._shm = shm
+        self._mmap = mapped
+        self._owner = owner
+        self.vocabulary = vocabulary
+        self.feature_names = feature_names
+
+        view = memoryview(buffer)
+        magic, n_files, n_lines, n_tokens, n_text = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC:
+            raise ValueError("Buffer does not contain a shared feature corpus")
+        offsets = _layout(n_files, n_lines, n_tokens, n_text)
+        self.file_count = n_files
+        self.line_count = n_lines
+        self.nbytes = offsets['total']
+
+        self._views = [view]
+        self._file_lines = self._section(view, offsets['file_lines'], 8 * (n_files + 1), 'q')
+        self._line_tokens = self._section(view, offsets['line_tokens'], 8 * (n_lines + 1), 'q')
+        self._line_text = self._section(view, offsets['line_text'], 8 * (n_lines + 1), 'q')
+        self._feature_bits = self._section(view, offsets['feature_bits'], 8 * n_lines, 'Q')
+        self._token_ids = self._section(view, offsets['token_ids'], 4 * n_tokens, 'i')
+        self._text = self._section(view, offsets['text'], n_text, 'B')
+
+    def _section(self, view: memoryview, offset: int, size: int, fmt: str) -> memoryview:
+        section = view[offset:offset + size].cast(fmt)
+        self._views.append(section)
+        return section
+
+    @staticmethod
+    def _pack(features_per_file: Sequence[List[LineFeatures]], feature_names: List[str],
+              vocabulary: Dict[str, int], allocate: Callable[[int], Any] = bytearray):
+        """Lay the corpus out in a zeroed buffer from allocate(size) and return that buffer."""
+        bit_of = {name: bit for bit, name in enumerate(feature_names)}
+        file_lines, line_tokens, line_text = array('q', [0]), array('q', [0]), array('q', [0])
+        feature_bits, token_ids = array('Q'), array('i')
+        text = bytearray()
+        for features in features_per_file:
+            for line in features:
+                for token in line.tokens:
+                    token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                line_tokens.append(len(token_ids))
+                text += line.normalized.encode('utf-8')
+                line_text.append(len(text))
+                bits = _BLANK_BIT if line.blank else 0
+                for feature in line.features:
+                    bits |= 1 << bit_of[feature]
+                feature_bits.append(bits)
+            file_lines.append(len(feature_bits))
+
+        n_files, n_lines = len(features_per_file), len(feature_bits)
+        offsets = _layout(n_files, n_lines, len(token_ids), len(text))
+        buffer = allocate(offsets['total'])
+        view = memoryview(buffer)
+        _HEADER.pack_into(view, 0, _MAGIC, n_files, n_lines, len(token_ids), len(text))
+        for section, values in (('file_lines', file_lines), ('line_tokens', line_tokens),
+                                ('line_text', line_text), ('feature_bits', feature_bits),
+                                ('token_ids', token_ids), ('text', text)):
+            data = memoryview(values).cast('B')
+            view[offsets[section]:offsets[section] + len(data)] = data
+            data.release()
+        view.release()
+        return buffer
+
+    @classmethod
+    def create(cls, features_per_file: Sequence[List[LineFeatures]],
+               analyzer: Optional[CodeSimilarityAnalyzer] = None,
+               name: Optional[str] = None) -> 'SharedFeatureCorpus':
+        """Pack a corpus straight into a new shared memory segment owned by this process."""
+        feature_names = _feature_names(analyzer or CodeSimilarityAnalyzer())
+        vocabulary: Dict[str, int] = {}
+        segments = []
+
+        def allocate(size: int):
+            segments.append(shared_memory.SharedMemory(name=name, create=True, size=size))
+            return segments[0].buf
+
+        buffer = cls._pack(features_per_file, feature_names, vocabulary, allocate)
+        return cls(buffer, shm=segments[0], owner=True, vocabulary=vocabulary, feature_names=feature_names)
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedFeatureCorpus':
+        """Attach to an existing corpus by shared memory name, without copying it."""
+        # Only the creating process may unlink the segment, so attaching
+        # handles must stay out of the resource tracker
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13 has no track argument
+            register = resource_tracker.register
+            resource_tracker.register = lambda *args: None
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm.buf, shm=shm)
+
+    @classmethod
+    def save(cls, features_per_file: Sequence[List[LineFeatures]], path: str,
+             analyzer: Optional[CodeSimilarityAnalyzer] = None):
+        """Write a corpus to a file that workers can map with open_file."""
+        feature_names = _feature_names(analyzer or CodeSimilarityAnalyzer())
+        with open(path, 'wb') as f:
+            f.write(cls._pack(features_per_file, feature_names, {}))
+
+    @classmethod
+    def open_file(cls, path: str) -> 'SharedFeatureCorpus':
+        """Map a saved corpus read-only; pages are shared between processes by the OS."""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped, mapped=mapped)
+
+    @property
+    def name(self) -> Optional[str]:
+        return self._shm.name if self._shm is not None else None
+
+    def file_line_count(self, file_index: int) -> int:
+        return self._file_lines[file_index + 1] - self._file_lines[file_index]
+
+    def line_features(self, line_index: int) -> LineFeatures:
+        """Materialize one line's features; tokens and features are interned ids."""
+        tokens = list(self._token_ids[self._line_tokens[line_index]:self._line_tokens[line_index + 1]])
+        normalized = bytes(self._text[self._line_text[line_index]:self._line_text[line_index + 1]]).decode('utf-8')
+        bits = self._feature_bits[line_index]
+        blank = bool(bits & _BLANK_BIT)
+        bits &= ~_BLANK_BIT
+        features = []
+        bit = 0
+        while bits:
+            if bits & 1:
+                features.append(bit)
+            bits >>= 1
+            bit += 1
+        return LineFeatures(
+            blank=blank,
+            normalized=normalized,
+            tokens=tokens,
+            token_set=frozenset(tokens),
+            features=frozenset(features),
+        )
+
+    def file_features(self, file_index: int) -> List[LineFeatures]:
+        """Materialize the features of every line of one file."""
+        start, end = self._file_lines[file_index], self._file_lines[file_index + 1]
+        return [self.line_features(line_index) for line_index in range(start, end)]
+
+    def encode_features(self, features: List[LineFeatures]) -> List[LineFeatures]:
+        """
+        Convert string features of a query into this corpus' interned form so
+        they can be scored against attached corpus lines. Requires the
+        creating process's vocabulary.
+        """
+        if self.vocabulary is None or self.feature_names is None:
+            raise ValueError("Only the process that created the corpus can encode queries")
+        bit_of = {name: bit for bit, name in enumerate(self.feature_names)}
+        unknown: Dict[str, int] = {}
+        encoded = []
+        for line in features:
+            # Tokens missing from the corpus get ids that can't collide with it
+            tokens = [self.vocabulary.get(token) if token in self.vocabulary
+                      else unknown.setdefault(token, -1 - len(unknown)) for token in line.tokens]
+            encoded.append(line._replace(tokens=tokens, token_set=frozenset(tokens),
+                                         features=frozenset(bit_of[f] for f in line.features)))
+        return encoded
+
+    def close(self):
+        """Release this process's views; the owner also unlinks the segment."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._shm is not None:
+            self._shm.close()
+            if self._owner:
+                self._shm.unlink()
+            self._shm = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> 'SharedFeatureCorpus':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Per-process state for pool workers, set once by _attach_worker
+_worker_analyzer: Optional[CodeSimilarityAnalyzer] = None
+_worker_corpus: Optional[SharedFeatureCorpus] = None
+_worker_queries: List[List[LineFeatures]] = []
+_worker_threshold: float = 0.7
+
+
+def _attach_worker(corpus_name: str, queries: List[List[LineFeatures]], threshold: float):
+    global _worker_analyzer, _worker_corpus, _worker_queries, _worker_threshold
+    _worker_analyzer = CodeSimilarityAnalyzer()
+    _worker_corpus = SharedFeatureCorpus.attach(corpus_name)
+    _worker_queries = queries
+    _worker_threshold = threshold
+
+
+def _score_corpus_file(file_index: int) -> List[float]:
+    analyzer = _worker_analyzer
+    corpus_features = _worker_corpus.file_features(file_index)
+    scores = []
+    for query in _worker_queries:
+        if not query or not corpus_features:
+            scores.append(0.0)
+            continue
+        matches = analyzer.match_line_features(query, corpus_features, _worker_threshold)
+        results = analyzer.summarize_matches('', '', True, len(query), len(corpus_features),
+                                             matches, _worker_threshold)
+        scores.append(results['similarity_percentage'])
+    return scores
+
+
+def score_queries_against_corpus(corpus: SharedFeatureCorpus, queries: List[List[LineFeatures]],
+                                 similarity_threshold: float = 0.7,
+                                 workers: int = 2) -> List[List[float]]:
+    """
+    Score query files against every corpus file in worker processes that
+    attach to the shared corpus instead of receiving a copy.
+
+    Returns:
+        scores[q][k]: similarity_percentage of query q (as input A) against corpus file k
+    """
+    encoded = [corpus.encode_features(query) for query in queries]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_attach_worker,
+                             initargs=(corpus.name, encoded, similarity_threshold)) as executor:
+        per_file = list(executor.map(_score_corpus_file, range(corpus.file_count)))
+    return [[per_file[k][q] for k in range(corpus.file_count)] for q in range(len(queries))]
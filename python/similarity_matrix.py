@@ -0,0 +1,168 @@
+"""
+All-pairs similarity matrix for a set of files.
+
+Each file is read and preprocessed into line features exactly once. Only the
+upper triangle of the matrix is scored, spread across worker processes, and
+the lower triangle is mirrored from it. Workers attach to the preprocessed
+features through shared memory rather than each receiving a pickled copy.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Dict, Optional, Sequence
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+from .shared_features import SharedFeatureCorpus
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to nested lists
+    np = None
+
+
+# Per-process state for pool workers, set once by _init_worker
+_worker_analyzer: Optional[CodeSimilarityAnalyzer] = None
+_worker_corpus: Optional[SharedFeatureCorpus] = None
+_worker_threshold: float = 0.7
+
+
+def _init_worker(corpus_name: str, threshold: float):
+    global _worker_analyzer, _worker_corpus, _worker_threshold
+    _worker_analyzer = CodeSimilarityAnalyzer()
+    _worker_corpus = SharedFeatureCorpus.attach(corpus_name)
+    _worker_threshold = threshold
+
+
+def _pair_percentage(analyzer: CodeSimilarityAnalyzer, features_a: List[LineFeatures],
+                     features_b: List[LineFeatures], threshold: float) -> float:
+    if not features_a or not features_b:
+        return 0.0
+    matches = analyzer.match_line_features(features_a, features_b, threshold)
+    results = analyzer.summarize_matches('', '', True, len(features_a), len(features_b),
+                                         matches, threshold)
+    return results['similarity_percentage']
+
+
+def _score_row_with(analyzer: CodeSimilarityAnalyzer, features: List[List[LineFeatures]],
+                    threshold: float, i: int) -> Tuple[int, List[float]]:
+    """Score file i against every later file j > i."""
+    row = [_pair_percentage(analyzer, features[i], features[j], threshold)
+           for j in range(i + 1, len(features))]
+    return i, row
+
+
+def _score_row(i: int) -> Tuple[int, List[float]]:
+    # Only the files this row needs are materialized from shared memory, one
+    # at a time, so a worker never holds more than two decoded files
+    features_i = _worker_corpus.file_features(i)
+    row = [_pair_percentage(_worker_analyzer, features_i, _worker_corpus.file_features(j), _worker_threshold)
+           for j in range(i + 1, _worker_corpus.file_count)]
+    return i, row
+
+
+class SimilarityMatrix:
+    """
+    Pairwise similarity percentages for a list of files.
+
+    ``percentages[i][j]`` is the similarity_percentage of paths[i] (as input A)
+    against paths[j] (as input B) for i < j; the lower triangle mirrors it.
+    """
+
+    def __init__(self, paths: List[str], percentages, analyzer: CodeSimilarityAnalyzer,
+                 features: List[List[LineFeatures]], similarity_threshold: float):
+        self.paths = paths
+        self.percentages = percentages
+        self.similarity_threshold = similarity_threshold
+        self._analyzer = analyzer
+        self._features = features
+        self._details: Dict[Tuple[int, int], Dict] = {}
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def detail(self, i: int, j: int) -> Dict:
+        """
+        Full analyze_code_similarity-style results for the pair of paths[i] and
+        paths[j], in the upper-triangle orientation that ``percentages`` holds:
+        detail(j, i) is detail(i, j), with the lower-indexed file as input A.
+        """
+        key = (i, j) if i <= j else (j, i)
+        if key not in self._details:
+            i, j = key
+            features_a, features_b = self._features[i], self._features[j]
+            matches = []
+            if features_a and features_b:
+                matches = self._analyzer.match_line_features(features_a, features_b,
+                                                             self.similarity_threshold)
+            self._details[key] = self._analyzer.summarize_matches(
+                self.paths[i], self.paths[j], True, len(features_a), len(features_b),
+                matches, self.similarity_threshold)
+        return self._details[key]
+
+    def most_similar_pairs(self, limit: int = 10) -> List[Tuple[str, str, float]]:
+        """Return the highest-scoring distinct file pairs."""
+        pairs = []
+        for i in range(len(self.paths)):
+            for j in range(i + 1, len(self.paths)):
+                pairs.append((self.paths[i], self.paths[j], float(self.percentages[i][j])))
+        pairs.sort(key=lambda p: p[2], reverse=True)
+        return pairs[:limit]
+
+
+def similarity_matrix(paths: Sequence[str], similarity_threshold: float = 0.7,
+                      workers: Optional[int] = None,
+                      analyzer: Optional[CodeSimilarityAnalyzer] = None) -> SimilarityMatrix:
+    """
+    Compute the all-pairs similarity matrix for a list of files.
+
+    Args:
+        paths: Files to compare
+        similarity_threshold: Minimum similarity score to consider lines similar
+        workers: Number of worker processes (default: CPU count, 1 runs in-process)
+        analyzer: Analyzer used for preprocessing and per-pair details
+
+    Returns:
+        SimilarityMatrix whose ``percentages`` is a NumPy array when NumPy is
+        installed and a list of lists otherwise
+    """
+    analyzer = analyzer or CodeSimilarityAnalyzer()
+    paths = list(paths)
+    n = len(paths)
+
+    # Preprocess every file exactly once
+    features = [analyzer.preprocess_features(path) for path in paths]
+
+    matrix = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        if features[i]:
+            matrix[i][i] = 100.0
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, n - 1)) if n > 1 else 1
+
+    if workers == 1:
+        rows = [_score_row_with(analyzer, features, similarity_threshold, i) for i in range(n - 1)]
+    else:
+        # Interleave long and short rows so workers finish together
+        order = []
+        low, high = 0, n - 2
+        while low <= high:
+            order.append(low)
+            if low != high:
+                order.append(high)
+            low += 1
+            high -= 1
+        with SharedFeatureCorpus.create(features, analyzer) as corpus, \
+                ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                    initargs=(corpus.name, similarity_threshold)) as executor:
+            rows = list(executor.map(_score_row, order))
+
+    for i, row in rows:
+        for offset, percentage in enumerate(row):
+            j = i + 1 + offset
+            matrix[i][j] = percentage
+            matrix[j][i] = percentage
+
+    percentages = np.array(matrix, dtype=float) if np is not None else matrix
+    return SimilarityMatrix(paths, percentages, analyzer, features, similarity_threshold)
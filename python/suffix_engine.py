@@ -0,0 +1,181 @@
+"""
+Token suffix-array engine for common runs that cross line boundaries.
+
+The token streams of both inputs are interned to integers and concatenated
+with unique separators. A suffix array (prefix doubling, where every round
+re-sorts an almost sorted array) and its LCP array (Kasai) give, for every
+suffix, its longest common prefix with the nearest suffix from the other
+input. Left-maximal runs above a minimum length are tiled longest first
+without overlap and mapped back to line pairs, so code that was copied and
+then re-wrapped by a formatter still lines up.
+"""
+
+from typing import List, Tuple, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .code_similarity_analyzer import LineFeatures
+
+
+MIN_RUN_TOKENS = 12
+
+
+def suffix_array(sequence: List[int]) -> List[int]:
+    """Start positions of all suffixes of sequence in sorted order."""
+    n = len(sequence)
+    if n == 0:
+        return []
+    dense = {value: rank for rank, value in enumerate(sorted(set(sequence)))}
+    rank = [dense[value] for value in sequence]
+    order = sorted(range(n), key=rank.__getitem__)
+
+    step = 1
+    while True:
+        # Rank by (rank[i], rank[i + step]); order is already sorted by rank[i]
+        key = [rank[i] * (n + 1) + (rank[i + step] + 1 if i + step < n else 0) for i in range(n)]
+        order.sort(key=key.__getitem__)
+        new_rank = [0] * n
+        current = 0
+        previous = key[order[0]]
+        for position in order:
+            if key[position] != previous:
+                current += 1
+                previous = key[position]
+            new_rank[position] = current
+        rank = new_rank
+        if current == n - 1:
+            return order
+        step *= 2
+
+
+def lcp_array(sequence: List[int], order: List[int]) -> List[int]:
+    """lcp[r] is the common prefix length of suffixes order[r - 1] and order[r] (lcp[0] = 0)."""
+    n = len(sequence)
+    rank = [0] * n
+    for r, position in enumerate(order):
+        rank[position] = r
+    lcp = [0] * n
+    h = 0
+    for position in range(n):
+        if rank[position] == 0:
+            h = 0
+            continue
+        other = order[rank[position] - 1]
+        while position + h < n and other + h < n and sequence[position + h] == sequence[other + h]:
+            h += 1
+        lcp[rank[position]] = h
+        if h:
+            h -= 1
+    return lcp
+
+
+def common_token_runs(tokens_a: List[str], tokens_b: List[str],
+                      min_length: int = MIN_RUN_TOKENS) -> List[Tuple[int, int, int]]:
+    """
+    Non-overlapping common token runs of at least min_length tokens.
+
+    Returns:
+        (start_a, start_b, length) triples, longest first
+    """
+    interned: Dict[str, int] = {}
+    sequence = [interned.setdefault(token, len(interned) + 2) for token in tokens_a]
+    sequence.append(0)  # Unique separators keep runs from crossing inputs
+    offset_b = len(sequence)
+    sequence.extend(interned.setdefault(token, len(interned) + 2) for token in tokens_b)
+    sequence.append(1)
+
+    order = suffix_array(sequence)
+    lcp = lcp_array(sequence, order)
+
+    # Pair every suffix with the nearest suffix of the other input on each side
+    candidates = set()
+    n = len(order)
+    for scan in (range(n), range(n - 1, -1, -1)):
+        forward = scan.step == 1
+        last = {False: None, True: None}
+        shared = {False: 0, True: 0}
+        for r in scan:
+            position = order[r]
+            step_lcp = lcp[r] if forward else (lcp[r + 1] if r + 1 < n else 0)
+            shared[False] = min(shared[False], step_lcp)
+            shared[True] = min(shared[True], step_lcp)
+            in_b = position >= offset_b
+            partner = last[not in_b]
+            length = shared[not in_b]
+            if partner is not None and length >= min_length:
+                start_a, start_b = (partner, position) if in_b else (position, partner)
+                # Keep left-maximal runs only; the rest are suffixes of longer runs
+                if start_a == 0 or start_b == offset_b or sequence[start_a - 1] != sequence[start_b - 1]:
+                    candidates.add((start_a, start_b - offset_b, length))
+            last[in_b] = position
+            shared[in_b] = len(sequence)
+
+    # Tile longest first, trimming runs to their uncovered stretches
+    covered_a = [False] * len(tokens_a)
+    covered_b = [False] * len(tokens_b)
+    runs = []
+    for start_a, start_b, length in sorted(candidates, key=lambda run: (-run[2], run[0], run[1])):
+        stretch = 0
+        for k in range(length + 1):
+            if k < length and not covered_a[start_a + k] and not covered_b[start_b + k]:
+                stretch += 1
+                continue
+            if stretch >= min_length:
+                first = k - stretch
+                runs.append((start_a + first, start_b + first, stretch))
+                for t in range(first, k):
+                    covered_a[start_a + t] = True
+                    covered_b[start_b + t] = True
+            stretch = 0
+    runs.sort(key=lambda run: (-run[2], run[0]))
+    return runs
+
+
+def token_stream(features: List['LineFeatures']) -> Tuple[List[str], List[int]]:
+    """Concatenated tokens of all lines and, for each token, the index of its line."""
+    tokens, line_of = [], []
+    for index, line in enumerate(features):
+        tokens.extend(line.tokens)
+        line_of.extend([index] * len(line.tokens))
+    return tokens, line_of
+
+
+def runs_to_line_pairs(features_a: List['LineFeatures'], features_b: List['LineFeatures'],
+                       runs: List[Tuple[int, int, int]]) -> List[Tuple[int, int]]:
+    """
+    Map non-overlapping token runs back to one-to-one line pairs.
+
+    A line of A whose tokens are at least half covered by runs is paired with
+    the line of B that most of those tokens land on, unless that line is taken.
+    """
+    line_of_a = token_stream(features_a)[1]
+    line_of_b = token_stream(features_b)[1]
+    votes: Dict[Tuple[int, int], int] = {}
+    covered = [0] * len(features_a)
+    for start_a, start_b, length in runs:
+        for k in range(length):
+            pair = (line_of_a[start_a + k], line_of_b[start_b + k])
+            votes[pair] = votes.get(pair, 0) + 1
+            covered[pair[0]] += 1
+
+    line_pairs = []
+    used_a, used_b = set(), set()
+    for (i, j), count in sorted(votes.items(), key=lambda item: (-item[1], item[0])):
+        if i in used_a or j in used_b or 2 * covered[i] < len(features_a[i].tokens):
+            continue
+        line_pairs.append((i, j))
+        used_a.add(i)
+        used_b.add(j)
+    line_pairs.sort()
+    return line_pairs
+
+
+def match_token_runs(features_a: List['LineFeatures'], features_b: List['LineFeatures'],
+                     min_length: int = MIN_RUN_TOKENS) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int, int]]]:
+    """
+    Find common token runs between two inputs and map them to line pairs.
+
+    Returns:
+        (list of (i, j) meaningful line index pairs, list of token runs)
+    """
+    runs = common_token_runs(token_stream(features_a)[0], token_stream(features_b)[0], min_length)
+    return runs_to_line_pairs(features_a, features_b, runs), runs
@@ -0,0 +1,150 @@
+"""
+Multi-source attribution against an index of suggestion fragments.
+
+Suggestion snippets are ingested with an ID and an optional timestamp, and
+their meaningful lines are pooled into one line table with a token inverted
+index. Lines without tokens are bucketed by normalized text, since they only
+ever match identical lines. Attributing a final file scores each of its
+lines only against pooled lines sharing a token with it, or identical
+tokenless lines (lossless above DISJOINT_TOKENS_MAX_SIMILARITY, optionally
+capped to the best K by token Jaccard), then runs one greedy
+one-to-one selection over all fragments at once: every final line is
+credited to at most one fragment line and every fragment line is used at
+most once. Ties go to the earliest fragment.
+"""
+
+from collections import defaultdict
+from typing import List, Tuple, Dict, Optional, Iterable, Hashable
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+from .block_matcher import DISJOINT_TOKENS_MAX_SIMILARITY
+
+
+class SuggestionIndex:
+    """Pooled lines of many suggestion fragments, indexed by token."""
+
+    def __init__(self, analyzer: Optional[CodeSimilarityAnalyzer] = None,
+                 language: Optional[str] = None):
+        self.analyzer = analyzer or CodeSimilarityAnalyzer()
+        self.language = language
+        # Per fragment: (fragment_id, timestamp)
+        self.fragments: List[Tuple[Hashable, Optional[float]]] = []
+        # Per pooled line: owning fragment index and line number within the fragment
+        self.line_owner: List[Tuple[int, int]] = []
+        self.line_features: List[LineFeatures] = []
+        self.lines_by_token: Dict[str, List[int]] = defaultdict(list)
+        # Lines without tokens (e.g. 'a, b') by normalized text
+        self.tokenless_lines: Dict[str, List[int]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.fragments)
+
+    @property
+    def line_count(self) -> int:
+        return len(self.line_features)
+
+    def add(self, fragment_id: Hashable, code: str, timestamp: Optional[float] = None,
+            language: Optional[str] = None) -> int:
+        """Index one suggestion fragment; returns the number of meaningful lines it added."""
+        fragment = len(self.fragments)
+        self.fragments.append((fragment_id, timestamp))
+        meaningful = self.analyzer.extract_meaningful_lines(code, language or self.language) if code else []
+        for line_number, _, code_line in meaningful:
+            features = self.analyzer.extract_line_features(code_line, comments_stripped=True)
+            index = len(self.line_features)
+            self.line_features.append(features)
+            self.line_owner.append((fragment, line_number))
+            for token in features.token_set:
+                self.lines_by_token[token].append(index)
+            if not features.token_set:
+                self.tokenless_lines[features.normalized].append(index)
+        return len(meaningful)
+
+    def add_many(self, fragments: Iterable[Tuple[Hashable, str, Optional[float]]]) -> int:
+        """Index (fragment_id, code, timestamp) triples; returns the number of lines added."""
+        return sum(self.add(fragment_id, code, timestamp) for fragment_id, code, timestamp in fragments)
+
+    def _candidates(self, line: LineFeatures, skip_disjoint: bool,
+                    max_candidates_per_line: Optional[int]) -> Iterable[int]:
+        if not line.token_set:
+            # Only an identical line can score above zero
+            return self.tokenless_lines.get(line.normalized, ())
+        if not skip_disjoint and max_candidates_per_line is None:
+            return range(len(self.line_features))
+        shared = defaultdict(int)
+        for token in line.token_set:
+            for index in self.lines_by_token.get(token, ()):
+                shared[index] += 1
+        if max_candidates_per_line is None:
+            return shared
+        size = len(line.token_set)
+        return sorted(shared, key=lambda index: (
+            -shared[index] / (size + len(self.line_features[index].token_set) - shared[index]),
+            index))[:max_candidates_per_line]
+
+    def attribute(self, input_a: str, similarity_threshold: float = 0.7, is_file: bool = True,
+                  language: Optional[str] = None,
+                  max_candidates_per_line: Optional[int] = None) -> Dict:
+        """
+        Attribute each meaningful line of a final file to its best-matching fragment line.
+
+        Args:
+            input_a: Path to the final file, or its code when is_file is False
+            max_candidates_per_line: If set, score each final line only against
+                the K pooled lines with the highest token Jaccard (faster, may
+                miss matches); otherwise every line sharing a token is scored,
+                or every line at thresholds where disjoint lines can qualify
+
+        Returns:
+            Dictionary with 'lines_a_count', 'attributed_lines_count',
+            'attributed_percentage', 'fragments' (per-fragment contributions,
+            most lines first) and 'line_attribution' as (line_number,
+            fragment_id, fragment_line_number, score) tuples
+        """
+        analyzer = self.analyzer
+        code_a, language_a = analyzer.read_input(input_a, is_file, language or self.language)
+        meaningful_a = analyzer.extract_meaningful_lines(code_a, language_a) if code_a else []
+        lines_a = [analyzer.extract_line_features(code_line, comments_stripped=True)
+                   for _, _, code_line in meaningful_a]
+
+        skip_disjoint = similarity_threshold > DISJOINT_TOKENS_MAX_SIMILARITY
+        potential_matches = []
+        for i, line_a in enumerate(lines_a):
+            for j in self._candidates(line_a, skip_disjoint, max_candidates_per_line):
+                score = analyzer.similarity_from_features(line_a, self.line_features[j])
+                if score >= similarity_threshold:
+                    potential_matches.append((i, j, score))
+
+        # Best score first; equal scores go to the earliest fragment, then the earliest line
+        order = sorted(range(len(self.fragments)), key=lambda f: (
+            self.fragments[f][1] is None, self.fragments[f][1] or 0.0, f))
+        rank = {fragment: position for position, fragment in enumerate(order)}
+        potential_matches.sort(key=lambda x: (-x[2], x[0], rank[self.line_owner[x[1]][0]], x[1]))
+        similar_matches = analyzer.select_matches(potential_matches)
+
+        contributions = defaultdict(list)
+        line_attribution = []
+        for i, j, score in similar_matches:
+            fragment, fragment_line = self.line_owner[j]
+            contributions[fragment].append(score)
+            line_attribution.append((meaningful_a[i][0], self.fragments[fragment][0], fragment_line, score))
+        line_attribution.sort(key=lambda x: x[0])
+        fragments = [{
+            'fragment_id': self.fragments[fragment][0],
+            'timestamp': self.fragments[fragment][1],
+            'matched_lines': len(scores),
+            'average_similarity': round(sum(scores) / len(scores), 3),
+        } for fragment, scores in sorted(contributions.items(),
+                                         key=lambda item: (-len(item[1]), rank[item[0]]))]
+
+        return {
+            'input_a': input_a if is_file else "Code Fragment A",
+            'is_file': is_file,
+            'lines_a_count': len(lines_a),
+            'fragment_count': len(self.fragments),
+            'similarity_threshold': similarity_threshold,
+            'attributed_lines_count': len(similar_matches),
+            'attributed_percentage': round(100.0 * len(similar_matches) / len(lines_a), 2) if lines_a else 0.0,
+            'fragments': fragments,
+            'line_attribution': line_attribution,
+        }
@@ -0,0 +1,214 @@
+"""
+Live attribution for a working tree.
+
+Watches (final file, suggestion file) pairs by polling os.stat, so it runs
+anywhere without inotify. Each file's meaningful lines and their scorer
+features stay in memory, and each pair remembers which line texts it has
+already scored along with every above-threshold score. When a file's mtime
+or size changes and then stays put for the debounce interval, its content is
+hashed. Only if the hash changed are the new or edited line texts scored
+against the other side. The greedy one-to-one selection is then rerun from
+the cached scores, so results equal a fresh analyze_code_similarity call.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+from collections import defaultdict
+from typing import List, Tuple, Dict, Set, Optional, Callable, Iterable
+
+from .code_similarity_analyzer import CodeSimilarityAnalyzer, LineFeatures
+from .code_lexer import detect_language
+from .result_store import content_hash
+
+
+DEFAULT_DEBOUNCE_SECONDS = 0.05
+DEFAULT_POLL_INTERVAL = 0.02
+
+
+class _WatchedFile:
+    """Current content of one watched file, preprocessed into line features."""
+
+    def __init__(self, path: str, language: Optional[str]):
+        self.path = path
+        self.language = language or detect_language(path)
+        self.signature: Optional[Tuple[int, int]] = None
+        self.digest: Optional[str] = None
+        # Time the signature last changed, while a debounced reload is pending
+        self.changed_at: Optional[float] = None
+        self.texts: List[str] = []
+        self.features_by_text: Dict[str, LineFeatures] = {}
+
+    def stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self, analyzer: CodeSimilarityAnalyzer) -> bool:
+        """Re-read the file; returns True if its content changed."""
+        code = analyzer.read_source(self.path) if self.signature is not None else None
+        code = code or ''
+        digest = content_hash(code)
+        if digest == self.digest:
+            return False
+        self.digest = digest
+        self.texts = [code_line for _, _, code_line in analyzer.extract_meaningful_lines(code, self.language)] \
+            if code else []
+        # Unchanged lines keep their features
+        previous = self.features_by_text
+        self.features_by_text = {
+            text: previous.get(text) or analyzer.extract_line_features(text, comments_stripped=True)
+            for text in self.texts
+        }
+        return True
+
+
+class _PairScores:
+    """Above-threshold scores between the distinct line texts of a file pair."""
+
+    def __init__(self):
+        self.scored_a: Set[str] = set()
+        self.scored_b: Set[str] = set()
+        self.scores: Dict[Tuple[str, str], float] = {}
+
+    def update(self, analyzer: CodeSimilarityAnalyzer, file_a: _WatchedFile,
+               file_b: _WatchedFile, threshold: float) -> int:
+        """Score the line texts not seen before; returns the number of pairs scored."""
+        texts_a, texts_b = set(file_a.texts), set(file_b.texts)
+        if self.scored_a - texts_a or self.scored_b - texts_b:
+            self.scores = {(text_a, text_b): score for (text_a, text_b), score in self.scores.items()
+                           if text_a in texts_a and text_b in texts_b}
+        new_a, new_b = texts_a - self.scored_a, texts_b - self.scored_b
+        scored = 0
+        for texts, others in ((new_a, texts_b), (texts_a - new_a, new_b)):
+            for text_a in texts:
+                line_a = file_a.features_by_text[text_a]
+                for text_b in others:
+                    score = analyzer.similarity_from_features(line_a, file_b.features_by_text[text_b])
+                    scored += 1
+                    if score >= threshold:
+                        self.scores[(text_a, text_b)] = score
+        self.scored_a, self.scored_b = texts_a, texts_b
+        return scored
+
+    def matches(self, analyzer: CodeSimilarityAnalyzer, file_a: _WatchedFile,
+                file_b: _WatchedFile) -> List[Tuple[int, int, float]]:
+        """Greedy one-to-one matching of the current lines, as in match_line_features."""
+        positions_a, positions_b = defaultdict(list), defaultdict(list)
+        for i, text in enumerate(file_a.texts):
+            positions_a[text].append(i)
+        for j, text in enumerate(file_b.texts):
+            positions_b[text].append(j)
+        potential_matches = [(i, j, score) for (text_a, text_b), score in self.scores.items()
+                             for i in positions_a[text_a] for j in positions_b[text_b]]
+        potential_matches.sort(key=lambda x: (-x[2], x[0], x[1]))
+        return analyzer.select_matches(potential_matches)
+
+
+class AttributionWatcher:
+    """
+    Keep attribution results for (final file, suggestion file) pairs up to date.
+
+    Call poll() repeatedly (or watch() to loop); each call returns the results
+    of the pairs that were re-analyzed, keyed by (final, suggestion).
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[str, str]],
+                 analyzer: Optional[CodeSimilarityAnalyzer] = None,
+                 similarity_threshold: float = 0.7,
+                 debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+                 language: Optional[str] = None):
+        self.analyzer = analyzer or CodeSimilarityAnalyzer()
+        self.similarity_threshold = similarity_threshold
+        self.debounce_seconds = debounce_seconds
+        self.pairs = list(dict.fromkeys(pairs))
+        self.files: Dict[str, _WatchedFile] = {}
+        for path in (path for pair in self.pairs for path in pair):
+            if path not in self.files:
+                self.files[path] = _WatchedFile(path, language)
+        self.pair_scores = {pair: _PairScores() for pair in self.pairs}
+        self.results: Dict[Tuple[str, str], Dict] = {}
+        self.pairs_scored = 0
+
+    def poll(self, now: Optional[float] = None) -> Dict[Tuple[str, str], Dict]:
+        """
+        Check every watched file once and re-analyze the pairs whose files changed.
+
+        Files are loaded immediately on the first poll; later changes are
+        picked up once a file has been stable for debounce_seconds.
+        """
+        now = time.monotonic() if now is None else now
+        changed = set()
+        for path, watched in self.files.items():
+            signature = watched.stat_signature()
+            first_load = watched.digest is None
+            if signature != watched.signature or first_load:
+                watched.signature = signature
+                watched.changed_at = now
+            if watched.changed_at is not None and (first_load or now - watched.changed_at >= self.debounce_seconds):
+                watched.changed_at = None
+                if watched.reload(self.analyzer):
+                    changed.add(path)
+
+        updated = {}
+        for pair in self.pairs:
+            if pair[0] in changed or pair[1] in changed:
+                updated[pair] = self.results[pair] = self._analyze(pair)
+        return updated
+
+    def _analyze(self, pair: Tuple[str, str]) -> Dict:
+        file_a, file_b = self.files[pair[0]], self.files[pair[1]]
+        scores = self.pair_scores[pair]
+        self.pairs_scored += scores.update(self.analyzer, file_a, file_b, self.similarity_threshold)
+        similar_matches = scores.matches(self.analyzer, file_a, file_b) if file_a.texts and file_b.texts else []
+        return self.analyzer.summarize_matches(pair[0], pair[1], True, len(file_a.texts), len(file_b.texts),
+                                               similar_matches, self.similarity_threshold)
+
+    def watch(self, callback: Callable[[Tuple[str, str], Dict], None],
+              interval: float = DEFAULT_POLL_INTERVAL,
+              stop: Optional[threading.Event] = None):
+        """Poll every interval seconds, calling callback(pair, results) for each update, until stop is set."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            for pair, results in self.poll().items():
+                callback(pair, results)
+            stop.wait(interval)
+
+
+def _parse_pair(value: str) -> Tuple[str, str]:
+    final, separator, suggestion = value.partition(':')
+    if not separator or not final or not suggestion:
+        raise argparse.ArgumentTypeError(f"expected FINAL:SUGGESTION, got '{value}'")
+    return final, suggestion
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Keep attribution results live while files are edited")
+    parser.add_argument('pairs', nargs='+', type=_parse_pair, metavar='FINAL:SUGGESTION',
+                        help="Final file and the suggestion file it is attributed to")
+    parser.add_argument('--threshold', type=float, default=0.7, help="Line similarity threshold (default 0.7)")
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE_SECONDS,
+                        help=f"Seconds a file must be unchanged before re-analysis (default {DEFAULT_DEBOUNCE_SECONDS})")
+    parser.add_argument('--interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"Seconds between polls (default {DEFAULT_POLL_INTERVAL})")
+    args = parser.parse_args(argv)
+
+    watcher = AttributionWatcher(args.pairs, similarity_threshold=args.threshold,
+                                 debounce_seconds=args.debounce)
+
+    def report(pair: Tuple[str, str], results: Dict):
+        print(f"{time.strftime('%H:%M:%S')} {pair[0]} <- {pair[1]}: "
+              f"{results['similarity_percentage']:.2f}% ({results['similar_lines_count']} lines)", flush=True)
+
+    try:
+        watcher.watch(report, args.interval)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
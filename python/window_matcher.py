@@ -0,0 +1,90 @@
+"""
+Rabin-Karp rolling-hash window matching.
+
+Windows of k consecutive tokens, allowed to cross line breaks, are hashed
+with a polynomial rolling hash. Every window of file B goes into a hash
+table; a single linear scan of file A probes it, verifies the tokens of each
+hit, and extends the match as far as the token streams keep agreeing. The
+resulting spans are mapped back to line pairs like suffix-array runs.
+"""
+
+from typing import List, Tuple, Dict, Iterator, TYPE_CHECKING
+
+try:
+    from .suffix_engine import token_stream, runs_to_line_pairs
+except ImportError:  # Running the analyzer directly as a script
+    from suffix_engine import token_stream, runs_to_line_pairs
+
+if TYPE_CHECKING:
+    from .code_similarity_analyzer import LineFeatures
+
+
+DEFAULT_WINDOW_TOKENS = 10
+
+_MODULUS = (1 << 61) - 1
+_BASE = 1_000_003
+
+
+def rolling_hashes(token_ids: List[int], k: int) -> Iterator[Tuple[int, int]]:
+    """Yield (start, hash) for every window of k tokens."""
+    if k < 1:
+        raise ValueError("Window size must be at least 1")
+    if len(token_ids) < k:
+        return
+    top = pow(_BASE, k - 1, _MODULUS)
+    value = 0
+    for token in token_ids[:k]:
+        value = (value * _BASE + token) % _MODULUS
+    yield 0, value
+    for start in range(1, len(token_ids) - k + 1):
+        value = ((value - token_ids[start - 1] * top) * _BASE + token_ids[start + k - 1]) % _MODULUS
+        yield start, value
+
+
+def window_spans(tokens_a: List[str], tokens_b: List[str],
+                 k: int = DEFAULT_WINDOW_TOKENS) -> List[Tuple[int, int, int]]:
+    """
+    Maximal common spans seeded by equal k-token windows.
+
+    Returns:
+        Non-overlapping (start_a, start_b, length) triples, length >= k
+    """
+    interned: Dict[str, int] = {}
+    ids_a = [interned.setdefault(token, len(interned) + 1) for token in tokens_a]
+    ids_b = [interned.setdefault(token, len(interned) + 1) for token in tokens_b]
+
+    table: Dict[int, List[int]] = {}
+    for start, value in rolling_hashes(ids_b, k):
+        table.setdefault(value, []).append(start)
+
+    covered_b = [False] * len(ids_b)
+    spans = []
+    position = 0
+    for start, value in rolling_hashes(ids_a, k):
+        if start < position:
+            continue  # Inside the span just reported
+        for start_b in table.get(value, ()):
+            if covered_b[start_b] or covered_b[start_b + k - 1] or ids_a[start:start + k] != ids_b[start_b:start_b + k]:
+                continue
+            length = k
+            while (start + length < len(ids_a) and start_b + length < len(ids_b)
+                   and not covered_b[start_b + length] and ids_a[start + length] == ids_b[start_b + length]):
+                length += 1
+            spans.append((start, start_b, length))
+            for t in range(start_b, start_b + length):
+                covered_b[t] = True
+            position = start + length
+            break
+    return spans
+
+
+def match_windows(features_a: List['LineFeatures'], features_b: List['LineFeatures'],
+                  k: int = DEFAULT_WINDOW_TOKENS) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int, int]]]:
+    """
+    Find window-seeded common spans between two inputs and map them to line pairs.
+
+    Returns:
+        (list of (i, j) meaningful line index pairs, list of token spans)
+    """
+    spans = window_spans(token_stream(features_a)[0], token_stream(features_b)[0], k)
+    return runs_to_line_pairs(features_a, features_b, spans), spans
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the analysis daemon and its client.
+"""
+
+import unittest
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.analysis_daemon import AnalysisDaemon
+from python.analysis_client import AnalysisClient, DaemonError
+
+
+class TestAnalysisDaemon(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.temp_dir.name, 'daemon.sock')
+        self.daemon = AnalysisDaemon(self.socket_path)
+        self.thread = self.daemon.start()
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join()
+        self.temp_dir.cleanup()
+
+    def direct(self, input_a, input_b, **options):
+        results = self.analyzer.analyze_code_similarity(input_a, input_b, verbose=False, **options)
+        return json.loads(json.dumps(results))
+
+    def test_results_match_direct_calls(self):
+        """Daemon results equal direct analyze_code_similarity calls, cached or not"""
+        file_a = os.path.join(self.samples_dir, 'sample_a.py')
+        file_b = os.path.join(self.samples_dir, 'sample_c.py')
+        fragment_a = "def total(items):\n    return sum(items)\n"
+        fragment_b = "def total(values):\n    return sum(values)\n"
+        with AnalysisClient(self.socket_path) as client:
+            self.assertTrue(client.ping())
+            for _ in range(2):
+                self.assertEqual(client.analyze(file_a, file_b), self.direct(file_a, file_b))
+                self.assertEqual(client.analyze(file_a, file_b, similarity_threshold=0.5, engine='window'),
+                                 self.direct(file_a, file_b, similarity_threshold=0.5, engine='window'))
+                self.assertEqual(client.analyze(fragment_a, fragment_b, is_file=False, language='python'),
+                                 self.direct(fragment_a, fragment_b, is_file=False, language='python'))
+            stats = client.stats()
+        self.assertEqual(stats['cached_results'], 3)
+        self.assertEqual(stats['cache_hits'], 3)
+
+    def test_worker_pool_and_feature_cache(self):
+        """Analyses in worker processes equal direct calls, and each input is preprocessed once"""
+        socket_path = os.path.join(self.temp_dir.name, 'pool.sock')
+        daemon = AnalysisDaemon(socket_path, workers=2)
+        thread = daemon.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(daemon.shutdown)
+        file_a = os.path.join(self.samples_dir, 'complex_a.py')
+        others = [os.path.join(self.samples_dir, name) for name in ('complex_b.py', 'complex_c.py', 'sample_c.py')]
+        fragment_a = "def total(items):\n    return sum(items)\n"
+        fragment_b = "def total(values):\n    return sum(values)\n"
+        with AnalysisClient(socket_path) as client:
+            for _ in range(2):
+                for file_b in others:
+                    self.assertEqual(client.analyze(file_a, file_b), self.direct(file_a, file_b))
+                self.assertEqual(client.analyze(fragment_a, fragment_b, is_file=False, language='python'),
+                                 self.direct(fragment_a, fragment_b, is_file=False, language='python'))
+            mixed = (os.path.join(self.samples_dir, 'sample_a.py'), os.path.join(self.samples_dir, 'sample_a.java'))
+            self.assertEqual(client.analyze(*mixed), self.direct(*mixed))
+            stats = client.stats()
+        self.assertEqual(stats['cache_hits'], 4)
+        # complex_a.py is preprocessed for its first comparison only
+        self.assertEqual(stats['cached_features'], 8)
+        self.assertEqual(stats['feature_misses'], 8)
+        self.assertEqual(stats['feature_hits'], 2)
+
+    def test_concurrent_clients(self):
+        """Several connections are served at once and each gets its own results"""
+        pairs = [('sample_a.py', 'sample_c.py'), ('sample_a.java', 'sample_c.java'),
+                 ('sample_a.ts', 'sample_c.ts'), ('complex_a.py', 'complex_b.py')]
+        pairs = [tuple(os.path.join(self.samples_dir, name) for name in pair) for pair in pairs]
+        received = {}
+
+        def run(pair):
+            with AnalysisClient(self.socket_path) as client:
+                received[pair] = client.analyze(*pair)
+
+        threads = [threading.Thread(target=run, args=(pair,)) for pair in pairs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for pair in pairs:
+            self.assertEqual(received[pair], self.direct(*pair))
+
+    def test_errors_and_warm_latency(self):
+        """Bad requests return errors without closing the connection; cached requests take milliseconds"""
+        file_a = os.path.join(self.samples_dir, 'complex_a.py')
+        file_b = os.path.join(self.samples_dir, 'complex_b.py')
+        with AnalysisClient(self.socket_path) as client:
+            with self.assertRaises(DaemonError) as raised:
+                client.analyze(file_a, file_b, engine='nonexistent')
+            self.assertEqual(raised.exception.error_type, 'ValueError')
+            with self.assertRaises(DaemonError):
+                client.call('analyze', {'input_a': file_a, 'input_b': file_b, 'verbose': True})
+
+            client.analyze(file_a, file_b)
+            started = time.perf_counter()
+            client.analyze(file_a, file_b)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        self.assertLess(elapsed_ms, 100)
+        print(f"✅ Cached daemon request: {elapsed_ms:.2f} ms")
+
+
+if __name__ == '__main__':
+    unittest.main()
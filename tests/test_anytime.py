@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for deadline-aware anytime analysis.
+"""
+
+import unittest
+import os
+import sys
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+
+
+class TestAnytime(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.code_a = "\n".join(f"total_{i} = compute(values[{i}], weight={i}) + offset" for i in range(80))
+        self.code_b = "\n".join(f"result_{i} = compute(items[{i}], weight={i + 1}) - offset" for i in range(80))
+
+    def test_completes_within_generous_deadline(self):
+        """With enough time the result is complete and equals the canonical fast path"""
+        file_a = os.path.join(self.samples_dir, 'complex_a.py')
+        file_b = os.path.join(self.samples_dir, 'complex_b.py')
+        results = self.analyzer.analyze_code_similarity(file_a, file_b, 0.7, verbose=False, deadline_seconds=30)
+        canonical = self.analyzer.analyze_code_similarity(file_a, file_b, 0.7, verbose=False, canonicalize=True)
+
+        self.assertFalse(results['partial'])
+        self.assertEqual(results['pairs_evaluated_fraction'], 1.0)
+        self.assertEqual(sorted(results['similar_matches']), sorted(canonical['similar_matches']))
+        self.assertEqual(results['similarity_percentage'], canonical['similarity_percentage'])
+        self.assertEqual(results['similarity_bounds'], [results['similarity_percentage']] * 2)
+
+    def test_partial_results_at_deadline(self):
+        """An expired deadline returns a partial matching with bounds around the final result"""
+        partial = self.analyzer.analyze_code_similarity(self.code_a, self.code_b, 0.5, is_file=False,
+                                                        verbose=False, deadline_seconds=0)
+        complete = self.analyzer.analyze_code_similarity(self.code_a, self.code_b, 0.5, is_file=False,
+                                                         verbose=False, deadline_seconds=30)
+
+        self.assertTrue(partial['partial'])
+        self.assertLess(partial['pairs_evaluated_fraction'], 1.0)
+        low, high = partial['similarity_bounds']
+        self.assertLessEqual(low, partial['similarity_percentage'])
+        self.assertLessEqual(partial['similarity_percentage'], high)
+        self.assertLessEqual(low, complete['similarity_percentage'])
+        self.assertGreaterEqual(high, complete['similarity_percentage'])
+        print(f"✅ Anytime analysis: {partial['pairs_evaluated_fraction']:.1%} of pairs evaluated, "
+              f"bounds [{low:.1f}, {high:.1f}] around final {complete['similarity_percentage']:.1f}%")
+
+    def test_bounds_allow_replaced_fuzzy_matches(self):
+        """Fuzzy matches picked from partly scored candidates may still change; the bounds cover that"""
+        file_a = os.path.join(self.samples_dir, 'sample_a.java')
+        file_b = os.path.join(self.samples_dir, 'sample_c.java')
+        for threshold in (0.3, 0.4, 0.7):
+            partial = self.analyzer.analyze_code_similarity(file_a, file_b, threshold, verbose=False,
+                                                            deadline_seconds=0)
+            complete = self.analyzer.analyze_code_similarity(file_a, file_b, threshold, verbose=False,
+                                                             deadline_seconds=30)
+
+            self.assertTrue(partial['partial'])
+            self.assertFalse(complete['partial'])
+            low, high = partial['similarity_bounds']
+            self.assertLessEqual(low, complete['similarity_percentage'])
+            self.assertGreaterEqual(high, complete['similarity_percentage'])
+
+    def test_only_line_engine(self):
+        """Deadlines are rejected for other engines"""
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_code_similarity(self.code_a, self.code_b, is_file=False, verbose=False,
+                                                  engine='block', deadline_seconds=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the Python AST subtree hashing engine.
+"""
+
+import unittest
+import os
+import sys
+import ast
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.ast_engine import hash_subtrees, match_python_lines
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+
+
+ORIGINAL = '''class Cart:
+    def add(self, item, quantity):
+        """Add an item."""
+        if quantity > 0:
+            self.items.append((item, quantity))
+        return len(self.items)
+
+    def total(self, prices):
+        result = 0
+        for item, quantity in self.items:
+            result += prices[item] * quantity
+        return result
+'''
+
+# Renamed, reformatted, re-documented, and with the two methods swapped
+MODIFIED = '''class Basket:
+    def sum_up(self, price_table):
+        acc = 0
+        for product, count in self.entries:
+            acc += price_table[product] * \\
+                count
+        return acc
+
+    def put(self, product, count):
+        if count > 0:
+            self.entries.append(
+                (product, count))
+        return len(self.entries)
+'''
+
+
+class TestAstEngine(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+
+    def test_hash_ignores_names_literals_and_docstrings(self):
+        """Renamed and re-documented functions hash the same"""
+        digests_a = {s.digest for s in hash_subtrees(ast.parse(ORIGINAL))}
+        digests_b = {s.digest for s in hash_subtrees(ast.parse(MODIFIED))}
+        self.assertTrue(digests_a & digests_b)
+
+        changed = ORIGINAL.replace('result += prices[item] * quantity', 'result -= prices[item] * quantity')
+        total_a = [s.digest for s in hash_subtrees(ast.parse(ORIGINAL)) if s.start_line == 8]
+        total_changed = [s.digest for s in hash_subtrees(ast.parse(changed)) if s.start_line == 8]
+        self.assertNotEqual(total_a, total_changed, "Operators are part of the structure")
+
+    def test_reordered_methods_map_to_lines(self):
+        """Swapped methods map onto each other line by line"""
+        line_pairs, subtree_count = match_python_lines(ORIGINAL, MODIFIED)
+        mapping = dict(line_pairs)
+
+        self.assertGreaterEqual(subtree_count, 1)
+        self.assertEqual(mapping[2], 9)    # def add -> def put
+        self.assertEqual(mapping[4], 10)   # if quantity > 0 -> if count > 0
+        self.assertEqual(mapping[8], 2)    # def total -> def sum_up
+        self.assertEqual(mapping[11], 5)   # reformatted accumulation
+
+    def test_engine_results(self):
+        """The ast engine feeds the regular results dictionary"""
+        line = self.analyzer.analyze_code_similarity(ORIGINAL, MODIFIED, 0.7, is_file=False, verbose=False)
+        tree = self.analyzer.analyze_code_similarity(ORIGINAL, MODIFIED, 0.7, is_file=False, verbose=False,
+                                                     engine='ast')
+
+        self.assertEqual(tree['engine'], 'ast')
+        self.assertGreater(tree['ast_matches'], 0)
+        self.assertGreater(tree['similar_lines_count'], line['similar_lines_count'])
+        self.assertGreater(tree['similarity_percentage'], line['similarity_percentage'])
+
+    def test_renamed_sample_file(self):
+        """complex_c.py is mostly recovered through the AST"""
+        file_a = os.path.join(self.samples_dir, 'complex_a.py')
+        file_c = os.path.join(self.samples_dir, 'complex_c.py')
+        results = self.analyzer.analyze_code_similarity(file_a, file_c, 0.7, verbose=False, engine='ast')
+
+        self.assertGreaterEqual(results['similarity_percentage'], 70.0)
+        print(f"✅ AST engine: {results['similarity_percentage']:.1f}% similarity, "
+              f"{results['ast_matches']} lines from {results['matched_subtrees']} subtrees")
+
+    def test_falls_back_to_line_engine(self):
+        """Non-Python or unparsable inputs use the line engine"""
+        file_a = os.path.join(self.samples_dir, 'sample_a.java')
+        file_c = os.path.join(self.samples_dir, 'sample_c.java')
+        java = self.analyzer.analyze_code_similarity(file_a, file_c, 0.7, verbose=False, engine='ast')
+        self.assertEqual(java['engine'], 'line')
+        self.assertNotIn('ast_matches', java)
+
+        broken = self.analyzer.analyze_code_similarity('def f(:\n    return 1', ORIGINAL, 0.7,
+                                                       is_file=False, verbose=False, engine='ast')
+        self.assertEqual(broken['engine'], 'line')
+
+        with self.assertRaises(ValueError):
+            self.analyzer.analyze_code_similarity(ORIGINAL, MODIFIED, is_file=False, engine='bogus')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the micro-batching asyncio similarity service.
+"""
+
+import unittest
+import os
+import sys
+import asyncio
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.async_service import AsyncSimilarityService, run_load, synthetic_fragments
+
+
+class TestAsyncSimilarityService(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.fragments = synthetic_fragments(20)
+
+    def direct(self, code_a, code_b, threshold=0.7, **options):
+        return self.analyzer.analyze_code_similarity(code_a, code_b, threshold, is_file=False,
+                                                     verbose=False, **options)
+
+    def test_batched_results_match_direct_calls(self):
+        """Concurrent requests are batched and each gets the direct call's results"""
+        requests = [(code_a, code_b, threshold) for code_a, code_b in self.fragments for threshold in (0.5, 0.8)]
+
+        async def run():
+            async with AsyncSimilarityService(batch_window=0.01) as service:
+                results = await asyncio.gather(*(service.compare(code_a, code_b, threshold, language='python')
+                                                 for code_a, code_b, threshold in requests))
+            return service, results
+
+        service, results = asyncio.run(run())
+        self.assertEqual(service.batches, 1)
+        for (code_a, code_b, threshold), result in zip(requests, results):
+            self.assertEqual(result, self.direct(code_a, code_b, threshold, language='python'))
+
+    def test_duplicates_scored_once(self):
+        """Identical requests in a batch are scored once but get independent results"""
+        with open(os.path.join(self.samples_dir, 'sample_a.py')) as f:
+            code_a = f.read()
+        with open(os.path.join(self.samples_dir, 'sample_c.py')) as f:
+            code_b = f.read()
+
+        async def run():
+            async with AsyncSimilarityService() as service:
+                results = await asyncio.gather(*(service.compare(code_a, code_b) for _ in range(10)))
+            return service, results
+
+        service, results = asyncio.run(run())
+        self.assertEqual(service.requests, 10)
+        self.assertEqual(service.comparisons, 1)
+        self.assertEqual(results[0], self.direct(code_a, code_b))
+        results[0]['similar_matches'].clear()
+        self.assertEqual(results[1], self.direct(code_a, code_b))
+
+    def test_errors_and_load_report(self):
+        """A failing request raises only for its caller; the load generator reports latency percentiles"""
+        code_a, code_b = self.fragments[0]
+
+        async def run():
+            async with AsyncSimilarityService() as service:
+                outcomes = await asyncio.gather(service.compare(code_a, code_b, engine='nonexistent'),
+                                                service.compare(code_a, code_b), return_exceptions=True)
+                with self.assertRaises(ValueError):
+                    await service.compare(code_a, code_b, verbose=True)
+                report = await run_load(service, self.fragments, concurrency=16, requests=200)
+            return outcomes, report
+
+        outcomes, report = asyncio.run(run())
+        self.assertIsInstance(outcomes[0], ValueError)
+        self.assertEqual(outcomes[1], self.direct(code_a, code_b))
+        self.assertEqual(report['requests'], 200)
+        self.assertLessEqual(report['p50_ms'], report['p99_ms'])
+        self.assertGreater(report['throughput_per_second'], 0)
+        print(f"✅ 16 concurrent clients: {report['throughput_per_second']} req/s, "
+              f"p50 {report['p50_ms']} ms, p99 {report['p99_ms']} ms")
+
+
+if __name__ == '__main__':
+    unittest.main()
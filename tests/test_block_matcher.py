@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for hierarchical block-then-line matching.
+"""
+
+import unittest
+import os
+import sys
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.block_matcher import split_blocks
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+
+
+class TestBlockMatcher(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+
+    def _preprocess(self, code, language='python'):
+        meaningful = self.analyzer.extract_meaningful_lines(code, language)
+        features = [self.analyzer.extract_line_features(c, comments_stripped=True) for _, _, c in meaningful]
+        return meaningful, features
+
+    def test_split_blocks_at_headers(self):
+        """Blocks start at function and class headers and cover every line once"""
+        code = "\n".join([
+            "import os",
+            "class Service:",
+            "    def load(self, path):",
+            "        with open(path) as f:",
+            "            return f.read()",
+            "    def save(self, path, data):",
+            "        with open(path, 'w') as f:",
+            "            f.write(data)",
+        ])
+        meaningful, features = self._preprocess(code)
+        blocks = split_blocks(meaningful, features)
+
+        self.assertEqual(blocks, [(0, 1), (1, 2), (2, 5), (5, 8)])
+
+    def test_long_blocks_are_capped(self):
+        """Blocks longer than max_block_lines are cut"""
+        code = "def long():\n" + "\n".join(f"    value_{i} = compute({i})" for i in range(50))
+        meaningful, features = self._preprocess(code)
+        blocks = split_blocks(meaningful, features, max_block_lines=20)
+
+        self.assertTrue(all(end - start <= 20 for start, end in blocks))
+        self.assertEqual(blocks[0][0], 0)
+        self.assertEqual(blocks[-1][1], len(features))
+
+    def test_block_engine_matches_line_engine(self):
+        """The block engine finds the same matches while scoring far fewer line pairs"""
+        file_a = os.path.join(self.samples_dir, 'complex_a.py')
+        file_c = os.path.join(self.samples_dir, 'complex_c.py')
+
+        line = self.analyzer.analyze_code_similarity(file_a, file_c, 0.7, verbose=False)
+        block = self.analyzer.analyze_code_similarity(file_a, file_c, 0.7, verbose=False, engine='block')
+
+        self.assertEqual(block['engine'], 'block')
+        self.assertEqual(block['similar_lines_count'], line['similar_lines_count'])
+        self.assertAlmostEqual(block['similarity_percentage'], line['similarity_percentage'], delta=1.0)
+        self.assertLess(block['line_pairs_scored'], block['line_pairs_total'] / 2)
+
+        print(f"✅ Block engine: {block['line_pairs_scored']} of {block['line_pairs_total']} "
+              f"line pairs scored across {block['block_pairs_scored']} block pairs")
+
+    def test_low_threshold_fallback(self):
+        """Below the disjoint-token bound every leftover pair is still considered"""
+        file_a = os.path.join(self.samples_dir, 'sample_a.py')
+        file_c = os.path.join(self.samples_dir, 'sample_c.py')
+
+        line = self.analyzer.analyze_code_similarity(file_a, file_c, 0.3, verbose=False)
+        block = self.analyzer.analyze_code_similarity(file_a, file_c, 0.3, verbose=False, engine='block')
+        self.assertEqual(block['similar_lines_count'], line['similar_lines_count'])
+
+    def test_tokenless_lines_in_fallback(self):
+        """Identical lines without tokens are still matched when their blocks are not paired"""
+        bodies = {
+            'load': ["with open(path) as handle:", "return json.load(handle)"],
+            'save': ["with open(path, 'w') as handle:", "json.dump(data, handle)"],
+            'parse': ["fields = line.split(',')", "return [field.strip() for field in fields]"],
+            'render': ["template = env.get_template(name)", "return template.render(**context)"],
+        }
+
+        def source(tokenless_in):
+            lines = []
+            for name, body in bodies.items():
+                lines.append(f"def {name}(path, data, line, env, name, context):")
+                lines.extend("    " + statement for statement in body)
+                if name == tokenless_in:
+                    lines.append("    a, b")
+            return "\n".join(lines)
+
+        code_a, code_b = source('load'), source('render')
+        line = self.analyzer.analyze_code_similarity(code_a, code_b, 0.7, is_file=False, verbose=False,
+                                                     language='python')
+        block = self.analyzer.analyze_code_similarity(code_a, code_b, 0.7, is_file=False, verbose=False,
+                                                      language='python', engine='block')
+        self.assertEqual(block['similar_lines_count'], line['similar_lines_count'])
+        self.assertEqual(block['similar_lines_count'], block['lines_a_count'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for intra-repository clone detection.
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.clone_detector import CloneDetector
+
+
+DUPLICATED_BLOCK = """def calculate_total(items, tax_rate):
+    subtotal = sum(item.price * item.quantity for item in items)
+    discount = subtotal * 0.1 if subtotal > 100 else 0
+    taxed = (subtotal - discount) * (1 + tax_rate)
+    return round(taxed, 2)
+"""
+
+RENAMED_BLOCK = """def compute_total(products, tax_rate):
+    subtotal = sum(product.price * product.quantity for product in products)
+    discount = subtotal * 0.1 if subtotal > 100 else 0
+    taxed = (subtotal - discount) * (1 + tax_rate)
+    return round(taxed, 2)
+"""
+
+UNRELATED_BLOCK = """class Logger:
+    def __init__(self, name):
+        self.name = name
+        self.messages = []
+
+    def log(self, message):
+        self.messages.append(f"[{self.name}] {message}")
+"""
+
+
+class TestCloneDetector(unittest.TestCase):
+
+    def setUp(self):
+        """Create a small tree with a duplicated block in three places."""
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'pkg'))
+        os.makedirs(os.path.join(self.root, 'node_modules'))
+        self._write('orders.py', DUPLICATED_BLOCK + "\n" + UNRELATED_BLOCK)
+        self._write('pkg/invoices.py', UNRELATED_BLOCK.replace('Logger', 'Audit') + "\n" + RENAMED_BLOCK)
+        self._write('pkg/billing.py', "import os\n\n" + DUPLICATED_BLOCK + "\n\n" + DUPLICATED_BLOCK)
+        self._write('node_modules/vendored.py', DUPLICATED_BLOCK)
+        self._write('notes.txt', DUPLICATED_BLOCK)
+        self._write('pkg/settings.py', "MAX_RETRIES = 5\nTIMEOUT_SECONDS = 30\nBASE_URL = 'https://example.com'\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _write(self, relative_path, content):
+        with open(os.path.join(self.root, relative_path), 'w') as f:
+            f.write(content)
+
+    def test_indexes_source_files_only(self):
+        """Excluded directories and unknown extensions are not indexed"""
+        detector = CloneDetector()
+        self.assertEqual(detector.index_directory(self.root), 4)
+        self.assertNotIn(os.path.join('node_modules', 'vendored.py'), detector.files)
+
+    def test_clone_pairs_skip_diagonal(self):
+        """Every clone pair points at two distinct, non-overlapping regions"""
+        detector = CloneDetector()
+        detector.index_directory(self.root)
+        pairs = detector.find_clone_pairs()
+
+        self.assertGreater(len(pairs), 0, "Should find the duplicated block")
+        for pair in pairs:
+            if pair['file_a'] == pair['file_b']:
+                self.assertGreater(pair['start_b'], pair['end_a'])
+            self.assertGreaterEqual(pair['matched_lines'], detector.min_clone_lines)
+
+        seen = set()
+        for pair in pairs:
+            key = (pair['file_a'], pair['start_a'], pair['file_b'], pair['start_b'])
+            mirrored = (pair['file_b'], pair['start_b'], pair['file_a'], pair['start_a'])
+            self.assertNotIn(mirrored, seen, "Symmetric pairs should be reported once")
+            seen.add(key)
+
+    def test_clone_class_groups_all_copies(self):
+        """The duplicated block forms one ranked class covering all four copies"""
+        detector = CloneDetector(similarity_threshold=0.7)
+        clone_classes = detector.detect(self.root)
+
+        self.assertGreater(len(clone_classes), 0)
+        top = clone_classes[0]
+        files = sorted(fragment['file'] for fragment in top['fragments'])
+        self.assertEqual(files, sorted(['orders.py', os.path.join('pkg', 'billing.py'),
+                                        os.path.join('pkg', 'billing.py'),
+                                        os.path.join('pkg', 'invoices.py')]))
+        billing = [f for f in top['fragments'] if f['file'] == os.path.join('pkg', 'billing.py')]
+        self.assertEqual([f['start_line'] for f in billing], [3, 10])
+        self.assertEqual(top['duplicated_lines'], top['matched_lines'] * 3)
+
+        print(f"✅ Clone detection: {len(clone_classes)} classes, top class has "
+              f"{top['fragment_count']} fragments")
+
+    def test_blocking_prunes_unrelated_pairs(self):
+        """Files sharing no blocking keys are never compared"""
+        detector = CloneDetector()
+        detector.index_directory(self.root)
+        ids = {name: index for index, name in enumerate(detector.files)}
+        pairs = set(detector.candidate_pairs())
+
+        self.assertIn((ids['orders.py'], ids[os.path.join('pkg', 'billing.py')]), pairs)
+        self.assertIn((ids[os.path.join('pkg', 'billing.py')],) * 2, pairs)
+        settings = ids[os.path.join('pkg', 'settings.py')]
+        self.assertFalse([pair for pair in pairs if settings in pair])
+
+
+if __name__ == "__main__":
+    unittest.main()
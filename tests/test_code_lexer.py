@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the file-level comment/string lexer.
+"""
+
+import unittest
+import os
+import sys
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_lexer import strip_comments, detect_language
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+
+
+class TestCodeLexer(unittest.TestCase):
+
+    def test_comment_markers_inside_strings(self):
+        """'#' and '//' inside string literals are kept"""
+        python_code = 'url = "https://example.com/#top"  # trailing comment\nfmt = "%d items" # note'
+        self.assertEqual(strip_comments(python_code, 'python'),
+                         ['url = "https://example.com/#top"  ', 'fmt = "%d items" '])
+
+        ts_code = "const url = 'http://host/path'; // fetch\nconst re = `a // b`;"
+        self.assertEqual(strip_comments(ts_code, 'typescript'),
+                         ["const url = 'http://host/path'; ", "const re = `a // b`;"])
+
+    def test_multiline_block_comments(self):
+        """Block comments spanning lines are removed and line numbers preserved"""
+        java_code = "int a = 1; /* start\n * middle // not a line comment\n end */ int b = 2;\nint c = 3;"
+        lines = strip_comments(java_code, 'java')
+
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0].strip(), 'int a = 1;')
+        self.assertEqual(lines[1], '')
+        self.assertEqual(lines[2].strip(), 'int b = 2;')
+        self.assertEqual(lines[3], 'int c = 3;')
+
+    def test_python_docstrings(self):
+        """Docstrings are treated as comments, other triple-quoted strings are kept"""
+        code = 'def f():\n    """Doc\n    # not a comment\n    """\n    text = """keep\n    me"""\n    return text'
+        lines = strip_comments(code, 'python')
+
+        self.assertEqual(len(lines), 7)
+        self.assertEqual([line.strip() for line in lines[1:4]], ['', '', ''])
+        self.assertEqual(lines[4].strip(), 'text = """keep')
+        self.assertEqual(lines[5].strip(), 'me"""')
+
+    def test_detect_language(self):
+        """Languages are detected from file extensions"""
+        self.assertEqual(detect_language('samples/complex_a.py'), 'python')
+        self.assertEqual(detect_language('samples/sample_a.ts'), 'typescript')
+        self.assertEqual(detect_language('samples/sample_a.java'), 'java')
+        self.assertEqual(detect_language('notes.txt'), 'generic')
+        self.assertEqual(detect_language(None), 'generic')
+        with self.assertRaises(ValueError):
+            strip_comments('x = 1', 'cobol')
+
+    def test_analyzer_keeps_string_contents(self):
+        """Lines that differ only inside a string after '#' are no longer identical"""
+        analyzer = CodeSimilarityAnalyzer()
+        features = analyzer.preprocess_features(
+            'link = "https://example.com/#intro"\nlink = "https://example.com/#usage"',
+            is_file=False, language='python')
+
+        self.assertEqual(len(features), 2)
+        self.assertNotEqual(features[0].normalized, features[1].normalized)
+        self.assertIn('#intro', features[0].normalized)
+
+
+if __name__ == "__main__":
+    unittest.main()
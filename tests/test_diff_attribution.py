@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for staged-diff attribution.
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.diff_attribution import parse_unified_diff, analyze_changed_lines, staged_diff, read_staged
+
+
+DIFF = """diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -3,0 +4,2 @@ def main():
++    total = compute(values)
++    print(total)
+@@ -10 +12 @@ def helper():
+-    return None
++    return result
+diff --git a/old.py b/old.py
+deleted file mode 100644
+--- a/old.py
++++ /dev/null
+@@ -1,2 +0,0 @@
+-x = 1
+-y = 2
+diff --git a/new.py b/new.py
+new file mode 100644
+--- /dev/null
++++ b/new.py
+@@ -0,0 +1,2 @@
++import os
++print(os.getcwd())
+"""
+
+# Git quotes paths with special characters and ends header names containing spaces with a tab
+QUOTED_DIFF = """diff --git "a/na\\tme.c" "b/na\\tme.c"
+--- "a/na\\tme.c"
++++ "b/na\\tme.c"
+@@ -1,0 +2,2 @@ int main() {
++++ i;
++--- j;
+@@ -4 +6 @@ int main() {
+-    return 0;
++    return i;
+diff --git "a/h\\303\\251llo \\"q\\".c" "b/h\\303\\251llo \\"q\\".c"
+--- "a/h\\303\\251llo \\"q\\".c"\t
++++ "b/h\\303\\251llo \\"q\\".c"\t
+@@ -1 +1,3 @@
+ x
++y
++z
+"""
+
+
+class TestDiffAttribution(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+
+    def test_parse_unified_diff(self):
+        """Added and modified lines are collected per new file; deleted files are skipped"""
+        added = parse_unified_diff(DIFF)
+
+        self.assertEqual(added, {'app.py': {4, 5, 12}, 'new.py': {1, 2}})
+
+    def test_parse_hunk_lengths_and_quoted_paths(self):
+        """Added lines that look like file headers stay content; git's quoted paths are unquoted"""
+        added = parse_unified_diff(QUOTED_DIFF)
+
+        self.assertEqual(added, {'na\tme.c': {2, 3, 6}, 'héllo "q".c': {2, 3}})
+
+    def test_only_changed_lines_are_queried(self):
+        """Unchanged lines of the final file are ignored and percentages use the changed lines"""
+        suggestion = "def area(width, height):\n    result = width * height\n    return result\n"
+        final = ("import math\n\ndef circle(radius):\n    return math.pi * radius ** 2\n\n"
+                 "def area(width, height):\n    result = width * height\n    return result\n")
+        results = analyze_changed_lines(self.analyzer, final, [7, 8], suggestion, 0.7, is_file=False)
+
+        self.assertEqual(results['changed_lines_count'], 2)
+        self.assertEqual(results['lines_a_count'], 2)
+        self.assertEqual(results['attributed_lines_percentage'], 100.0)
+        self.assertEqual([(a, b) for a, b, _ in results['attributed_lines']], [(7, 2), (8, 3)])
+
+    def test_staged_changes_of_a_repository(self):
+        """Lines staged in git are read from the index and attributed to the suggestion"""
+        if shutil.which('git') is None:
+            self.skipTest("git is not installed")
+        repo = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, repo)
+
+        def git(*args):
+            subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+        git('init', '-q')
+        git('config', 'user.email', 'dev@example.com')
+        git('config', 'user.name', 'Dev')
+        with open(os.path.join(self.samples_dir, 'complex_a.py')) as f:
+            base = f.read().split('\n')
+        with open(os.path.join(self.samples_dir, 'sample_c.py')) as f:
+            suggestion = f.read().split('\n')
+        path = os.path.join(repo, 'app.py')
+        with open(path, 'w') as f:
+            f.write('\n'.join(base))
+        git('add', 'app.py')
+        git('commit', '-qm', 'base')
+        with open(path, 'w') as f:
+            f.write('\n'.join(base[:20] + suggestion[:10] + base[20:]))
+        git('add', 'app.py')
+
+        added = parse_unified_diff(staged_diff(repo))
+        self.assertEqual(set(added), {'app.py'})
+        results = analyze_changed_lines(self.analyzer, read_staged('app.py', repo), added['app.py'],
+                                        os.path.join(self.samples_dir, 'sample_c.py'), 0.7)
+        self.assertLessEqual(results['lines_a_count'], 10)
+        self.assertEqual(results['attributed_lines_percentage'], 100.0)
+        print(f"✅ {results['lines_a_count']} staged lines attributed")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Tests for the analyzer metrics registry.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import urllib.request
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.metrics import MetricsRegistry
+from python.result_store import ResultStore
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.registry = MetricsRegistry()
+        self.analyzer = CodeSimilarityAnalyzer(metrics=self.registry)
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.file_a = os.path.join(self.samples_dir, 'sample_a.py')
+        self.file_b = os.path.join(self.samples_dir, 'sample_c.py')
+
+    def test_prometheus_text_format(self):
+        """Counters and histograms render as Prometheus exposition text"""
+        counter = self.registry.counter('events_total', "Events seen", ('kind',))
+        counter.inc(kind='a')
+        counter.inc(2, kind='b"quoted"')
+        histogram = self.registry.histogram('wait_seconds', "Waits", buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        text = self.registry.render()
+
+        self.assertIn('# TYPE code_similarity_events_total counter', text)
+        self.assertIn('code_similarity_events_total{kind="a"} 1', text)
+        self.assertIn('code_similarity_events_total{kind="b\\"quoted\\""} 2', text)
+        self.assertIn('code_similarity_wait_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('code_similarity_wait_seconds_bucket{le="1"} 2', text)
+        self.assertIn('code_similarity_wait_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn('code_similarity_wait_seconds_count 2', text)
+        self.assertRaises(ValueError, counter.inc, -1, kind='a')
+
+    def test_analysis_metrics(self):
+        """Analyses record lines, scored and pruned pairs, store hits and phase latencies"""
+        results = self.analyzer.analyze_code_similarity(self.file_a, self.file_b, verbose=False)
+        lines = results['lines_a_count'] * results['lines_b_count']
+        self.assertEqual(self.registry.pairs.value(result='scored'), lines)
+        self.assertEqual(self.registry.pairs.value(result='pruned'), 0)
+
+        self.analyzer.analyze_code_similarity(self.file_a, self.file_b, verbose=False, canonicalize=True)
+        self.assertGreater(self.registry.pairs.value(result='pruned'), 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with ResultStore(os.path.join(directory, 'results.db')) as store:
+                for _ in range(2):
+                    self.analyzer.analyze_code_similarity(self.file_a, self.file_b, verbose=False,
+                                                          result_store=store)
+        self.assertEqual(self.registry.store_lookups.value(result='miss'), 1)
+        self.assertEqual(self.registry.store_lookups.value(result='hit'), 1)
+        self.assertEqual(self.registry.analyses.value(engine='line', outcome='computed'), 3)
+        self.assertEqual(self.registry.analyses.value(engine='line', outcome='stored'), 1)
+        self.assertEqual(self.registry.phase_seconds.count(phase='read'), 4)
+        for phase in ('preprocess', 'match', 'summarize'):
+            self.assertEqual(self.registry.phase_seconds.count(phase=phase), 3)
+        self.assertEqual(self.registry.lines.value(input='a'), 3 * results['lines_a_count'])
+
+    def test_concurrent_analyses_count_own_pairs(self):
+        """Analyses sharing one analyzer across threads each record only the pairs they scored"""
+        file_a = os.path.join(self.samples_dir, 'complex_a.py')
+        file_b = os.path.join(self.samples_dir, 'complex_b.py')
+        results = self.analyzer.analyze_code_similarity(file_a, file_b, verbose=False)
+        single = self.registry.pairs.value(result='scored')
+        self.assertEqual(single, results['lines_a_count'] * results['lines_b_count'])
+
+        threads = [threading.Thread(target=self.analyzer.analyze_code_similarity, args=(file_a, file_b),
+                                    kwargs={'verbose': False}) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.registry.pairs.value(result='scored'), 5 * single)
+        self.assertEqual(self.registry.pairs.value(result='pruned'), 0)
+
+    def test_http_endpoint_and_file_dump(self):
+        """Metrics are served over local HTTP and written atomically to a file"""
+        self.analyzer.analyze_code_similarity(self.file_a, self.file_b, verbose=False)
+        server = self.registry.serve(port=0)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+                body = response.read().decode('utf-8')
+                content_type = response.headers['Content-Type']
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertTrue(content_type.startswith('text/plain'))
+        self.assertIn('code_similarity_analyses_total{engine="line",outcome="computed"} 1', body)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'analyzer.prom')
+            self.registry.write(path)
+            with open(path) as f:
+                self.assertEqual(f.read(), self.registry.render())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the pipelined corpus scan.
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest import mock
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.pipeline_scan import iter_source_files, scan_corpus, scan_corpus_serial
+
+
+class TestPipelineScan(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.corpus = os.path.join(self.temp_dir.name, 'corpus')
+        os.makedirs(os.path.join(self.corpus, 'node_modules'))
+        for name in ('sample_a.py', 'sample_c.py', 'sample_a.java', 'sample_c.ts'):
+            shutil.copy(os.path.join(self.samples_dir, name), self.corpus)
+        with open(os.path.join(self.corpus, 'unrelated.py'), 'w') as f:
+            f.write("zlib.crc32(payload)\nzlib.adler32(payload)\n")
+        with open(os.path.join(self.corpus, 'node_modules', 'skipped.js'), 'w') as f:
+            f.write("module.exports = {};\n")
+        self.query = os.path.join(self.samples_dir, 'sample_a.py')
+        self.paths = iter_source_files(self.corpus)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_results_match_direct_analysis(self):
+        """Each file's similarity equals analyze_code_similarity on the (query, file) pair"""
+        self.assertEqual(len(self.paths), 5)
+        scan = scan_corpus(self.query, self.paths, read_threads=2)
+        self.assertEqual(scan['files_scanned'], 5)
+        self.assertEqual(scan['errors'], [])
+        for result in scan['results']:
+            direct = self.analyzer.analyze_code_similarity(self.query, result['path'], verbose=False)
+            self.assertEqual(result['similarity_percentage'], direct['similarity_percentage'])
+            self.assertEqual(result['similar_lines_count'], direct['similar_lines_count'])
+        self.assertEqual(scan['results'][0]['path'], os.path.join(self.corpus, 'sample_a.py'))
+
+    def test_sketch_prunes_disjoint_files(self):
+        """Files sharing no token with the query skip matching without changing results"""
+        scan = scan_corpus(self.query, self.paths)
+        pruned = [result['path'] for result in scan['results'] if result['pruned']]
+        self.assertEqual(pruned, [os.path.join(self.corpus, 'unrelated.py')])
+
+        low_threshold = scan_corpus(self.query, self.paths, similarity_threshold=0.5)
+        self.assertFalse(any(result['pruned'] for result in low_threshold['results']))
+
+    def test_tokenless_lines_are_not_pruned(self):
+        """Files whose only shared lines have no tokens are matched, not pruned"""
+        query = os.path.join(self.temp_dir.name, 'query.py')
+        target = os.path.join(self.temp_dir.name, 'target.py')
+        for path in (query, target):
+            with open(path, 'w') as f:
+                f.write("x, y\n")
+        direct = self.analyzer.analyze_code_similarity(query, target, 0.7, verbose=False)
+        for scan in (scan_corpus(query, [target]), scan_corpus_serial(query, [target])):
+            result = scan['results'][0]
+            self.assertFalse(result['pruned'])
+            self.assertEqual(result['similarity_percentage'], direct['similarity_percentage'])
+            self.assertEqual(result['similarity_percentage'], 100.0)
+
+    def test_stage_reports_and_backpressure(self):
+        """Every stage reports its items; tiny queues still finish with the serial scan's results"""
+        scan = scan_corpus(self.query, self.paths * 4, read_threads=3, preprocess_workers=2,
+                           match_workers=2, queue_size=1)
+        serial = scan_corpus_serial(self.query, self.paths * 4)
+        self.assertEqual([stage['stage'] for stage in scan['stages']], ['read', 'preprocess', 'match'])
+        for stage in scan['stages']:
+            self.assertEqual(stage['items'], 20)
+        self.assertEqual(scan['results'], serial['results'])
+        print(f"✅ Pipelined scan {scan['wall_seconds']:.3f}s, serial {serial['wall_seconds']:.3f}s")
+
+    def test_dead_stage_aborts_scan(self):
+        """A stage process that dies makes the scan raise instead of waiting forever"""
+        with mock.patch('python.pipeline_scan._match_item', side_effect=lambda item: os._exit(3)):
+            with self.assertRaisesRegex(RuntimeError, 'match worker exited with code 3'):
+                scan_corpus(self.query, self.paths * 20, queue_size=1)
+
+    def test_large_error_reports(self):
+        """Workers with many errors to report still exit and the scan returns them all"""
+        missing = [os.path.join(self.corpus, f'missing_{i}_' + 'x' * 200 + '.py') for i in range(2000)]
+        with mock.patch('python.pipeline_scan._preprocess_item', side_effect=ValueError('x' * 100)):
+            scan = scan_corpus(self.query, missing, preprocess_workers=2)
+        self.assertEqual(len(scan['errors']), 2000)
+        self.assertEqual(scan['results'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
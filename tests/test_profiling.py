@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the built-in profiling mode.
+"""
+
+import unittest
+import os
+import sys
+import io
+import tempfile
+from contextlib import redirect_stdout
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer, main
+from python.profiling import write_profile_bundle, replay_profile_bundle
+
+
+class TestProfiling(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.file_a = os.path.join(self.samples_dir, 'sample_a.py')
+        self.file_b = os.path.join(self.samples_dir, 'sample_c.py')
+
+    def test_profiled_results_match_plain_run(self):
+        """profile=True attaches hot spots, allocation sites and collapsed stacks without changing results"""
+        plain = self.analyzer.analyze_code_similarity(self.file_a, self.file_b, verbose=False)
+        profiled = self.analyzer.analyze_code_similarity(self.file_a, self.file_b, verbose=False, profile=True)
+        profile = profiled.pop('profile')
+
+        self.assertEqual(profiled, plain)
+        functions = [row['function'] for row in profile['top_functions']]
+        self.assertTrue(any(name.startswith('similarity_from_features') for name in functions))
+        self.assertTrue(profile['top_allocations'])
+        self.assertGreater(profile['peak_memory_kib'], 0)
+        for line in profile['collapsed_stacks'].splitlines():
+            stack, count = line.rsplit(' ', 1)
+            self.assertTrue(stack.startswith('<lambda>') and int(count) > 0)
+
+    def test_bundle_can_be_replayed(self):
+        """A saved bundle holds the inputs and options needed to reproduce the run"""
+        results = self.analyzer.analyze_code_similarity(self.file_a, self.file_b, 0.6, verbose=False,
+                                                        engine='block', profile=True)
+        with tempfile.TemporaryDirectory() as directory:
+            written = write_profile_bundle(directory, results, (self.file_a, self.file_b), True,
+                                           {'similarity_threshold': 0.6, 'engine': 'block'})
+            names = {os.path.basename(path) for path in written}
+            self.assertTrue({'report.txt', 'stacks.collapsed', 'profile.json', 'options.json',
+                             'input_a.py', 'input_b.py'} <= names)
+            replayed = replay_profile_bundle(directory, self.analyzer)
+
+        self.assertEqual(replayed['similarity_percentage'], results['similarity_percentage'])
+        self.assertEqual(replayed['engine'], 'block')
+        self.assertIn('profile', replayed)
+
+    def test_cli_profile_option(self):
+        """--profile on the command line prints the report and saves the bundle"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = io.StringIO()
+            with redirect_stdout(output):
+                main([self.file_a, self.file_b, '--profile', directory])
+            self.assertTrue(os.path.exists(os.path.join(directory, 'stacks.collapsed')))
+        self.assertIn('Top functions by cumulative time', output.getvalue())
+        print("✅ CLI profile bundle written")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite result store.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.result_store import ResultStore, content_hash
+
+
+class TestResultStore(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, 'results.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_cached_results_skip_recomputation(self):
+        """A repeated comparison is answered from the store"""
+        file_a = os.path.join(self.samples_dir, 'sample_a.py')
+        file_c = os.path.join(self.samples_dir, 'sample_c.py')
+        with ResultStore(self.db_path) as store:
+            first = self.analyzer.analyze_code_similarity(file_a, file_c, 0.7, verbose=False, result_store=store)
+            self.assertEqual(len(store), 1)
+
+            with mock.patch.object(self.analyzer, 'match_line_features') as match:
+                second = self.analyzer.analyze_code_similarity(file_a, file_c, 0.7, verbose=False,
+                                                               result_store=store)
+                match.assert_not_called()
+            self.assertEqual(second, first)
+
+            # A different threshold or option is a different key
+            self.analyzer.analyze_code_similarity(file_a, file_c, 0.5, verbose=False, result_store=store)
+            self.analyzer.analyze_code_similarity(file_a, file_c, 0.7, verbose=False, engine='ast',
+                                                  result_store=store)
+            self.assertEqual(len(store), 3)
+
+    def test_keyed_by_content(self):
+        """Renamed copies of the same content hit the same entry"""
+        with open(os.path.join(self.samples_dir, 'sample_a.py')) as f:
+            code = f.read()
+        with ResultStore(self.db_path) as store:
+            fragment = self.analyzer.analyze_code_similarity(code, code, 0.7, is_file=False, verbose=False,
+                                                             result_store=store)
+            copy_path = os.path.join(self.tmp.name, 'copy.py')
+            with open(copy_path, 'w') as f:
+                f.write(code)
+            from_file = self.analyzer.analyze_code_similarity(copy_path, copy_path, 0.7, verbose=False,
+                                                              language='generic', result_store=store)
+            self.assertEqual(len(store), 1)
+            self.assertEqual(from_file['input_a'], copy_path)
+            self.assertEqual(from_file['similarity_percentage'], fragment['similarity_percentage'])
+
+    def test_bulk_queries_and_versions(self):
+        """Results can be listed per file hash and are scoped to the analyzer version"""
+        digest_a, digest_b, digest_c = content_hash('a'), content_hash('b'), content_hash('c')
+        with ResultStore(self.db_path) as store:
+            store.put_many([
+                (digest_a, digest_b, 0.7, {'similarity_percentage': 10.0}, None),
+                (digest_c, digest_a, 0.7, {'similarity_percentage': 20.0}, None),
+                (digest_b, digest_c, 0.5, {'similarity_percentage': 30.0}, {'engine': 'ast'}),
+            ])
+            involving_a = store.results_for_hash(digest_a)
+            self.assertEqual(sorted(e['results']['similarity_percentage'] for e in involving_a), [10.0, 20.0])
+            self.assertEqual(len(store.results_for_hash(digest_c, threshold=0.5)), 1)
+
+        with ResultStore(self.db_path, analyzer_version='other') as store:
+            self.assertIsNone(store.get(digest_a, digest_b, 0.7))
+            self.assertEqual(store.prune(), 3)
+            self.assertEqual(len(store), 0)
+
+    def test_wal_mode(self):
+        """The database uses write-ahead logging for concurrent workers"""
+        with ResultStore(self.db_path) as store:
+            mode = store._connection.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the sampling-based similarity estimator.
+"""
+
+import unittest
+import os
+import sys
+import itertools
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+
+
+class TestSamplingEstimator(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+
+    def test_exhaustive_sample_matches_full_analysis(self):
+        """Inputs smaller than the sample are matched completely"""
+        file_a = os.path.join(self.samples_dir, 'sample_a.java')
+        file_b = os.path.join(self.samples_dir, 'sample_c.java')
+        exact = self.analyzer.analyze_code_similarity(file_a, file_b, 0.7, verbose=False)
+        estimate = self.analyzer.estimate_code_similarity(file_a, file_b, 0.7, verbose=False)
+
+        self.assertTrue(estimate['exhaustive'])
+        self.assertEqual(estimate['similarity_percentage'], exact['similarity_percentage'])
+        self.assertEqual(estimate['confidence_interval'], [exact['similarity_percentage']] * 2)
+
+    def test_interval_brackets_exact_result(self):
+        """Estimates for every same-language pair of the samples bracket the full analysis result"""
+        names = sorted(name for name in os.listdir(self.samples_dir) if '.' in name)
+        sampled = 0
+        for name_a, name_b in itertools.combinations(names, 2):
+            if os.path.splitext(name_a)[1] != os.path.splitext(name_b)[1]:
+                continue
+            file_a = os.path.join(self.samples_dir, name_a)
+            file_b = os.path.join(self.samples_dir, name_b)
+            exact = self.analyzer.analyze_code_similarity(file_a, file_b, 0.7, verbose=False)
+            for seed in range(3):
+                estimate = self.analyzer.estimate_code_similarity(file_a, file_b, 0.7, verbose=False,
+                                                                  interval_width=20, seed=seed)
+                low, high = estimate['confidence_interval']
+                if estimate['exhaustive']:
+                    self.assertEqual(estimate['similarity_percentage'], exact['similarity_percentage'])
+                else:
+                    sampled += 1
+                    self.assertLessEqual(high - low, 20)
+                self.assertLessEqual(low, exact['similarity_percentage'], (name_a, name_b, seed))
+                self.assertGreaterEqual(high, exact['similarity_percentage'], (name_a, name_b, seed))
+        self.assertGreater(sampled, 0)
+        print(f"✅ {sampled} sampled estimates bracket the exact result")
+
+    def test_narrower_interval_needs_larger_sample(self):
+        """Asking for a narrower interval grows the sample"""
+        code_a = "\n".join(f"total_{i} = compute(values[{i}], scale={i % 7})" for i in range(600))
+        code_b = "\n".join(f"total_{i} = compute(values[{i}], scale={i % 5})" for i in range(600))
+        wide = self.analyzer.estimate_code_similarity(code_a, code_b, 0.7, is_file=False, verbose=False,
+                                                      interval_width=20)
+        narrow = self.analyzer.estimate_code_similarity(code_a, code_b, 0.7, is_file=False, verbose=False,
+                                                        interval_width=2)
+
+        self.assertLess(wide['sample_size_a'], narrow['sample_size_a'])
+        self.assertLessEqual(narrow['confidence_interval'][1] - narrow['confidence_interval'][0], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
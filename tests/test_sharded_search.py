@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Tests for sharded corpus search.
+"""
+
+import unittest
+import os
+import sys
+import socket
+import subprocess
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.sharded_search import ShardIndex, ShardServer, ShardCoordinator, shard_for
+
+
+class TestShardedSearch(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        with open(os.path.join(self.samples_dir, 'sample_a.py')) as f:
+            self.query = f.read()
+        self.full_index = ShardIndex(self.analyzer)
+        self.full_index.add_directory(self.samples_dir)
+
+    def start_local_shards(self, count):
+        servers = []
+        for shard in range(count):
+            index = ShardIndex(self.analyzer)
+            index.add_directory(self.samples_dir, shard, count)
+            server = ShardServer(index, name=f"shard-{shard}")
+            server.start()
+            self.addCleanup(server.shutdown)
+            servers.append(server)
+        return servers
+
+    def test_sharded_hits_equal_single_index(self):
+        """Merged top-K hits across shards equal a search over one unsharded index"""
+        servers = self.start_local_shards(3)
+        self.assertEqual(sum(len(server.index) for server in servers), len(self.full_index))
+        for doc_id in servers[1].index.documents:
+            self.assertEqual(shard_for(doc_id, 3), 1)
+
+        expected = self.full_index.search(self.query, 'python', top_k=4)
+        with ShardCoordinator([server.address for server in servers]) as coordinator:
+            response = coordinator.search(self.query, 'python', top_k=4)
+        self.assertFalse(response['partial'])
+        self.assertEqual(response['shards_responded'], 3)
+        self.assertEqual(response['hits'], expected)
+        self.assertEqual(response['hits'][0]['doc_id'], 'sample_a.py')
+
+        direct = self.analyzer.analyze_code_similarity(os.path.join(self.samples_dir, 'sample_a.py'),
+                                                       os.path.join(self.samples_dir, 'sample_c.py'),
+                                                       verbose=False)
+        hit = next(hit for hit in self.full_index.search(self.query, 'python', top_k=20)
+                   if hit['doc_id'] == 'sample_c.py')
+        self.assertEqual(hit['similarity_percentage'], direct['similarity_percentage'])
+
+    def test_tokenless_lines_are_searched(self):
+        """Documents whose only shared lines have no tokens are still hits"""
+        index = ShardIndex(self.analyzer)
+        index.add('pair.py', "x, y", 'python')
+        direct = self.analyzer.analyze_code_similarity("x, y", "x, y", 0.7, is_file=False, verbose=False)
+        hits = index.search("x, y", 'python', 0.7)
+        self.assertEqual([hit['doc_id'] for hit in hits], ['pair.py'])
+        self.assertEqual(hits[0]['similarity_percentage'], direct['similarity_percentage'])
+
+    def test_shard_timeout_gives_partial_results(self):
+        """A shard that never answers is reported and the other shards' hits are still merged"""
+        servers = self.start_local_shards(2)
+        silent = socket.socket()
+        silent.bind(('127.0.0.1', 0))
+        silent.listen()
+        self.addCleanup(silent.close)
+
+        with ShardCoordinator([servers[0].address, silent.getsockname(), servers[1].address],
+                              timeout=2.0) as coordinator:
+            response = coordinator.search(self.query, 'python', top_k=4)
+        self.assertTrue(response['partial'])
+        self.assertEqual(response['shards_responded'], 2)
+        self.assertEqual(response['failed_shards'][0]['error'], 'timed out')
+        self.assertEqual(response['hits'], self.full_index.search(self.query, 'python', top_k=4))
+
+    def test_worker_processes_on_localhost(self):
+        """Shard servers run as separate processes on localhost ports"""
+        root = os.path.dirname(os.path.dirname(__file__))
+        addresses = []
+        for shard in range(2):
+            process = subprocess.Popen([sys.executable, '-m', 'python.sharded_search', 'serve', self.samples_dir,
+                                        '--shard', str(shard), '--shards', '2'],
+                                       cwd=root, stdout=subprocess.PIPE, text=True)
+            self.addCleanup(process.wait)
+            self.addCleanup(process.terminate)
+            banner = process.stdout.readline()
+            self.addCleanup(process.stdout.close)
+            host, port = banner.rsplit(' ', 1)[1].strip().rsplit(':', 1)
+            addresses.append((host, int(port)))
+
+        with ShardCoordinator(addresses) as coordinator:
+            response = coordinator.search(self.query, 'python', top_k=3)
+        self.assertEqual(response['shards_responded'], 2)
+        self.assertEqual(response['hits'], self.full_index.search(self.query, 'python', top_k=3))
+        print(f"✅ 2 shard processes answered in {response['elapsed_ms']:.1f} ms")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared-memory feature corpus.
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.shared_features import SharedFeatureCorpus, score_queries_against_corpus
+from python.similarity_matrix import similarity_matrix
+
+
+class TestSharedFeatures(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.paths = [os.path.join(self.samples_dir, name)
+                      for name in ('sample_a.py', 'sample_c.py', 'complex_b.py', 'complex_a.py')]
+        self.features = [self.analyzer.preprocess_features(path) for path in self.paths]
+
+    def _assert_same_scores(self, corpus):
+        for k, original in enumerate(self.features):
+            shared = corpus.file_features(k)
+            self.assertEqual(len(shared), len(original))
+            for line_a in original[:10]:
+                for line_shared, line_b in zip(shared, original):
+                    self.assertEqual(self.analyzer.similarity_from_features(corpus.encode_features([line_a])[0],
+                                                                            line_shared),
+                                     self.analyzer.similarity_from_features(line_a, line_b))
+
+    def test_round_trip_preserves_scores(self):
+        """Interned tokens and feature bits score exactly like the original strings"""
+        with SharedFeatureCorpus.create(self.features) as corpus:
+            self.assertEqual(corpus.file_count, len(self.paths))
+            self.assertEqual(corpus.line_count, sum(len(f) for f in self.features))
+            self._assert_same_scores(corpus)
+
+    def test_attach_by_name(self):
+        """A second handle attached by name sees the same lines without a copy"""
+        with SharedFeatureCorpus.create(self.features) as corpus:
+            attached = SharedFeatureCorpus.attach(corpus.name)
+            try:
+                self.assertEqual(attached.file_features(2), corpus.file_features(2))
+                with self.assertRaises(ValueError):
+                    attached.encode_features(self.features[0])
+            finally:
+                attached.close()
+
+    def test_mapped_file(self):
+        """A saved corpus can be mapped read-only instead of using shared memory"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'corpus.bin')
+            SharedFeatureCorpus.save(self.features, path)
+            with SharedFeatureCorpus.open_file(path) as mapped, SharedFeatureCorpus.create(self.features) as corpus:
+                self.assertEqual(mapped.nbytes, corpus.nbytes)
+                self.assertEqual(mapped.file_features(3), corpus.file_features(3))
+
+    def test_parallel_workers_match_serial(self):
+        """Workers scoring from shared memory agree with in-process scoring"""
+        paths, features = self.paths[:3], self.features[:3]
+        serial = similarity_matrix(paths, workers=1)
+        parallel = similarity_matrix(paths, workers=2)
+        self.assertEqual([list(row) for row in parallel.percentages],
+                         [list(row) for row in serial.percentages])
+
+        with SharedFeatureCorpus.create(features[1:]) as corpus:
+            scores = score_queries_against_corpus(corpus, [features[0]], workers=2)
+        self.assertEqual(scores[0], [float(serial.percentages[0][j]) for j in range(1, len(paths))])
+        print(f"✅ Shared corpus: {corpus.line_count} lines in {corpus.nbytes} bytes")
+
+
+if __name__ == "__main__":
+    unittest.main()
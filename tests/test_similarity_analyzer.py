@@ -178,6 +178,52 @@ class TestCodeSimilarityAnalyzer(unittest.TestCase):
         print(f"✅ Threshold sensitivity: Low threshold ({results_low['similar_lines_count']} matches) >= "
               f"High threshold ({results_high['similar_lines_count']} matches)")
 
+    def test_threshold_sweep(self):
+        """A sweep scores once and matches per-threshold analysis exactly"""
+        print("\n--- Testing Threshold Sweep ---")
+
+        file_a = os.path.join(self.samples_dir, 'sample_a.py')
+        file_b = os.path.join(self.samples_dir, 'sample_c.py')
+        thresholds = [0.9, 0.3, 0.5, 0.7]
+
+        sweep = self.analyzer.analyze_code_similarity_sweep(file_a, file_b, thresholds, verbose=False)
+        self.assertEqual(len(sweep), len(thresholds))
+        for threshold, results in zip(thresholds, sweep):
+            single = self.analyzer.analyze_code_similarity(file_a, file_b, threshold, verbose=False)
+            self.assertEqual(results, single)
+
+        empty = self.analyzer.analyze_code_similarity_sweep("", "x = 1", [0.5, 0.7], is_file=False,
+                                                            verbose=False)
+        self.assertTrue(all('error' in results for results in empty))
+
+        print(f"✅ Threshold sweep: " + ", ".join(f"{t}: {r['similarity_percentage']:.1f}%"
+                                                  for t, r in zip(thresholds, sweep)))
+
+    def test_bounded_candidates_per_line(self):
+        """Top-K candidate pruning keeps memory bounded and rarely changes the result"""
+        print("\n--- Testing Bounded Candidates Per Line ---")
+
+        features_a = self.analyzer.preprocess_features(os.path.join(self.samples_dir, 'sample_a.py'))
+        features_b = self.analyzer.preprocess_features(os.path.join(self.samples_dir, 'sample_c.py'))
+        full = self.analyzer.match_line_features(features_a, features_b, 0.3)
+
+        # With K at least the file size nothing is pruned
+        unbounded = self.analyzer.match_line_features(features_a, features_b, 0.3,
+                                                      max_candidates_per_line=len(features_b))
+        self.assertEqual(unbounded, full)
+
+        candidates = self.analyzer._top_candidates(features_a, features_b, 0.3, 2)
+        self.assertLessEqual(len(candidates), 2 * (len(features_a) + len(features_b)))
+
+        pruned = self.analyzer.match_line_features(features_a, features_b, 0.3, max_candidates_per_line=2)
+        self.assertAlmostEqual(len(pruned), len(full), delta=1)
+
+        with self.assertRaises(ValueError):
+            self.analyzer.match_line_features(features_a, features_b, 0.3, max_candidates_per_line=0)
+
+        print(f"✅ Bounded candidates: {len(candidates)} pairs kept, "
+              f"{len(pruned)} matches vs {len(full)} unpruned")
+
     def test_performance_stress_test(self):
         """Test performance with artificially large inputs"""
         print("\n--- Testing Performance Stress Test ---")
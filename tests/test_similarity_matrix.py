@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Tests for the all-pairs similarity matrix.
+"""
+
+import unittest
+import os
+import sys
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.similarity_matrix import similarity_matrix
+
+
+class TestSimilarityMatrix(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.paths = [os.path.join(self.samples_dir, name) for name in
+                      ('sample_a.py', 'sample_c.py', 'sample_a.java', 'sample_c.java', 'sample_a.ts')]
+
+    def test_matches_pairwise_analysis(self):
+        """Upper triangle equals analyze_code_similarity and the matrix is symmetric"""
+        matrix = similarity_matrix(self.paths, similarity_threshold=0.7, workers=1)
+
+        for i in range(len(self.paths)):
+            self.assertEqual(matrix.percentages[i][i], 100.0)
+            for j in range(i + 1, len(self.paths)):
+                expected = self.analyzer.analyze_code_similarity(
+                    self.paths[i], self.paths[j], 0.7, verbose=False)
+                self.assertEqual(matrix.percentages[i][j], expected['similarity_percentage'])
+                self.assertEqual(matrix.percentages[j][i], matrix.percentages[i][j])
+
+    def test_parallel_matches_serial(self):
+        """Worker processes produce the same matrix as in-process scoring"""
+        serial = similarity_matrix(self.paths, workers=1)
+        parallel = similarity_matrix(self.paths, workers=2)
+
+        for i in range(len(self.paths)):
+            for j in range(len(self.paths)):
+                self.assertEqual(serial.percentages[i][j], parallel.percentages[i][j])
+
+    def test_detail_on_demand(self):
+        """Per-pair details are the full results dictionary"""
+        matrix = similarity_matrix(self.paths[:2], similarity_threshold=0.6, workers=1)
+        detail = matrix.detail(0, 1)
+        expected = self.analyzer.analyze_code_similarity(self.paths[0], self.paths[1], 0.6, verbose=False)
+
+        self.assertEqual(detail, expected)
+        self.assertIs(matrix.detail(0, 1), detail, "Details should be cached")
+        self.assertEqual(matrix.most_similar_pairs(1)[0][:2], (self.paths[0], self.paths[1]))
+
+    def test_detail_matches_mirrored_percentages(self):
+        """detail(j, i) agrees with percentages[j][i] even where matching is order dependent"""
+        paths = [os.path.join(self.samples_dir, name) for name in ('complex_a.py', 'complex_b.py', 'complex_c.py')]
+        matrix = similarity_matrix(paths, similarity_threshold=0.7, workers=1)
+
+        for i in range(len(paths)):
+            for j in range(len(paths)):
+                if i != j:
+                    self.assertEqual(matrix.detail(j, i)['similarity_percentage'], matrix.percentages[j][i])
+        self.assertIs(matrix.detail(2, 0), matrix.detail(0, 2))
+
+    def test_unreadable_file(self):
+        """Files without meaningful code get a zero row"""
+        matrix = similarity_matrix([self.paths[0], 'nonexistent.py'], workers=1)
+        self.assertEqual(matrix.percentages[1][1], 0.0)
+        self.assertEqual(matrix.percentages[0][1], 0.0)
+        self.assertIn('error', matrix.detail(0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
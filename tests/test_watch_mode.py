@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for the polling attribution watcher.
+"""
+
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+
+# Add the parent directory to the path to import from python/
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from python.code_similarity_analyzer import CodeSimilarityAnalyzer
+from python.watch_mode import AttributionWatcher
+
+
+class TestWatchMode(unittest.TestCase):
+
+    def setUp(self):
+        """Set up test fixtures."""
+        self.analyzer = CodeSimilarityAnalyzer()
+        self.samples_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'samples')
+        self.work_dir = tempfile.mkdtemp()
+        self.final = os.path.join(self.work_dir, 'final.py')
+        self.suggestion = os.path.join(self.work_dir, 'suggestion.py')
+        shutil.copy(os.path.join(self.samples_dir, 'sample_a.py'), self.final)
+        shutil.copy(os.path.join(self.samples_dir, 'sample_c.py'), self.suggestion)
+        self.pair = (self.final, self.suggestion)
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir)
+
+    def edit_final(self, old: str, new: str, mtime_ns: int):
+        with open(self.final) as f:
+            code = f.read()
+        with open(self.final, 'w') as f:
+            f.write(code.replace(old, new, 1))
+        os.utime(self.final, ns=(mtime_ns, mtime_ns))
+
+    def test_edits_match_fresh_analysis(self):
+        """Incremental updates equal a fresh analysis and only score the edited lines"""
+        watcher = AttributionWatcher([self.pair], self.analyzer, 0.7, debounce_seconds=0)
+        initial = watcher.poll()[self.pair]
+        self.assertEqual(initial, self.analyzer.analyze_code_similarity(*self.pair, 0.7, verbose=False))
+
+        scored = watcher.pairs_scored
+        self.edit_final('def ', 'def renamed_', 1)
+        updated = watcher.poll()[self.pair]
+        self.assertEqual(updated, self.analyzer.analyze_code_similarity(*self.pair, 0.7, verbose=False))
+        self.assertLess(watcher.pairs_scored - scored, scored / 5)
+        self.assertEqual(watcher.poll(), {})
+        print(f"✅ Edit rescored {watcher.pairs_scored - scored} of {scored} line pairs")
+
+    def test_debounce_waits_for_file_to_settle(self):
+        """A change is picked up only after the file is unchanged for the debounce interval"""
+        watcher = AttributionWatcher([self.pair], self.analyzer, 0.7, debounce_seconds=0.5)
+        watcher.poll(now=0.0)
+
+        self.edit_final('def ', 'def renamed_', 1)
+        self.assertEqual(watcher.poll(now=10.0), {})
+        self.edit_final('def ', 'def again_', 2)
+        self.assertEqual(watcher.poll(now=10.3), {})
+        self.assertEqual(watcher.poll(now=10.6), {})
+        self.assertIn(self.pair, watcher.poll(now=10.8))
+
+    def test_touch_without_content_change_is_ignored(self):
+        """A new mtime with identical content does not re-analyze"""
+        watcher = AttributionWatcher([self.pair], self.analyzer, 0.7, debounce_seconds=0)
+        watcher.poll()
+        os.utime(self.final, ns=(5, 5))
+
+        self.assertEqual(watcher.poll(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()